@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Сквозной замер производительности всех трех приложений на синтетических данных.
+
+Для каждого объема выборки генерируется набор файлов (synthetic_data.py),
+затем каждое приложение запускается в отдельном процессе (у приложений
+одинаковые имена модулей) с собственной временной БД через SURVEY_DB_PATH
+и прогоняет сценарий через Flask test_client:
+
+- survey-report: импорт locations / questions / tasks / ответов, страницы
+  /locations, /questions, /tasks, API, построение графиков;
+- survey-report-lite: импорт JSON, /dashboard, /api/themes;
+- survey-report-lite-Json: загрузка БД, дашборд с графиками, /api/stats,
+  /api/stats/columnar, экспорт CSV.
+
+Для каждого шага записывается первый (холодный) запуск и медиана повторов;
+кэш страниц перед повторами сбрасывается, кроме шагов *_cached.
+Результаты сохраняются в JSON и могут сравниваться с прошлым прогоном.
+
+Использование:
+    python run_benchmarks.py [--scales 1000,10000] [--repeat 3] [--compare results/old.json]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import resource
+import statistics
+import subprocess
+import tempfile
+from datetime import datetime
+from urllib.parse import quote
+
+import synthetic_data
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+
+APPS = {
+    'main': os.path.join(ROOT_DIR, 'survey-report'),
+    'lite': os.path.join(ROOT_DIR, 'survey-report-lite', 'survey-report'),
+    'lite-json': os.path.join(ROOT_DIR, 'survey-report-lite-Json', 'survey-report'),
+}
+
+DEFAULT_SCALES = (1000, 10000)
+DEFAULT_REPEAT = 3
+
+# Во сколько раз шаг может замедлиться относительно базового прогона
+DEFAULT_THRESHOLD = 1.25
+
+# Шаги быстрее этого порога не считаются регрессией (шум таймера)
+MIN_COMPARE_MS = 5.0
+
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+
+
+class Timer:
+    """Собирает замеры шагов сценария внутри рабочего процесса"""
+
+    def __init__(self, repeat):
+        self.repeat = repeat
+        self.steps = []
+
+    def run(self, name, func, reset=None):
+        """
+        Выполняет func один раз (холодный запуск) и еще repeat раз.
+        reset вызывается перед каждым повтором (например, сброс кэша страниц).
+        func возвращает HTTP-статус или None.
+        """
+        timings = []
+        status = None
+        for attempt in range(self.repeat + 1):
+            if reset is not None and attempt:
+                reset()
+            started = time.perf_counter()
+            status = func()
+            timings.append((time.perf_counter() - started) * 1000)
+        self.steps.append({
+            'step': name,
+            'cold_ms': round(timings[0], 2),
+            'median_ms': round(statistics.median(timings[1:] or timings), 2),
+            'min_ms': round(min(timings[1:] or timings), 2),
+            'status': status
+        })
+
+    def once(self, name, func):
+        """Шаг, который нельзя повторять без изменения состояния (первичная загрузка)"""
+        started = time.perf_counter()
+        status = func()
+        elapsed = round((time.perf_counter() - started) * 1000, 2)
+        self.steps.append({'step': name, 'cold_ms': elapsed, 'median_ms': elapsed,
+                           'min_ms': elapsed, 'status': status})
+
+
+def _get(client, path):
+    return lambda: client.get(path, headers={'Accept-Encoding': 'gzip'}).status_code
+
+
+def _upload(client, path, field, filepath, data=None):
+    def post():
+        with open(filepath, 'rb') as f:
+            form = dict(data or {})
+            form[field] = (f, os.path.basename(filepath))
+            return client.post(path, data=form, content_type='multipart/form-data').status_code
+    return post
+
+
+def bench_main(timer, paths):
+    import final_with_charts as module
+    module.app.config['MAX_CONTENT_LENGTH'] = None
+    client = module.app.test_client()
+    reset = module.response_cache.invalidate
+
+    for import_type in ('locations', 'questions', 'tasks'):
+        timer.once(f'import_{import_type}',
+                   _upload(client, '/import', 'file', paths[import_type], {'import_type': import_type}))
+    timer.once('import_answers', _upload(client, '/import', 'file', paths['answers'], {'import_type': 'answers'}))
+    # Повторный импорт тех же ответов: все строки без изменений
+    timer.once('reimport_answers', _upload(client, '/import', 'file', paths['answers'], {'import_type': 'answers'}))
+    # Страница импорта показывает накопленные flash-сообщения; пока они есть, кэш страниц не работает
+    client.get('/import')
+
+    for name, path in [('locations', '/locations'), ('questions', '/questions'), ('tasks', '/tasks'),
+                       ('api_scores', '/api/scores'), ('api_counts', '/api/counts'),
+                       ('api_health', '/api/health/data'),
+                       ('api_crosstab', '/api/crosstab?question=' + quote('Оцените скорость загрузки системы'))]:
+        timer.run(name, _get(client, path), reset)
+    timer.run('questions_cached', _get(client, '/questions'))
+
+    conn = module.get_db_connection()
+    locations = [dict(row) for row in conn.execute("SELECT * FROM locations ORDER BY responses DESC")]
+    questions = [dict(row) for row in conn.execute("SELECT * FROM questions ORDER BY satisfaction_percent DESC")]
+    conn.close()
+    timer.run('chart_locations', lambda: module.create_satisfaction_chart(locations) and None)
+    timer.run('chart_questions', lambda: module.create_questions_chart(questions) and None)
+
+
+def bench_lite(timer, paths):
+    import final_with_charts as module
+    module.app.config['MAX_CONTENT_LENGTH'] = None
+    module.init_database()
+    client = module.app.test_client()
+    reset = module.response_cache.invalidate
+
+    timer.once('import_json', _upload(client, '/import_json', 'json_file', paths['json']))
+    for name, path in [('dashboard', '/dashboard'), ('api_themes', '/api/themes'),
+                       ('locations', '/locations'), ('questions', '/questions')]:
+        timer.run(name, _get(client, path), reset)
+    timer.run('dashboard_cached', _get(client, '/dashboard'))
+
+
+def bench_lite_json(timer, paths):
+    def load():
+        shutil.copyfile(paths['responses_db'], os.environ['SURVEY_DB_PATH'])
+    timer.once('load_db', load)
+
+    import final_with_charts as module
+    client = module.app.test_client()
+    reset = module.response_cache.invalidate
+
+    timer.run('dashboard', _get(client, '/'), reset)
+    timer.run('dashboard_cached', _get(client, '/'))
+    # Готовые payload-ы кэшируются по версии данных: холодный запуск — первый
+    timer.run('api_stats', _get(client, '/api/stats'))
+    timer.run('api_stats_columnar', _get(client, '/api/stats/columnar'))
+    timer.run('export_csv', _get(client, '/api/export/csv'))
+
+    timer.once('statistics', lambda: module.get_survey_statistics() and None)
+    dashboard_data = module.prepare_dashboard_data(module.get_survey_statistics())
+    jobs = module.dashboard_chart_jobs(dashboard_data['location_data'],
+                                       dashboard_data['satisfaction_data'],
+                                       dashboard_data['problem_data'])
+
+    # Графики хранятся в БД; здесь замеряется полная перерисовка (как render-charts)
+    def render_charts():
+        conn = module.get_db_connection()
+        module.refresh_dashboard_charts(conn, jobs, force=True)
+        conn.close()
+    timer.run('charts', render_charts)
+
+
+SCENARIOS = {'main': bench_main, 'lite': bench_lite, 'lite-json': bench_lite_json}
+
+
+def worker(app_name, paths_file, repeat):
+    """Точка входа рабочего процесса (текущий каталог — временный каталог приложения)"""
+    sys.path.insert(0, APPS[app_name])
+    with open(paths_file, encoding='utf-8') as f:
+        paths = json.load(f)
+    timer = Timer(repeat)
+    error = None
+    try:
+        SCENARIOS[app_name](timer, paths)
+    except Exception as e:
+        error = f'{type(e).__name__}: {e}'
+    # ru_maxrss в Linux — в килобайтах
+    peak_rss_mb = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    json.dump({'steps': timer.steps, 'peak_rss_mb': peak_rss_mb, 'error': error}, sys.stdout)
+
+
+def run_app(app_name, paths_file, workdir, repeat):
+    """Запускает сценарий приложения в отдельном процессе со своей БД"""
+    app_dir = os.path.join(workdir, app_name)
+    os.makedirs(os.path.join(app_dir, 'uploads'), exist_ok=True)
+    env = dict(os.environ,
+               SURVEY_DB_PATH=os.path.join(app_dir, 'survey_complete.db'),
+               SURVEY_UPLOAD_FOLDER=os.path.join(app_dir, 'uploads'),
+               SURVEY_LOG_DIR=os.path.join(app_dir, 'logs'),
+               SURVEY_ARCHIVE_FOLDER=os.path.join(app_dir, 'archive'),
+               PYTHONDONTWRITEBYTECODE='1')
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--worker', app_name, paths_file, str(repeat)],
+        cwd=app_dir, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        return {'steps': [], 'peak_rss_mb': None, 'error': result.stderr.strip().splitlines()[-1:]}
+    # Приложения печатают отладочные сообщения: результат — последняя строка
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run_suite(scales, repeat, seed, apps, keep_data=False):
+    results = []
+    for scale in scales:
+        workdir = tempfile.mkdtemp(prefix=f'survey-bench-{scale}-')
+        try:
+            started = time.perf_counter()
+            paths = synthetic_data.write_dataset(os.path.join(workdir, 'data'), scale, seed)
+            generate_ms = round((time.perf_counter() - started) * 1000, 2)
+            print(f'[{scale}] данные сгенерированы за {generate_ms / 1000:.1f} с', file=sys.stderr)
+
+            paths_file = os.path.join(workdir, 'paths.json')
+            with open(paths_file, 'w', encoding='utf-8') as f:
+                json.dump(paths, f)
+
+            for app_name in apps:
+                outcome = run_app(app_name, paths_file, workdir, repeat)
+                for step in outcome['steps']:
+                    results.append(dict(step, app=app_name, scale=scale))
+                    print(f"[{scale}] {app_name:9} {step['step']:20} "
+                          f"cold {step['cold_ms']:10.1f} мс  median {step['median_ms']:10.1f} мс",
+                          file=sys.stderr)
+                results.append({'app': app_name, 'scale': scale, 'step': 'peak_rss_mb',
+                                'value': outcome['peak_rss_mb'], 'error': outcome['error']})
+                if outcome['error']:
+                    print(f'[{scale}] {app_name}: ошибка {outcome["error"]}', file=sys.stderr)
+        finally:
+            if keep_data:
+                print(f'[{scale}] данные сохранены в {workdir}', file=sys.stderr)
+            else:
+                shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Сравнивает медианы с базовым прогоном, возвращает список регрессий"""
+    previous = {(item['app'], item['scale'], item['step']): item
+                for item in baseline['results'] if 'median_ms' in item}
+    regressions = []
+    for item in results:
+        old = previous.get((item['app'], item['scale'], item['step']))
+        if old is None or 'median_ms' not in item:
+            continue
+        if item['median_ms'] < MIN_COMPARE_MS and old['median_ms'] < MIN_COMPARE_MS:
+            continue
+        ratio = item['median_ms'] / old['median_ms'] if old['median_ms'] else float('inf')
+        if ratio > threshold:
+            regressions.append({'app': item['app'], 'scale': item['scale'], 'step': item['step'],
+                                'baseline_ms': old['median_ms'], 'median_ms': item['median_ms'],
+                                'ratio': round(ratio, 2)})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Замер производительности на синтетических данных')
+    parser.add_argument('--scales', default=','.join(map(str, DEFAULT_SCALES)),
+                        help='объемы выборки через запятую')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('--seed', type=int, default=synthetic_data.SEED)
+    parser.add_argument('--apps', default=','.join(APPS), help='приложения через запятую')
+    parser.add_argument('--output', help='файл результатов (по умолчанию results/<дата>.json)')
+    parser.add_argument('--compare', help='файл результатов базового прогона')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument('--keep-data', action='store_true', help='не удалять сгенерированные файлы')
+    parser.add_argument('--worker', nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        app_name, paths_file, repeat = args.worker
+        worker(app_name, paths_file, int(repeat))
+        return
+
+    scales = [int(scale) for scale in args.scales.split(',')]
+    apps = [app_name for app_name in args.apps.split(',') if app_name]
+    unknown = set(apps) - set(APPS)
+    if unknown:
+        parser.error(f"неизвестные приложения: {', '.join(sorted(unknown))}")
+
+    results = run_suite(scales, args.repeat, args.seed, apps, args.keep_data)
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': args.seed,
+        'repeat': args.repeat,
+        'scales': scales,
+        'results': results
+    }
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f'Результаты: {output}', file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for item in regressions:
+            print(f"РЕГРЕССИЯ [{item['scale']}] {item['app']} {item['step']}: "
+                  f"{item['baseline_ms']} -> {item['median_ms']} мс (x{item['ratio']})", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print('Регрессий нет', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+Детерминированный генератор синтетических данных опроса.
+
+Респонденты выдаются в точном формате выгрузки анкеты (27 пар
+[вопрос, ответ]: локация, оценки строками "2 - Приемлемо", флажки проблем,
+свободный текст, общая оценка), распределения ответов взяты из реальной
+выгрузки на 124 респондента. Генерация потоковая, от одного
+random.Random(seed): одинаковые (count, seed) всегда дают одинаковые файлы.
+На больших объемах к реальным локациям добавляются филиалы.
+
+Из тех же респондентов строятся файлы для всех приложений:
+- respondents.json — импорт /import_json (survey-report-lite);
+- answers.tsv — импорт ответов респондентов (survey-report);
+- locations.xlsx / questions.xlsx / tasks.xlsx — импорт таблиц (survey-report);
+- responses.db — БД дашборда survey-report-lite-Json.
+
+Использование:
+    python synthetic_data.py 10000 --out /tmp/survey-10k [--seed 42] [--tasks 5000]
+"""
+import os
+import csv
+import json
+import random
+import sqlite3
+import argparse
+from collections import Counter, defaultdict
+
+SEED = 42
+
+LOCATION_QUESTION = 'Укажите важу локацию '
+
+# Локации реальной выгрузки и их доли
+LOCATIONS = [
+    ('Московский офис', 49), ('Домашний офис', 29), ('Завод Энгельс', 9), ('Завод Пермь', 8),
+    ('Завод Ногинск', 7), ('Завод Коломна', 5), ('Завод Тосно', 4), ('Торговый офис', 4),
+    ('Завод Ставрополь', 4), ('Завод Челябинск', 2), ('Завод Новосибирск', 2),
+    ('Склад Хлебниково', 1), ('Склад Москва', 1),
+]
+
+# На больших объемах добавляются филиалы: по одному на BRANCH_EVERY респондентов
+BRANCH_EVERY = 2000
+BRANCH_WEIGHT = 1
+
+LOCATION_CATEGORIES = [('Завод', 'factory'), ('Склад', 'warehouse'), ('Домашний', 'home')]
+
+QUALITY = ['1 - Плохо', '2 - Приемлемо', '3 - Хорошо']
+ONEC = ['1 - Удобно', '2 - Неудобно', '3 - Удовлетворительно']
+
+PROBLEM_QUESTION = ' С какими проблемами вы сталкиваетесь чаще всего? / '
+PROBLEMS = [
+    ('Зависание компьютера', 0.42), ('Медленная работа программ', 0.60),
+    ('Сбои в работе офисных приложений', 0.47), ('Проблемы с печатью', 0.17),
+    ('Сложности с сетевыми дисками', 0.18),
+]
+
+# Оценочные вопросы: (заголовок в выгрузке, вопрос в таблице questions,
+# категория, шкала, варианты ответа, веса)
+RATINGS = {
+    'speed': ('Оцените скорость загрузки системы / Оцените быстроту запуска ПК и программ',
+              'Оцените скорость загрузки системы', 'Производительность',
+              'quality_3', QUALITY, (13, 63, 48)),
+    'stability': ('Оцените стабильность работы системы / Оцените отсутствие зависаний и сбоев ',
+                  'Оцените стабильность работы системы', 'Производительность',
+                  'quality_3', QUALITY, (24, 62, 38)),
+    'monitor': ('Оцените удобство использования монитора и/или экрана ноутбука  / '
+                'Достаточно ли контрастный, светлый, насыщенный',
+                'Оцените удобство использования монитора', 'Оборудование',
+                'quality_3', QUALITY, (11, 48, 65)),
+    'yandex': ('На сколько вы удовлетворены приложениями семейства Яндекс ? / '
+               'Удобство интерфейса, стабильность работы приложения',
+               'На сколько вы удовлетворены приложениями семейства Яндекс?', 'Программное обеспечение',
+               'quality_3', QUALITY, (18, 63, 43)),
+    'office': ('На сколько вы удовлетворены работой пакетов MS Office ?  / '
+               'Удобство интерфейса, стабильность работы приложения',
+               'На сколько вы удовлетворены работой пакетов MS Office?', 'Программное обеспечение',
+               'quality_3', QUALITY, (6, 37, 81)),
+    'onec': ('Как вы оцениваете работу приложения 1С ? / Удобство интерфейса, стабильность работы приложения',
+             'Как вы оцениваете работу приложения 1С?', 'Бизнес-приложения',
+             'onec_3', ONEC, (22, 34, 68)),
+    'bitrix': ('Как вы оцениваете работу приложения Bitrix24\t? / '
+               'Удобство интерфейса, стабильность работы приложения',
+               'Как вы оцениваете работу приложения Bitrix24?', 'Бизнес-приложения',
+               'onec_3', ONEC, (32, 22, 70)),
+    'thirdparty': ('Оцените пакет сторонних приложений установленных на ваш ПК '
+                   '( Крипто ПРО, нандо КАД, PDF Editor...) / Удобство интерфейса, стабильность работы приложения',
+                   'Оцените пакет сторонних приложений (Крипто ПРО, нандо КАД, PDF Editor...)',
+                   'Специализированные приложения', 'onec_3', ONEC, (43, 14, 67)),
+    'updates': ('Оцените частоту и удобство установки обновлений ПО и ОС / Кратко оцените работу '
+                'обновлений программного обеспечения и операционной системы.',
+                'Оцените частоту и удобство установки обновлений ПО и ОС', 'Обслуживание',
+                'quality_3', QUALITY, (16, 65, 43)),
+}
+
+OVERALL_QUESTION = 'Общая удовлетворенность рабочего места'
+OVERALL_SCORES = [str(score) for score in range(3, 11)]
+OVERALL_WEIGHTS = (4, 5, 10, 27, 23, 29, 15, 11)
+
+SUGGESTIONS_QUESTION = 'Ваши предложения по улучшению'
+NEEDS_QUESTION = ('На сколько стандартные приложения покрывают ваши потребности для выполнения '
+                  'должностных обязанностей. Какие дополнительные приложения могли бы быть полезны вам для работы ?')
+
+# Категории ответов по шкалам, как в scoring.DEFAULT_SCALES
+SCALE_BUCKETS = {
+    'quality_3': {1: 'negative', 2: 'neutral', 3: 'positive'},
+    'onec_3': {1: 'positive', 2: 'negative', 3: 'neutral'},
+    'score_10': {n: 'positive' if n >= 8 else 'neutral' if n >= 6 else 'negative' for n in range(1, 11)},
+}
+
+# Свободный текст собирается из фрагментов, чтобы словарь был разнообразным
+TEXT_SUBJECTS = ['ноутбук', 'компьютер', 'принтер', 'монитор', 'VPN', '1С', 'Битрикс', 'почта',
+                 'сетевой диск', 'Яндекс Мессенджер', 'телефония', 'Wi-Fi', 'обновления Windows',
+                 'КриптоПро', 'антивирус', 'Outlook']
+TEXT_PROBLEMS = ['медленно работает', 'часто зависает', 'не подключается утром', 'долго загружается',
+                 'выдает ошибки при запуске', 'теряет соединение', 'неудобный интерфейс',
+                 'не хватает прав доступа', 'перегружается без предупреждения']
+TEXT_WISHES = ['заменить на новый', 'добавить инструкцию', 'увеличить память', 'ускорить поддержку',
+               'вернуть WhatsApp и Telegram', 'поставить второй монитор', 'обучить сотрудников',
+               'обновлять вне рабочего времени']
+
+TASK_STATUSES = [('✅ Выполнено', 5), ('В работе', 3), ('Запланировано', 2)]
+TASK_CATEGORIES = ['Обновление ПО', 'Новые системы', 'Безопасность', 'Инфраструктура', 'Оборудование']
+
+
+def location_names(count):
+    """Список (локация, вес) для выборки из count респондентов"""
+    branches = [(f'Филиал {number:03d}', BRANCH_WEIGHT) for number in range(1, count // BRANCH_EVERY + 1)]
+    return LOCATIONS + branches
+
+
+def location_category(name):
+    for prefix, category in LOCATION_CATEGORIES:
+        if name.startswith(prefix):
+            return category
+    return 'office'
+
+
+def _text(rng):
+    subject = rng.choice(TEXT_SUBJECTS)
+    text = f'{subject} {rng.choice(TEXT_PROBLEMS)}'
+    if rng.random() < 0.6:
+        text += f', прошу {rng.choice(TEXT_WISHES)}'
+    return text[0].upper() + text[1:]
+
+
+def _comment(rng, probability):
+    """Комментарий к оценке: пусто, прочерк или текст"""
+    roll = rng.random()
+    if roll < probability:
+        return _text(rng)
+    return '-' if roll < probability + 0.2 else ''
+
+
+def respondents(count, seed=SEED):
+    """Генерирует count респондентов в формате выгрузки (список из 27 пар)"""
+    rng = random.Random(seed)
+    names, weights = zip(*location_names(count))
+
+    def rating(key):
+        title, _, _, _, options, option_weights = RATINGS[key]
+        return [title, rng.choices(options, option_weights)[0]]
+
+    for _ in range(count):
+        overall = rng.choices(OVERALL_SCORES, OVERALL_WEIGHTS)[0]
+        yield [
+            [LOCATION_QUESTION, rng.choices(names, weights)[0]],
+            rating('speed'),
+            rating('stability'),
+            rating('monitor'),
+            *[[PROBLEM_QUESTION + problem, problem if rng.random() < probability else '']
+              for problem, probability in PROBLEMS],
+            [SUGGESTIONS_QUESTION, _text(rng) if rng.random() < 0.4 else ''],
+            rating('yandex'),
+            ['', _comment(rng, 0.25)],
+            rating('office'),
+            ['', _comment(rng, 0.15)],
+            rating('onec'),
+            ['', _comment(rng, 0.3)],
+            rating('bitrix'),
+            ['Оцените работу Bitrix24', _comment(rng, 0.3)],
+            rating('thirdparty'),
+            ['', _comment(rng, 0.2)],
+            rating('updates'),
+            [NEEDS_QUESTION, _comment(rng, 0.3)],
+            [OVERALL_QUESTION, overall],
+            [f'{OVERALL_QUESTION} / Баллы', ''],
+            ['Набрано баллов', '0'],
+            ['Всего баллов', '0'],
+            ['Результат теста', ''],
+        ]
+
+
+def tasks(count, locations, seed=SEED):
+    """Генерирует count задач: (ключ, описание, статус, категория, локация, приоритет)"""
+    rng = random.Random(seed + 1)
+    statuses, status_weights = zip(*TASK_STATUSES)
+    scopes = ['Все локации', 'Все офисы'] + [name for name, _ in locations]
+    for number in range(1, count + 1):
+        yield (f'ITPROD-{number:06d}',
+               f'{rng.choice(TEXT_WISHES).capitalize()}: {rng.choice(TEXT_SUBJECTS)}',
+               rng.choices(statuses, status_weights)[0],
+               rng.choice(TASK_CATEGORIES),
+               rng.choice(scopes),
+               rng.randint(1, 5))
+
+
+class SurveyTotals:
+    """Агрегаты по респондентам для листов locations / questions"""
+
+    def __init__(self):
+        self.locations = Counter()
+        self.overall = defaultdict(int)
+        self.problems = defaultdict(Counter)
+        self.buckets = defaultdict(Counter)
+
+    def add(self, respondent):
+        answers = {question: answer for question, answer in respondent}
+        location = answers[LOCATION_QUESTION]
+        overall = int(answers[OVERALL_QUESTION])
+        self.locations[location] += 1
+        self.overall[location] += overall
+        for problem, _ in PROBLEMS:
+            if answers[PROBLEM_QUESTION + problem]:
+                self.problems[location][problem] += 1
+        for title, question_text, _, scale, _, _ in RATINGS.values():
+            value = int(answers[title].split(' ', 1)[0])
+            self.buckets[question_text][SCALE_BUCKETS[scale][value]] += 1
+        self.buckets[OVERALL_QUESTION][SCALE_BUCKETS['score_10'][overall]] += 1
+
+    def location_rows(self):
+        for name, responses in self.locations.most_common():
+            problems = ', '.join(problem for problem, _ in self.problems[name].most_common(2))
+            yield (name, location_category(name), responses,
+                   round(self.overall[name] / responses, 1), problems)
+
+    def question_rows(self):
+        categories = {question_text: category for _, question_text, category, _, _, _ in RATINGS.values()}
+        categories[OVERALL_QUESTION] = 'Общая оценка'
+        for question_text, counts in self.buckets.items():
+            total = sum(counts.values())
+            percent = (counts['positive'] * 100 + counts['neutral'] * 50) / total
+            yield (question_text, categories[question_text], total, counts['positive'],
+                   counts['neutral'], counts['negative'], round(percent, 1), 'Все локации')
+
+
+def write_sheet(path, header, rows):
+    """Пишет лист Excel потоково (openpyxl в режиме write_only)"""
+    from openpyxl import Workbook
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(header)
+    for row in rows:
+        sheet.append(row)
+    workbook.save(path)
+
+
+def write_responses_db(path, respondents_iter):
+    """
+    Пишет БД в схеме дашборда survey-report-lite-Json:
+    responses / questions / question_responses.
+    """
+    if os.path.exists(path):
+        os.remove(path)
+    conn = sqlite3.connect(path)
+    conn.executescript('''
+        CREATE TABLE responses (
+            id INTEGER PRIMARY KEY,
+            location TEXT,
+            overall_satisfaction TEXT
+        );
+        CREATE TABLE questions (
+            id INTEGER PRIMARY KEY,
+            original_text TEXT,
+            question_type TEXT
+        );
+        CREATE TABLE question_responses (
+            response_id INTEGER,
+            question_id INTEGER,
+            question_text TEXT,
+            answer_text TEXT,
+            rating_value INTEGER,
+            is_rating INTEGER
+        );
+    ''')
+    question_ids = {}
+    batch = []
+    for response_id, respondent in enumerate(respondents_iter, 1):
+        answers = {question: answer for question, answer in respondent}
+        conn.execute("INSERT INTO responses (id, location, overall_satisfaction) VALUES (?, ?, ?)",
+                     (response_id, answers[LOCATION_QUESTION], answers[OVERALL_QUESTION]))
+        for question, answer in respondent:
+            if not question.strip() or question == LOCATION_QUESTION:
+                continue
+            if question not in question_ids:
+                lowered = question.lower()
+                if PROBLEM_QUESTION.strip().lower() in lowered:
+                    question_type = 'multiple_choice'
+                elif lowered in (SUGGESTIONS_QUESTION.lower(), NEEDS_QUESTION.lower()):
+                    question_type = 'free_text'
+                else:
+                    question_type = 'rating'
+                question_ids[question] = len(question_ids) + 1
+                conn.execute("INSERT INTO questions (id, original_text, question_type) VALUES (?, ?, ?)",
+                             (question_ids[question], question, question_type))
+            rating, text = None, answer
+            head, _, label = answer.partition(' - ')
+            if head.isdigit() and label:
+                rating, text = int(head), label
+            batch.append((response_id, question_ids[question], question, text, rating, int(rating is not None)))
+        if len(batch) >= 5000:
+            conn.executemany("INSERT INTO question_responses VALUES (?, ?, ?, ?, ?, ?)", batch)
+            batch = []
+    if batch:
+        conn.executemany("INSERT INTO question_responses VALUES (?, ?, ?, ?, ?, ?)", batch)
+    conn.execute("CREATE INDEX ix_question_responses_response ON question_responses (response_id, question_id)")
+    conn.commit()
+    conn.close()
+
+
+def write_dataset(directory, count, seed=SEED, task_count=None):
+    """
+    Генерирует полный набор файлов для count респондентов.
+    Респонденты выдаются одним проходом: JSON и TSV пишутся потоково,
+    агрегаты для листов Excel накапливаются по ходу. Возвращает пути файлов.
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = {name: os.path.join(directory, filename) for name, filename in [
+        ('json', 'respondents.json'), ('answers', 'answers.tsv'), ('locations', 'locations.xlsx'),
+        ('questions', 'questions.xlsx'), ('tasks', 'tasks.xlsx'), ('responses_db', 'responses.db')]}
+
+    totals = SurveyTotals()
+    with open(paths['json'], 'w', encoding='utf-8') as json_file, \
+            open(paths['answers'], 'w', encoding='utf-8', newline='') as answers_file:
+        writer = csv.writer(answers_file, delimiter='\t')
+        json_file.write('[')
+        for index, respondent in enumerate(respondents(count, seed)):
+            if index == 0:
+                writer.writerow([question for question, _ in respondent])
+            else:
+                json_file.write(',\n')
+            json.dump(respondent, json_file, ensure_ascii=False)
+            writer.writerow([answer for _, answer in respondent])
+            totals.add(respondent)
+        json_file.write(']')
+
+    write_sheet(paths['locations'], ['Название', 'Категория', 'Ответы', 'Удовлетворенность', 'Проблемы'],
+                totals.location_rows())
+    write_sheet(paths['questions'], ['Вопрос', 'Категория', 'Всего ответов', 'Положительные',
+                                     'Нейтральные', 'Отрицательные', 'Удовлетворенность', 'Локация'],
+                totals.question_rows())
+    write_sheet(paths['tasks'], ['Ключ', 'Описание', 'Статус', 'Категория', 'Локация', 'Приоритет'],
+                tasks(count if task_count is None else task_count, location_names(count), seed))
+    write_responses_db(paths['responses_db'], respondents(count, seed))
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Генерация синтетических данных опроса')
+    parser.add_argument('count', type=int, help='количество респондентов')
+    parser.add_argument('--out', required=True, help='каталог для файлов')
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--tasks', type=int, default=None, help='количество задач (по умолчанию = count)')
+    args = parser.parse_args()
+
+    paths = write_dataset(args.out, args.count, args.seed, args.tasks)
+    for name, path in paths.items():
+        print(f'{name:14} {path} ({os.path.getsize(path) / 1024:.0f} КБ)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Matplotlib chart rendering without pyplot.
+
+Charts use the object-oriented API (Figure + FigureCanvasAgg): pyplot keeps
+a global "current figure", so concurrent requests in threads interfere with
+each other. Here every thread has its own figures, one per chart template;
+a figure is cleared and reused rather than created again.
+
+A template (ChartTemplate) sets the size, dpi and styling. rcParams are set
+once at import, and warmup() renders every template with Cyrillic text at
+worker start, so font lookup and parsing, the backend import and the text
+layout caches are filled before the first request (matplotlib keeps FT2Font
+objects per thread).
+
+The output format is SURVEY_CHART_FORMAT: svg (the default; text stays text
+rather than glyph outlines, the file is several times smaller than PNG and
+scales to the page width), png or webp. render() returns a ChartImage, the
+image bytes and MIME type (for storing in the database or a data URI).
+The number of bars is capped: top_n() keeps the largest items and merges the
+rest into "Прочие", so chart size and render time do not grow with the
+number of locations or answer options.
+
+ChartPool renders several charts at once in a process pool (Agg is bound by
+CPU and the GIL, threads do not help), so a batch takes as long as its
+slowest chart rather than the sum. Jobs are module-level functions with
+plain arguments (they can be sent to another process). Charts that time out
+or fail are replaced with a placeholder.
+
+Pool size is SURVEY_CHART_WORKERS and defaults to 0: charts render inline,
+one after another. The pool belongs to one application process, so under
+gunicorn the total is workers x SURVEY_CHART_WORKERS chart processes; charts
+are only rendered on import and by the render-charts command, so keep it
+small (1-2) if you enable it at all.
+"""
+import io
+import os
+import hashlib
+import atexit
+import base64
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from collections import namedtuple
+from dataclasses import dataclass
+
+import matplotlib
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+# Global settings, read-only after import
+matplotlib.rcParams.update({
+    'font.family': 'DejaVu Sans',  # has Cyrillic, ships with matplotlib
+    'axes.titleweight': 'bold',
+    'savefig.format': 'png',
+    # SVG: text is not converted to paths, ids are stable (same data, same bytes)
+    'svg.fonttype': 'none',
+    'svg.hashsalt': 'survey-report',
+})
+
+WARMUP_TEXT = 'Удовлетворенность по локациям 0123456789 %'
+
+# Chart pool processes per application process (0: render inline, one by one)
+CHART_WORKERS = int(os.environ.get('SURVEY_CHART_WORKERS') or 0)
+
+# How long to wait for a batch of charts, seconds
+CHART_TIMEOUT = float(os.environ.get('SURVEY_CHART_TIMEOUT') or 10)
+
+PLACEHOLDER_TEXT = 'График временно недоступен'
+
+MIME_TYPES = {'svg': 'image/svg+xml', 'png': 'image/png', 'webp': 'image/webp'}
+
+CHART_FORMAT = os.environ.get('SURVEY_CHART_FORMAT', 'svg')
+if CHART_FORMAT not in MIME_TYPES:
+    raise ValueError(f'SURVEY_CHART_FORMAT: unknown format {CHART_FORMAT!r}')
+
+OTHER_LABEL = 'Прочие'
+
+
+class ChartImage(namedtuple('ChartImage', 'mimetype data')):
+    """A rendered chart image."""
+    __slots__ = ()
+
+    @property
+    def digest(self):
+        return hashlib.sha1(self.data).hexdigest()[:16]
+
+    @property
+    def data_uri(self):
+        return f'data:{self.mimetype};base64,' + base64.b64encode(self.data).decode('ascii')
+
+
+def shorten(label, width):
+    """Label cut to at most width characters."""
+    label = str(label)
+    return label if len(label) <= width else label[:width - 1].rstrip() + '…'
+
+
+def top_n(items, limit, weight, merge):
+    """
+    At most limit items: the limit - 1 heaviest (by weight(item)) plus
+    merge(rest) as one summary item. A short list is returned unchanged.
+    """
+    items = list(items)
+    if limit <= 0 or len(items) <= limit:
+        return items
+    ranked = sorted(items, key=weight, reverse=True)
+    return ranked[:limit - 1] + [merge(ranked[limit - 1:])]
+
+
+@dataclass(frozen=True)
+class ChartTemplate:
+    figsize: tuple = (10, 6)
+    dpi: int = 100
+    title_size: int = 14
+    label_size: int = 12
+    # bbox_inches='tight' when saving
+    tight_bbox: bool = True
+    # Bars to draw (the rest are merged into "Прочие") and label length
+    max_items: int = 20
+    label_chars: int = 30
+    # Height per bar, inches: a horizontal chart is no taller than needed (0: fixed height)
+    item_height: float = 0
+
+
+class ChartEngine:
+    def __init__(self, templates, fmt=CHART_FORMAT):
+        self.templates = dict(templates)
+        self.fmt = fmt
+        self._local = threading.local()
+        self._placeholders = {}
+
+    def _figure(self, name):
+        """The template's figure for the current thread (created on first use)."""
+        figures = getattr(self._local, 'figures', None)
+        if figures is None:
+            figures = self._local.figures = {}
+        fig = figures.get(name)
+        if fig is None:
+            template = self.templates[name]
+            fig = Figure(figsize=template.figsize, dpi=template.dpi)
+            FigureCanvasAgg(fig)
+            figures[name] = fig
+        else:
+            fig.clear()
+        return fig
+
+    def render(self, name, draw, items=None):
+        """
+        Render a chart with template name: draw(ax, template) fills the axes.
+        items is the number of bars (for templates with item_height).
+        Returns a ChartImage in self.fmt.
+        """
+        template = self.templates[name]
+        fig = self._figure(name)
+        width, height = template.figsize
+        if template.item_height and items:
+            height = min(height, 1.5 + items * template.item_height)
+        fig.set_size_inches(width, height)
+        ax = fig.add_subplot()
+        draw(ax, template)
+        fig.tight_layout()
+
+        buf = io.BytesIO()
+        # No date in the SVG metadata: the same data gives the same file
+        fig.savefig(buf, format=self.fmt, dpi=template.dpi,
+                    bbox_inches='tight' if template.tight_bbox else None,
+                    metadata={'Date': None} if self.fmt == 'svg' else None)
+        # Axes and artists are no longer needed; the figure is kept for the next chart
+        fig.clear()
+        return ChartImage(MIME_TYPES[self.fmt], buf.getvalue())
+
+    def placeholder(self, name, text=PLACEHOLDER_TEXT):
+        """Placeholder chart: template name with centred text (cached)."""
+        key = (name, text)
+        if key not in self._placeholders:
+            def draw(ax, template):
+                ax.set_axis_off()
+                ax.text(0.5, 0.5, text, ha='center', va='center', fontsize=template.title_size, color='#7f8c8d')
+            self._placeholders[key] = self.render(name, draw)
+        return self._placeholders[key]
+
+    def warmup(self):
+        """Render every template once to warm up fonts and the glyph cache."""
+        def draw(ax, template):
+            bars = ax.barh([WARMUP_TEXT[:12], WARMUP_TEXT[13:25]], [1, 2])
+            ax.set_title(WARMUP_TEXT, fontsize=template.title_size)
+            ax.set_xlabel(WARMUP_TEXT, fontsize=template.label_size)
+            ax.text(bars[0].get_width(), 0, WARMUP_TEXT)
+
+        for name in self.templates:
+            self.render(name, draw)
+
+
+def _ping():
+    return os.getpid()
+
+
+class ChartPool:
+    """
+    Process pool for charts. Processes start with forkserver (or spawn): a
+    child does not inherit the web server's threads and database connections
+    and imports only the module with the chart function.
+    """
+
+    def __init__(self, workers=CHART_WORKERS, timeout=CHART_TIMEOUT):
+        self.workers = workers
+        self.timeout = timeout
+        self._executor = None
+        self._lock = threading.Lock()
+        self.timeouts = 0
+        self.failures = 0
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+                atexit.register(self._executor.shutdown, wait=False, cancel_futures=True)
+            return self._executor
+
+    def _reset(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def start(self):
+        """Start the processes up front so the first batch does not wait for them."""
+        if self.workers:
+            executor = self._get_executor()
+            for future in [executor.submit(_ping) for _ in range(self.workers)]:
+                future.result()
+
+    def render_many(self, jobs, placeholder=None):
+        """
+        Render charts concurrently. jobs is {name: (function, args)}.
+        Returns {name: result}; placeholder(name) on timeout or error.
+        """
+        if not jobs:
+            return {}
+        if not self.workers:
+            return {name: self._render_inline(name, func, args, placeholder)
+                    for name, (func, args) in jobs.items()}
+
+        executor = self._get_executor()
+        try:
+            futures = {name: executor.submit(func, *args) for name, (func, args) in jobs.items()}
+        except BrokenProcessPool:
+            self._reset(executor)
+            executor = self._get_executor()
+            futures = {name: executor.submit(func, *args) for name, (func, args) in jobs.items()}
+        wait(futures.values(), timeout=self.timeout)
+
+        results = {}
+        for name, future in futures.items():
+            if not future.done():
+                # A queued job is cancelled; a running one finishes for nothing
+                future.cancel()
+                self.timeouts += 1
+                results[name] = placeholder(name) if placeholder else None
+                continue
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                if isinstance(e, BrokenProcessPool):
+                    self._reset(executor)
+                self._failed(name, e)
+                results[name] = placeholder(name) if placeholder else None
+        return results
+
+    def _render_inline(self, name, func, args, placeholder):
+        try:
+            return func(*args)
+        except Exception as e:
+            self._failed(name, e)
+            return placeholder(name) if placeholder else None
+
+    def _failed(self, name, error):
+        self.failures += 1
+        print(f"Chart {name} failed: {error}")
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Rendered charts stored in the database.
+
+Charts depend only on the loaded data, so they are rendered once, after an
+import or by the render-charts command, and kept in the chart_images table
+(image bytes, MIME type and digest). Pages link to /charts/<name>/<digest>:
+the URL changes with the content, so browsers cache the image forever and
+serving a page never calls matplotlib.
+
+source is an optional fingerprint of the chart's input data (source_digest);
+it shows that the data changed and the chart needs re-rendering.
+"""
+import os
+import sys
+import json
+import hashlib
+import subprocess
+
+from flask import abort, make_response, url_for
+
+# The image behind a digest URL never changes
+CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def init_chart_table(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS chart_images (
+            name TEXT PRIMARY KEY,
+            mimetype TEXT NOT NULL,
+            data BLOB NOT NULL,
+            digest TEXT NOT NULL,
+            source TEXT,
+            rendered_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.commit()
+
+
+def source_digest(inputs):
+    """Fingerprint of a chart's input data (any JSON-serialisable values)."""
+    encoded = json.dumps(inputs, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()
+
+
+def save_chart(conn, name, image, source=None):
+    """Store a chart (ChartImage); None deletes it (no data for the chart)."""
+    if image is None:
+        conn.execute("DELETE FROM chart_images WHERE name = ?", (name,))
+        return
+    conn.execute('''
+        INSERT INTO chart_images (name, mimetype, data, digest, source) VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(name) DO UPDATE SET mimetype = excluded.mimetype, data = excluded.data,
+            digest = excluded.digest, source = excluded.source, rendered_at = CURRENT_TIMESTAMP
+    ''', (name, image.mimetype, image.data, image.digest, source))
+
+
+def stored_charts(conn):
+    """Stored charts without the images: {name: {'digest': ..., 'source': ...}}."""
+    rows = conn.execute("SELECT name, digest, source FROM chart_images").fetchall()
+    return {row[0]: {'digest': row[1], 'source': row[2]} for row in rows}
+
+
+def render_after_import(db_path):
+    """
+    Re-render the dashboard charts whose data changed, for data-loading
+    scripts: runs `flask render-charts --stale-only` on db_path in a separate
+    process (matplotlib and the chart pool stay out of the script). Returns
+    None, or the error output when rendering failed.
+    """
+    env = dict(os.environ, SURVEY_DB_PATH=os.path.abspath(db_path))
+    result = subprocess.run(
+        [sys.executable, '-m', 'flask', '--app', 'final_with_charts', 'render-charts', '--stale-only'],
+        cwd=APP_DIR, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        return result.stderr.strip() or f'render-charts exited with {result.returncode}'
+    return None
+
+
+def chart_url(name, digest):
+    return url_for('chart_image', name=name, digest=digest)
+
+
+def init_app(app, connect):
+    """Register /charts/<name>/<digest>; connect() opens the app's database."""
+    def chart_image(name, digest):
+        conn = connect()
+        row = conn.execute("SELECT mimetype, data FROM chart_images WHERE name = ? AND digest = ?",
+                           (name, digest)).fetchone()
+        conn.close()
+        if row is None:
+            abort(404)
+        response = make_response(bytes(row[1]))
+        response.mimetype = row[0]
+        response.set_etag(digest)
+        response.headers['Cache-Control'] = CACHE_CONTROL
+        return response
+
+    app.add_url_rule('/charts/<name>/<digest>', 'chart_image', chart_image)
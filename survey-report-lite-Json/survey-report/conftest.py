@@ -0,0 +1,67 @@
+"""
+Shared test fixtures: the app is imported with its database and log
+directories in a temporary directory; every test gets its own database.
+"""
+import os
+import sqlite3
+import tempfile
+
+import pytest
+
+# A manual import script, not a test module
+collect_ignore = ['test_json_import.py']
+
+_root = tempfile.mkdtemp(prefix='survey-json-tests-')
+for name, value in (('SURVEY_DB_PATH', os.path.join(_root, 'survey.db')),
+                    ('SURVEY_LOG_DIR', os.path.join(_root, 'logs')),
+                    ('SURVEY_PROFILE_DIR', os.path.join(_root, 'profiles'))):
+    os.environ.setdefault(name, value)
+
+# Schema written by the import scripts: question_responses has no explicit key
+SURVEY_SCHEMA = '''
+    CREATE TABLE responses (id INTEGER PRIMARY KEY, location TEXT, overall_satisfaction TEXT);
+    CREATE TABLE questions (id INTEGER PRIMARY KEY, original_text TEXT, question_type TEXT);
+    CREATE TABLE question_responses (
+        response_id INTEGER, question_id INTEGER, question_text TEXT,
+        answer_text TEXT, rating_value INTEGER, is_rating INTEGER
+    );
+    CREATE INDEX ix_question_responses_response ON question_responses (response_id, question_id);
+'''
+
+
+@pytest.fixture
+def app_module(tmp_path, monkeypatch):
+    """The app module, switched to an empty database in tmp_path."""
+    import final_with_charts
+    monkeypatch.setattr(final_with_charts, 'DB_PATH', str(tmp_path / 'survey.db'))
+    final_with_charts.response_cache.invalidate()
+    return final_with_charts
+
+
+@pytest.fixture
+def survey_db(app_module):
+    """Connection to the test database with the survey schema (call init_db() as needed)."""
+    connection = sqlite3.connect(app_module.DB_PATH)
+    connection.executescript(SURVEY_SCHEMA)
+    yield connection
+    connection.close()
+
+
+@pytest.fixture
+def add_answers(survey_db):
+    """add_answers(location, [(question, question_type, answer_text, rating), ...]) — one respondent."""
+    def add(location, answers):
+        response_id = survey_db.execute("INSERT INTO responses (location, overall_satisfaction) VALUES (?, '7')",
+                                        (location,)).lastrowid
+        for question, question_type, answer, rating in answers:
+            row = survey_db.execute("SELECT id FROM questions WHERE original_text = ?", (question,)).fetchone()
+            question_id = row[0] if row else survey_db.execute(
+                "INSERT INTO questions (original_text, question_type) VALUES (?, ?)",
+                (question, question_type)).lastrowid
+            survey_db.execute("""
+                INSERT INTO question_responses
+                    (response_id, question_id, question_text, answer_text, rating_value, is_rating)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (response_id, question_id, question, answer, rating, int(rating is not None)))
+        survey_db.commit()
+    return add
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Dashboard chart rendering.
+
+Kept out of final_with_charts so that chart pool workers can import the
+chart function without importing the Flask app (and opening its logs,
+caches and database).
+"""
+from chart_engine import ChartEngine, ChartTemplate, top_n, shorten, OTHER_LABEL
+
+# Chart templates, rendered through the object-oriented API (thread-safe)
+charts = ChartEngine({
+    'bar': ChartTemplate(figsize=(10, 6), tight_bbox=False),
+    'pie': ChartTemplate(figsize=(10, 6), tight_bbox=False),
+})
+charts.warmup()
+
+def merge_other(rest):
+    """Single "other" bar summing the smallest categories."""
+    return (f'{OTHER_LABEL} ({len(rest)})', sum(value for _, value in rest))
+
+def generate_chart_image(data_dict, title, chart_type='bar'):
+    """Render a chart; returns a ChartImage, or None when there is no data."""
+    if not data_dict:
+        return None
+    
+    # Prepare data: the largest categories plus one "other" bar
+    template = charts.templates[chart_type if chart_type in charts.templates else 'bar']
+    items = top_n(data_dict.items(), template.max_items, lambda item: item[1], merge_other)
+    labels = [shorten(label, template.label_chars) for label, _ in items]
+    values = [value for _, value in items]
+    
+    def draw(ax, template):
+        if chart_type == 'bar':
+            bars = ax.bar(range(len(labels)), values)
+            ax.set_xticks(range(len(labels)), labels)
+            ax.tick_params(axis='x', labelrotation=45)
+            for tick in ax.get_xticklabels():
+                tick.set_horizontalalignment('right')
+            
+            # Add value labels on bars
+            for bar, value in zip(bars, values):
+                height = bar.get_height()
+                ax.text(bar.get_x() + bar.get_width()/2., height + max(values)*0.01,
+                        f'{value}', ha='center', va='bottom', fontsize=9)
+        
+        elif chart_type == 'pie':
+            ax.pie(values, labels=labels, autopct='%1.1f%%', startangle=90)
+            ax.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle.
+        
+        ax.set_title(title, fontweight='normal')
+    
+    return charts.render(chart_type if chart_type in charts.templates else 'bar', draw)
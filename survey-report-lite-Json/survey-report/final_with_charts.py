@@ -7,27 +7,151 @@ import sqlite3
 import json
 from collections import Counter, defaultdict
 import math
-from flask import Flask, render_template, request, jsonify, send_file
+import click
+from flask import Flask, render_template, request, send_file, g
 import os
 import pandas as pd
 from datetime import datetime
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-import io
-import base64
+from response_cache import ResponseCache, db_file_version, compress_response
+from assets import AssetPipeline
+from stats_payload import build_columnar_payload, payload_response, stats_payload_response
+from chart_engine import ChartPool
+from dashboard_charts import charts, generate_chart_image
+import chart_store
+from chart_store import init_chart_table, source_digest, save_chart, stored_charts, chart_url
+from text_search import ensure_search_index, search, PAGE_SIZE as SEARCH_PAGE_SIZE
+import metrics
+from metrics import timed
+from profiling import RequestProfiler
+import request_log
 
 app = Flask(__name__)
 
-# Database path
-DB_PATH = 'survey_complete.db'
+# JSON-lines access and slow-query logs; registered first so it sees the final response
+request_log.init_app(app, os.environ.get('SURVEY_LOG_DIR', 'logs'))
+# Request/span timing and the /metrics endpoint
+metrics.init_app(app)
+# Slow-request profiles (SURVEY_PROFILE_SLOW_MS), listed at /debug/profiles
+profiler = RequestProfiler(os.environ.get('SURVEY_PROFILE_DIR', 'profiles')).init_app(app)
+
+# Database path (overridable, e.g. for benchmarks)
+DB_PATH = os.environ.get('SURVEY_DB_PATH', 'survey_complete.db')
+
+# Rendered pages are cached until the database file changes
+response_cache = ResponseCache(lambda: db_file_version(DB_PATH))
+metrics.register_cache('response_cache', response_cache)
+
+# Static assets (minified, fingerprinted, cached forever) and response compression
+assets = AssetPipeline(app)
+assets.prebuild()
+app.after_request(compress_response)
+
+# Dashboard chart renderer: inline by default, a process pool with SURVEY_CHART_WORKERS > 0
+chart_pool = ChartPool()
+# Rendered at startup: serving a page never calls matplotlib
+chart_placeholder = charts.placeholder('bar', 'График еще не построен').data_uri
 
 def get_db_connection():
     """Create database connection."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = metrics.connect(DB_PATH)
     conn.row_factory = sqlite3.Row
     return conn
 
+# Stored chart images: /charts/<name>/<digest>
+chart_store.init_app(app, get_db_connection)
+
+# Questions treated as free text even without question_type = 'free_text'
+FREE_TEXT_KEYWORDS = ('предложения', 'предложение', 'какие дополнительные', 'покрывают ваши потребности')
+
+def is_free_text_question(question_type, original_text):
+    """Open-ended question: by its type or by its wording."""
+    return question_type == 'free_text' or any(keyword in original_text.lower() for keyword in FREE_TEXT_KEYWORDS)
+
+def _mentions_keyword(expr):
+    # SQLite lower() only folds ASCII, so match the keyword as is and capitalized
+    return ' OR '.join(f"instr({expr}, '{variant}') > 0"
+                       for keyword in FREE_TEXT_KEYWORDS for variant in (keyword, keyword.capitalize()))
+
+# SQL counterpart of is_free_text_question for a question_responses row ({row} is its alias):
+# non-empty answers to free-text questions, by type or by wording (the response's own
+# question text when the question has no original text)
+FREE_TEXT_ANSWER_SQL = f"""
+    trim(COALESCE({{row}}.answer_text, '')) != '' AND (
+        {{row}}.question_id IN (SELECT id FROM questions
+                              WHERE question_type = 'free_text' OR {_mentions_keyword("COALESCE(original_text, '')")})
+        OR (({_mentions_keyword("COALESCE({row}.question_text, '')")})
+            AND {{row}}.question_id NOT IN (SELECT id FROM questions WHERE COALESCE(original_text, '') != ''))
+    )
+"""
+
+def has_integer_key(conn, table, key='id'):
+    """Whether the table exists and has key as its explicit INTEGER PRIMARY KEY."""
+    columns = conn.execute(f"PRAGMA table_info({table})").fetchall()
+    return any(column['name'] == key and column['pk'] for column in columns)
+
+def has_legacy_answer_index(conn):
+    """An index left by earlier versions: it covered all answers and keyed them by the implicit rowid."""
+    indexed = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'answers_fts'").fetchone()
+    return indexed is not None and 'content=' in indexed[0]
+
+def answer_search_ready(conn):
+    """The answer index exists and is keyed by the explicit question_responses.id."""
+    return (has_integer_key(conn, 'question_responses') and not has_legacy_answer_index(conn)
+            and conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'answers_fts'").fetchone() is not None)
+
+def ensure_integer_key(conn, table, key='id'):
+    """
+    Give a table an explicit INTEGER PRIMARY KEY (copied from the implicit
+    rowid). Implicit rowids can be renumbered by VACUUM, so nothing that
+    stores row references (the search index) may rely on them. Rewrites the
+    table: run only from `flask migrate-db`. Returns True if it was rewritten.
+    """
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        columns = conn.execute(f"PRAGMA table_info({table})").fetchall()
+        # Nothing to migrate: no such table yet, or the key is already explicit
+        if not columns or any(column['name'] == key and column['pk'] for column in columns):
+            conn.commit()
+            return False
+        indexes = [row[0] for row in conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (table,))]
+        names = ', '.join(column['name'] for column in columns)
+        definitions = ', '.join(f"{column['name']} {column['type']}".strip() for column in columns)
+        conn.execute(f"CREATE TABLE {table}_migrated ({key} INTEGER PRIMARY KEY, {definitions})")
+        conn.execute(f"INSERT INTO {table}_migrated ({key}, {names}) SELECT rowid, {names} FROM {table} ORDER BY rowid")
+        # Dropping the table also drops its triggers (e.g. of an older search index)
+        conn.execute(f"DROP TABLE {table}")
+        conn.execute(f"ALTER TABLE {table}_migrated RENAME TO {table}")
+        for sql in indexes:
+            conn.execute(sql)
+        conn.commit()
+        return True
+    except Exception:
+        conn.rollback()
+        raise
+
+def ensure_answer_index(conn):
+    """Free-text answer search index; kept in sync by triggers."""
+    ensure_search_index(conn, 'question_responses', 'answer_text', 'answers_fts', FREE_TEXT_ANSWER_SQL)
+
+def init_db():
+    """
+    Indexes and tables of derived data; run once at startup, not on requests.
+    Never rewrites or drops user data: a database from an earlier version is
+    upgraded by `flask migrate-db`, search stays off until then.
+    """
+    conn = get_db_connection()
+    try:
+        if has_integer_key(conn, 'question_responses') and not has_legacy_answer_index(conn):
+            ensure_answer_index(conn)
+        elif conn.execute("PRAGMA table_info(question_responses)").fetchone() is not None:
+            print('question_responses needs migration for search: run flask migrate-db')
+        init_chart_table(conn)
+    finally:
+        conn.close()
+
+init_db()
+
 def get_all_responses():
     """Get all responses from database."""
     conn = get_db_connection()
@@ -67,6 +191,7 @@ def get_all_locations():
     conn.close()
     return locations
 
+@timed('statistics')
 def get_survey_statistics():
     """Get comprehensive survey statistics with proper question grouping."""
     rows = get_all_responses()
@@ -109,13 +234,7 @@ def get_survey_statistics():
             original_text = row['original_text'] or question_text
             
             # Check if this is a free text question (based on question_type or content)
-            is_free_text = False
-            if row['question_type'] == 'free_text':
-                is_free_text = True
-            elif any(keyword in original_text.lower() for keyword in ['предложения', 'предложение', 'какие дополнительные', 'покрывают ваши потребности']):
-                is_free_text = True
-            
-            if is_free_text:
+            if is_free_text_question(row['question_type'], original_text):
                 # Free text questions - collect all non-empty responses
                 if row['answer_text'] and str(row['answer_text']).strip():
                     stats['free_text_questions'][original_text].append(row['answer_text'])
@@ -165,52 +284,9 @@ def get_survey_statistics():
     
     return stats
 
-def generate_chart_image(data_dict, title, chart_type='bar'):
-    """Generate a chart image and return as base64 string."""
-    if not data_dict:
-        return None
-    
-    plt.figure(figsize=(10, 6))
-    
-    # Prepare data
-    labels = list(data_dict.keys())
-    values = list(data_dict.values())
-    
-    if chart_type == 'bar':
-        bars = plt.bar(labels, values)
-        plt.xticks(rotation=45, ha='right')
-        
-        # Add value labels on bars
-        for bar, value in zip(bars, values):
-            height = bar.get_height()
-            plt.text(bar.get_x() + bar.get_width()/2., height + max(values)*0.01,
-                    f'{value}', ha='center', va='bottom', fontsize=9)
-    
-    elif chart_type == 'pie':
-        plt.pie(values, labels=labels, autopct='%1.1f%%', startangle=90)
-        plt.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle.
-    
-    plt.title(title)
-    plt.tight_layout()
-    
-    # Save to buffer
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png', dpi=100)
-    plt.close()
-    buf.seek(0)
-    
-    # Convert to base64
-    img_base64 = base64.b64encode(buf.read()).decode('utf-8')
-    buf.close()
-    
-    return img_base64
-
-@app.route('/')
-def dashboard():
-    """Main dashboard page."""
-    stats = get_survey_statistics()
-    
-    # Prepare data for template
+@timed('prepare')
+def prepare_dashboard_data(stats):
+    """Turn raw statistics into the sorted, percent-annotated dashboard view model."""
     total_responses = stats['total_responses']
     
     # Location statistics
@@ -322,41 +398,186 @@ def dashboard():
                             'percentage': round(percentage, 1)
                         })
     
-    # Generate charts
-    charts = {}
+    return {
+        'total_responses': total_responses,
+        'location_data': location_data,
+        'questions_data': questions_data,
+        'satisfaction_data': satisfaction_data,
+        'free_text_data': free_text_data,
+        'problem_data': problem_data
+    }
+
+def dashboard_chart_jobs(location_data, satisfaction_data, problem_data):
+    """Chart pool jobs for the dashboard: {name: (generate_chart_image, args)}."""
+    jobs = {}
     
     # Location chart
     if location_data:
         loc_dict = {item['name']: item['count'] for item in location_data if item['count'] > 0}
         if loc_dict:
-            charts['locations'] = generate_chart_image(loc_dict, 'Распределение по локациям', 'bar')
+            jobs['locations'] = (generate_chart_image, (loc_dict, 'Распределение по локациям', 'bar'))
     
     # Overall satisfaction chart
     if satisfaction_data:
         sat_dict = {item['score']: item['count'] for item in satisfaction_data}
         if sat_dict:
-            charts['satisfaction'] = generate_chart_image(sat_dict, 'Общая удовлетворенность', 'bar')
+            jobs['satisfaction'] = (generate_chart_image, (sat_dict, 'Общая удовлетворенность', 'bar'))
     
     # Problem frequency chart
     if problem_data:
         prob_dict = {item['problem']: item['count'] for item in problem_data}
         if prob_dict:
-            charts['problems'] = generate_chart_image(prob_dict, 'Частота проблем', 'bar')
+            jobs['problems'] = (generate_chart_image, (prob_dict, 'Частота проблем', 'bar'))
     
-    return render_template('dashboard.html',
-                         total_responses=total_responses,
-                         location_data=location_data,
-                         questions_data=questions_data,
-                         satisfaction_data=satisfaction_data,
-                         free_text_data=free_text_data,
-                         problem_data=problem_data,
-                         charts=charts)
+    return jobs
+
+def chart_sources(jobs):
+    """Input fingerprint of every chart job: {name: source digest}."""
+    # The output format is part of the input, so switching SURVEY_CHART_FORMAT re-renders
+    return {name: source_digest([func.__name__, args, charts.fmt]) for name, (func, args) in jobs.items()}
+
+@timed('charts')
+def refresh_dashboard_charts(conn, jobs, force=False):
+    """
+    Render the charts whose input data changed since they were stored (all of
+    them with force=True) and store them. Returns {name: digest}; a chart that
+    timed out or failed maps to None.
+    Runs from the render-charts command (the import scripts call it), never on a request.
+    """
+    stored = stored_charts(conn)
+    sources = chart_sources(jobs)
+    stale = {name: job for name, job in jobs.items()
+             if force or stored.get(name, {}).get('source') != sources[name]}
+    
+    digests = {name: stored[name]['digest'] for name in jobs if name not in stale}
+    for name, image in chart_pool.render_many(stale).items():
+        if image is None:
+            digests[name] = None
+            continue
+        save_chart(conn, name, image, sources[name])
+        digests[name] = image.digest
+    conn.commit()
+    return digests
+
+def dashboard_chart_urls(location_data, satisfaction_data, problem_data):
+    """
+    Dashboard chart URLs from the stored charts. Nothing is rendered or
+    written here: a chart that is missing or was rendered from other data
+    (render-charts has not run since the import) shows a placeholder, and
+    the page is then left out of the response cache.
+    """
+    jobs = dashboard_chart_jobs(location_data, satisfaction_data, problem_data)
+    conn = get_db_connection()
+    stored = stored_charts(conn)
+    conn.close()
+    
+    urls = {}
+    for name, source in chart_sources(jobs).items():
+        chart = stored.get(name)
+        if chart is not None and chart['source'] == source:
+            urls[name] = chart_url(name, chart['digest'])
+        else:
+            urls[name] = chart_placeholder
+            g.cache_skip = True
+    return urls
+
+@app.cli.command('migrate-db')
+def migrate_db_command():
+    """Upgrade a database from an earlier version: explicit answer ids and the search index."""
+    conn = get_db_connection()
+    try:
+        if conn.execute("PRAGMA table_info(question_responses)").fetchone() is None:
+            print('question_responses: no such table, nothing to migrate')
+            return
+        if ensure_integer_key(conn, 'question_responses'):
+            print('question_responses: rewritten with an explicit id key')
+        if has_legacy_answer_index(conn):
+            conn.execute("DROP TABLE answers_fts")
+            conn.commit()
+        ensure_answer_index(conn)
+        print('answers_fts: ready')
+    finally:
+        conn.close()
+    response_cache.invalidate()
+
+@app.cli.command('render-charts')
+@click.option('--stale-only', is_flag=True, help='Only charts whose data changed (after an import).')
+def render_charts_command(stale_only):
+    """Re-render and store all dashboard charts (e.g. after a style change)."""
+    dashboard_data = prepare_dashboard_data(get_survey_statistics())
+    jobs = dashboard_chart_jobs(dashboard_data['location_data'],
+                                dashboard_data['satisfaction_data'],
+                                dashboard_data['problem_data'])
+    conn = get_db_connection()
+    digests = refresh_dashboard_charts(conn, jobs, force=not stale_only)
+    conn.close()
+    response_cache.invalidate()
+    for name, digest in sorted(digests.items()):
+        print(f'{name}: {digest or "failed"}')
+
+@app.route('/')
+@response_cache.cached
+def dashboard():
+    """Main dashboard page."""
+    if request.args.get('mode') == 'client':
+        # Client-side rendering: static shell, data comes from /api/stats/columnar
+        return render_template('dashboard_client.html')
+    
+    dashboard_data = prepare_dashboard_data(get_survey_statistics())
+    charts = dashboard_chart_urls(dashboard_data['location_data'],
+                                       dashboard_data['satisfaction_data'],
+                                       dashboard_data['problem_data'])
+    
+    return render_template('dashboard.html', charts=charts, **dashboard_data)
+
+@app.route('/api/stats/columnar')
+def api_stats_columnar():
+    """Compact columnar statistics payload for the client-side dashboard."""
+    return payload_response('columnar', db_file_version(DB_PATH),
+                            lambda: build_columnar_payload(prepare_dashboard_data(get_survey_statistics())))
 
 @app.route('/api/stats')
 def api_stats():
-    """API endpoint for statistics."""
-    stats = get_survey_statistics()
-    return jsonify(stats)
+    """API endpoint for statistics (supports ?fields=locations,questions)."""
+    return stats_payload_response(db_file_version(DB_PATH), get_survey_statistics,
+                                  request.args.get('fields'))
+
+@app.route('/search')
+def search_answers():
+    """Full-text search over free-text answers."""
+    query = request.args.get('q', '').strip()
+    page = max(request.args.get('page', 1, type=int) or 1, 1)
+    
+    total, results = 0, []
+    conn = get_db_connection()
+    # Index is created by init_db (or flask migrate-db) and kept in sync by triggers
+    indexed = answer_search_ready(conn)
+    if query and indexed:
+        total, matches = search(conn, 'answers_fts', query, page)
+        
+        if matches:
+            ids = [rowid for rowid, _ in matches]
+            placeholders = ','.join('?' * len(ids))
+            rows = {row['id']: row for row in conn.execute(f"""
+                SELECT qr.id, r.location,
+                       COALESCE(q.original_text, qr.question_text) AS question
+                FROM question_responses qr
+                LEFT JOIN responses r ON r.id = qr.response_id
+                LEFT JOIN questions q ON q.id = qr.question_id
+                WHERE qr.id IN ({placeholders})
+            """, ids).fetchall()}
+            results = [
+                {
+                    'snippet': snippet,
+                    'question': rows[rowid]['question'] if rowid in rows else '',
+                    'location': rows[rowid]['location'] if rowid in rows else ''
+                }
+                for rowid, snippet in matches
+            ]
+    conn.close()
+    
+    return render_template('search.html', query=query, page=page, page_size=SEARCH_PAGE_SIZE,
+                           total=total, results=results, indexed=indexed)
 
 @app.route('/api/export/csv')
 def export_csv():
@@ -384,4 +605,5 @@ def export_csv():
     return send_file(csv_path, as_attachment=True, download_name='survey_results.csv')
 
 if __name__ == '__main__':
+    chart_pool.start()
     app.run(host='0.0.0.0', port=5000, debug=True)
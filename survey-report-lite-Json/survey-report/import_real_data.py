@@ -4,6 +4,7 @@ import sqlite3
 import os
 from datetime import datetime
 import traceback
+from chart_store import render_after_import
 
 def parse_json_survey_data(json_data):
     """
@@ -159,6 +160,11 @@ def import_json_data(db_path, json_data):
             ''', (question, question_type, avg_score, stats['count']))
         
         conn.commit()
+
+        # Графики дашборда строятся только здесь и командой render-charts
+        chart_error = render_after_import(db_path)
+        if chart_error:
+            print(f"Данные импортированы, но графики не обновлены: {chart_error}")
         return len(responses), None
         
     except Exception as e:
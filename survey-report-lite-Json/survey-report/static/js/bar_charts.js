@@ -0,0 +1,72 @@
+/*
+ * Minimal SVG bar charts for the survey dashboard.
+ * Self-contained (no CDN, no dependencies) so the page works offline.
+ */
+(function (global) {
+    'use strict';
+
+    var SVG_NS = 'http://www.w3.org/2000/svg';
+    var ROW_HEIGHT = 26;
+    var LABEL_WIDTH = 260;
+    var VALUE_WIDTH = 70;
+    var WIDTH = 900;
+
+    function el(name, attrs, text) {
+        var node = document.createElementNS(SVG_NS, name);
+        Object.keys(attrs || {}).forEach(function (key) {
+            node.setAttribute(key, attrs[key]);
+        });
+        if (text !== undefined) {
+            node.textContent = text;
+        }
+        return node;
+    }
+
+    function truncate(text, maxLength) {
+        text = String(text);
+        return text.length > maxLength ? text.slice(0, maxLength - 1) + '…' : text;
+    }
+
+    /*
+     * Draw a horizontal bar chart into `container`.
+     * labels/values are parallel arrays (the columnar API layout).
+     */
+    function bar(container, labels, values, options) {
+        options = options || {};
+        var total = options.total || values.reduce(function (a, b) { return a + b; }, 0);
+        var max = Math.max.apply(null, values.concat([1]));
+        var plotWidth = WIDTH - LABEL_WIDTH - VALUE_WIDTH;
+        var height = labels.length * ROW_HEIGHT + 10;
+
+        var svg = el('svg', {
+            viewBox: '0 0 ' + WIDTH + ' ' + height,
+            width: '100%',
+            role: 'img',
+            'aria-label': options.title || ''
+        });
+
+        labels.forEach(function (label, i) {
+            var y = 5 + i * ROW_HEIGHT;
+            var barWidth = Math.max(1, values[i] / max * plotWidth);
+            var percent = total > 0 ? (values[i] / total * 100).toFixed(1) : '0.0';
+
+            var text = el('text', {x: LABEL_WIDTH - 8, y: y + ROW_HEIGHT * 0.65,
+                                   'text-anchor': 'end', 'font-size': 13},
+                          truncate(label, 38));
+            text.appendChild(el('title', {}, String(label)));
+            svg.appendChild(text);
+
+            svg.appendChild(el('rect', {x: LABEL_WIDTH, y: y + 3, rx: 3,
+                                        width: barWidth, height: ROW_HEIGHT - 6,
+                                        fill: options.color || '#4CAF50'}));
+            svg.appendChild(el('text', {x: LABEL_WIDTH + barWidth + 6, y: y + ROW_HEIGHT * 0.65,
+                                        'font-size': 12, fill: '#555'},
+                               values[i] + ' (' + percent + '%)'));
+        });
+
+        container.appendChild(svg);
+        return svg;
+    }
+
+    global.BarCharts = {bar: bar};
+})(window);
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Pre-encoded JSON payloads for the statistics API.
+
+Payloads are built once per data version and kept as ready-to-send bytes,
+so repeated requests only cost a dictionary lookup. orjson is used for
+encoding when installed, with the stdlib encoder as a fallback.
+"""
+import json
+import hashlib
+import threading
+
+from flask import make_response, request
+
+from response_cache import choose_encoding, compress_variants
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Bump when the columnar layout changes so clients can detect it
+COLUMNAR_SCHEMA_VERSION = 1
+
+# Bump when the /api/stats document layout changes
+STATS_SCHEMA_VERSION = 1
+
+# Top-level fields of the /api/stats document, in output order
+STATS_FIELDS = ('total_responses', 'locations', 'overall_satisfaction',
+                'questions', 'free_text_questions')
+
+_payload_cache = {}
+_payload_lock = threading.Lock()
+
+
+def encode_json(obj):
+    """Serialize to compact UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def format_data_version(version):
+    """Render a data version (e.g. an (mtime, size) tuple) as an opaque string."""
+    if isinstance(version, (tuple, list)):
+        return '-'.join(str(part) for part in version)
+    return str(version)
+
+
+def build_columnar_payload(dashboard_data):
+    """
+    Build the columnar form of the dashboard data: parallel arrays instead of
+    lists of objects. Percentages are left to the client.
+    """
+    questions = dashboard_data['questions_data']
+
+    return {
+        'schema': COLUMNAR_SCHEMA_VERSION,
+        'total_responses': dashboard_data['total_responses'],
+        'locations': {
+            'name': [item['name'] for item in dashboard_data['location_data']],
+            'count': [item['count'] for item in dashboard_data['location_data']],
+        },
+        'satisfaction': {
+            'score': [item['score'] for item in dashboard_data['satisfaction_data']],
+            'count': [item['count'] for item in dashboard_data['satisfaction_data']],
+        },
+        'problems': {
+            'label': [item['problem'] for item in dashboard_data['problem_data']],
+            'count': [item['count'] for item in dashboard_data['problem_data']],
+        },
+        'questions': {
+            'question': [q['question'] for q in questions],
+            'sub_question': [q['sub_question'] for q in questions],
+            'total': [q['total'] for q in questions],
+            'answer': [[a['text'] for a in q['answers']] for q in questions],
+            'count': [[a['count'] for a in q['answers']] for q in questions],
+        },
+        'free_text': {
+            'question': [item['question'] for item in dashboard_data['free_text_data']],
+            'count': [item['response_count'] for item in dashboard_data['free_text_data']],
+        },
+    }
+
+
+def _answer_list(answers):
+    return [{'text': str(text), 'count': count}
+            for text, count in sorted(answers.items(), key=lambda x: x[1], reverse=True)]
+
+
+def _score_key(score):
+    """Sort satisfaction scores numerically ('10' after '9'), non-numeric ones last."""
+    try:
+        return (0, float(score), '')
+    except (TypeError, ValueError):
+        return (1, 0.0, str(score))
+
+
+def build_stats_document(stats):
+    """
+    Convert the raw get_survey_statistics() structure (Counters and nested
+    defaultdicts) into the explicit /api/stats schema: plain lists and dicts
+    with string keys only.
+    """
+    questions = []
+    for question, data in stats['questions'].items():
+        questions.append({
+            'question': question,
+            'total': data['total'],
+            'answers': _answer_list(data['answers']),
+            'sub_questions': [
+                {
+                    'sub_question': sub_question,
+                    'total': sub_data['total'],
+                    'answers': _answer_list(sub_data['answers'])
+                }
+                for sub_question, sub_data in data['sub_questions'].items()
+            ]
+        })
+
+    return {
+        'total_responses': stats['total_responses'],
+        'locations': [
+            {'name': name, 'count': count}
+            for name, count in sorted(stats['locations'].items(), key=lambda x: x[1], reverse=True)
+        ],
+        'overall_satisfaction': [
+            {'score': str(score), 'count': count}
+            for score, count in sorted(stats['overall_satisfaction'].items(), key=lambda x: _score_key(x[0]))
+        ],
+        'questions': questions,
+        'free_text_questions': [
+            {'question': question, 'responses': list(responses)}
+            for question, responses in stats['free_text_questions'].items()
+        ],
+    }
+
+
+def parse_fields(value):
+    """
+    Parse a ?fields=a,b selection into a tuple in canonical order.
+    Returns (fields, unknown_fields).
+    """
+    if not value:
+        return STATS_FIELDS, []
+    requested = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in requested if field not in STATS_FIELDS]
+    return tuple(field for field in STATS_FIELDS if field in requested), unknown
+
+
+_stats_document = {'version': None, 'document': None}
+
+
+def stats_payload_response(version, stats_func, fields_param=None):
+    """
+    Serve /api/stats: the full document is built once per data version,
+    each field selection is encoded once and then served from cache.
+    """
+    fields, unknown = parse_fields(fields_param)
+    if unknown:
+        response = make_response(encode_json({
+            'error': 'unknown fields',
+            'unknown': unknown,
+            'available': list(STATS_FIELDS)
+        }), 400)
+        response.mimetype = 'application/json'
+        return response
+
+    def build():
+        with _payload_lock:
+            document = _stats_document['document'] if _stats_document['version'] == version else None
+        if document is None:
+            # Computed outside the lock so a slow rebuild does not block other payloads
+            document = build_stats_document(stats_func())
+            with _payload_lock:
+                _stats_document['version'] = version
+                _stats_document['document'] = document
+        payload = {'schema': STATS_SCHEMA_VERSION}
+        payload.update((field, document[field]) for field in fields)
+        return payload
+
+    return payload_response('stats:' + ','.join(fields), version, build)
+
+
+def get_encoded_payload(name, version, build_func):
+    """
+    Return (etag, variants) for a payload, building it only when the version
+    changes. variants maps content encodings to pre-compressed bodies.
+    """
+    cached = _payload_cache.get(name)
+    if cached is not None and cached[0] == version:
+        return cached[1], cached[2]
+
+    payload = build_func()
+    payload['data_version'] = format_data_version(version)
+    body = encode_json(payload)
+    etag = hashlib.sha1(body).hexdigest()
+    variants = compress_variants(body)
+
+    with _payload_lock:
+        _payload_cache[name] = (version, etag, variants)
+    return etag, variants
+
+
+def payload_response(name, version, build_func):
+    """Serve a cached payload with ETag / If-None-Match support."""
+    etag, variants = get_encoded_payload(name, version, build_func)
+
+    if etag in request.if_none_match:
+        response = make_response('', 304)
+    else:
+        encoding = choose_encoding(request.headers.get('Accept-Encoding'), variants)
+        response = make_response(variants[encoding])
+        response.mimetype = 'application/json'
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(etag)
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""Answer search: non-destructive startup, flask migrate-db and the free-text index."""
+
+SPEED = 'Оцените скорость загрузки системы'
+SUGGESTIONS = 'Ваши предложения'
+
+
+def test_startup_without_answers_table(app_module):
+    # The bundled database has no question_responses at all
+    app_module.init_db()
+    assert 'flask migrate-db' in app_module.app.test_client().get('/search?q=монитор').get_data(as_text=True)
+
+
+def test_startup_leaves_legacy_table_untouched(app_module, survey_db, add_answers):
+    add_answers('Офисы', [(SPEED, 'rating', 'Хорошо', 3)])
+    app_module.init_db()
+    columns = [row[1] for row in survey_db.execute("PRAGMA table_info(question_responses)")]
+    assert 'id' not in columns
+    assert survey_db.execute("SELECT name FROM sqlite_master WHERE name = 'answers_fts'").fetchone() is None
+
+
+def test_migrate_db_keys_rows_and_indexes_free_text(app_module, survey_db, add_answers):
+    add_answers('Офисы', [(SPEED, 'rating', 'Монитор', 3), (SUGGESTIONS, 'free_text', 'Новый монитор', None)])
+    add_answers('Склад', [(SUGGESTIONS, 'free_text', 'Быстрый интернет', None)])
+    rowids = survey_db.execute("SELECT rowid, answer_text FROM question_responses ORDER BY rowid").fetchall()
+
+    result = app_module.app.test_cli_runner().invoke(args=['migrate-db'])
+    assert result.exit_code == 0 and 'explicit id key' in result.output
+    assert survey_db.execute("SELECT id, answer_text FROM question_responses ORDER BY id").fetchall() == rowids
+    assert survey_db.execute("SELECT 1 FROM sqlite_master WHERE name = 'ix_question_responses_response'").fetchone()
+
+    client = app_module.app.test_client()
+    page = client.get('/search?q=монитор').get_data(as_text=True)
+    # The rating answer with the same word is not indexed
+    assert 'Найдено ответов: <strong>1</strong>' in page and 'Офисы' in page
+
+    # Triggers keep the index in sync with later imports
+    add_answers('Цех', [(SUGGESTIONS, 'free_text', 'Второй монитор', None)])
+    app_module.response_cache.invalidate()
+    assert 'Найдено ответов: <strong>2</strong>' in client.get('/search?q=монитор').get_data(as_text=True)
+
+    # A second run finds nothing to rewrite
+    assert 'explicit id key' not in app_module.app.test_cli_runner().invoke(args=['migrate-db']).output
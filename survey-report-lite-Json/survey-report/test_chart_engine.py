@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""Chart engine: per-thread figures reused across renders, warmup, placeholders."""
+from concurrent.futures import ThreadPoolExecutor
+
+from chart_engine import ChartEngine, ChartTemplate
+
+TEMPLATES = {'bars': ChartTemplate(figsize=(4, 3), dpi=50), 'wide': ChartTemplate(figsize=(8, 3), dpi=50)}
+
+
+def draw_bars(values):
+    def draw(ax, template):
+        ax.bar([f'Локация {i}' for i in range(len(values))], values)
+        ax.set_title('Удовлетворенность', fontsize=template.title_size)
+    return draw
+
+
+def test_figure_is_reused_and_cleared():
+    engine = ChartEngine(TEMPLATES, fmt='png')
+    first = engine.render('bars', draw_bars([1, 2]))
+    fig = engine._local.figures['bars']
+    second = engine.render('bars', draw_bars([1, 2]))
+
+    assert engine._local.figures['bars'] is fig and fig.axes == []
+    assert first.mimetype == 'image/png' and first.data == second.data
+    # A different chart in the same figure leaves nothing of the previous one
+    assert engine.render('bars', draw_bars([3])).data != first.data
+    assert engine.render('bars', draw_bars([1, 2])).data == first.data
+
+
+def test_threads_have_their_own_figures():
+    engine = ChartEngine(TEMPLATES, fmt='png')
+    expected = [engine.render('bars', draw_bars([i, i + 1])).data for i in range(8)]
+
+    def render(i):
+        return engine.render('bars', draw_bars([i, i + 1])).data, id(engine._local.figures['bars'])
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(render, range(8)))
+    assert [data for data, _ in results] == expected
+    assert id(engine._local.figures['bars']) not in {figure for _, figure in results}
+
+
+def test_warmup_creates_every_template_figure():
+    engine = ChartEngine(TEMPLATES, fmt='png')
+    engine.warmup()
+    assert set(engine._local.figures) == set(TEMPLATES)
+    assert all(fig.axes == [] for fig in engine._local.figures.values())
+
+
+def test_placeholder_is_rendered_once():
+    engine = ChartEngine(TEMPLATES, fmt='png')
+    assert engine.placeholder('wide') is engine.placeholder('wide')
+    assert engine.placeholder('wide', 'Нет данных') != engine.placeholder('wide')
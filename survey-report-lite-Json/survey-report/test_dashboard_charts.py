@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""Dashboard charts: placeholders until render-charts, such pages are not cached."""
+
+from chart_store import render_after_import
+
+SPEED = 'Оцените скорость загрузки системы / Оцените быстроту запуска ПК и программ'
+
+
+def test_placeholder_dashboard_is_not_cached(app_module, survey_db, add_answers):
+    add_answers('Офисы', [(SPEED, 'rating', 'Хорошо', 3)])
+    add_answers('Склад', [(SPEED, 'rating', 'Плохо', 1)])
+    app_module.init_db()
+    cache, client = app_module.response_cache, app_module.app.test_client()
+
+    for _ in range(2):
+        assert app_module.chart_placeholder in client.get('/').get_data(as_text=True)
+    assert cache.hits == 0
+
+    assert app_module.app.test_cli_runner().invoke(args=['render-charts']).exit_code == 0
+    pages = [client.get('/').get_data(as_text=True) for _ in range(2)]
+    assert app_module.chart_placeholder not in pages[0] and '/charts/' in pages[0]
+    assert cache.hits == 1
+
+
+def test_import_scripts_render_stale_charts(app_module, survey_db, add_answers):
+    add_answers('Офисы', [(SPEED, 'rating', 'Хорошо', 3)])
+    app_module.init_db()
+    assert render_after_import(app_module.DB_PATH) is None
+    first = dict(survey_db.execute("SELECT name, digest FROM chart_images"))
+    assert first
+
+    add_answers('Склад', [(SPEED, 'rating', 'Плохо', 1)])
+    assert render_after_import(app_module.DB_PATH) is None
+    second = dict(survey_db.execute("SELECT name, digest FROM chart_images"))
+    assert second.keys() == first.keys() and second != first
+
+    client = app_module.app.test_client()
+    assert app_module.chart_placeholder not in client.get('/').get_data(as_text=True)
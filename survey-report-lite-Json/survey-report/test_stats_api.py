@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""/api/stats: explicit schema, ?fields= selection and per-version caching."""
+from collections import Counter
+
+import pytest
+
+from stats_payload import parse_fields, build_stats_document, STATS_FIELDS, STATS_SCHEMA_VERSION
+
+SPEED = 'Оцените скорость загрузки системы / Оцените быстроту запуска ПК и программ'
+
+
+def test_parse_fields():
+    assert parse_fields(None) == (STATS_FIELDS, [])
+    assert parse_fields('') == (STATS_FIELDS, [])
+    # Canonical order, duplicates and blanks ignored
+    assert parse_fields(' questions, ,locations,questions') == (('locations', 'questions'), [])
+    assert parse_fields('locations,answers') == (('locations',), ['answers'])
+
+
+def test_document_has_string_keys_and_numeric_score_order():
+    document = build_stats_document({
+        'total_responses': 3,
+        'locations': Counter({'Склад': 1, 'Офисы': 2}),
+        'overall_satisfaction': Counter({'10': 1, '9': 1, 'нет': 1}),
+        'questions': {},
+        'free_text_questions': {},
+    })
+    assert [item['name'] for item in document['locations']] == ['Офисы', 'Склад']
+    assert [item['score'] for item in document['overall_satisfaction']] == ['9', '10', 'нет']
+
+
+@pytest.fixture
+def stats_client(app_module, survey_db, add_answers):
+    add_answers('Офисы', [(SPEED, 'rating', 'Хорошо', 3)])
+    add_answers('Склад', [(SPEED, 'rating', 'Плохо', 1)])
+    app_module.init_db()
+    return app_module.app.test_client()
+
+
+def test_field_selection_and_unknown_fields(stats_client):
+    full = stats_client.get('/api/stats').get_json()
+    assert full['schema'] == STATS_SCHEMA_VERSION and set(STATS_FIELDS) <= set(full)
+
+    partial = stats_client.get('/api/stats?fields=locations').get_json()
+    assert set(partial) == {'schema', 'locations', 'data_version'}
+    assert partial['locations'] == full['locations']
+
+    error = stats_client.get('/api/stats?fields=locations,bogus')
+    assert error.status_code == 400 and error.get_json()['unknown'] == ['bogus']
+
+
+def test_payload_is_rebuilt_when_data_changes(stats_client, add_answers):
+    first = stats_client.get('/api/stats?fields=total_responses')
+    assert stats_client.get('/api/stats?fields=total_responses',
+                            headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+
+    add_answers('Цех', [(SPEED, 'rating', 'Хорошо', 3)])
+    second = stats_client.get('/api/stats?fields=total_responses', headers={'If-None-Match': first.headers['ETag']})
+    assert second.status_code == 200 and second.get_json()['total_responses'] == 3
@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""Client-side dashboard: static shell plus the columnar /api/stats/columnar payload."""
+from stats_payload import COLUMNAR_SCHEMA_VERSION
+
+SPEED = 'Оцените скорость загрузки системы / Оцените быстроту запуска ПК и программ'
+
+
+def test_client_shell_and_columnar_payload(app_module, survey_db, add_answers):
+    add_answers('Офисы', [(SPEED, 'rating', 'Хорошо', 3)])
+    add_answers('Офисы', [(SPEED, 'rating', 'Плохо', 1)])
+    add_answers('Склад', [(SPEED, 'rating', 'Хорошо', 3)])
+    app_module.init_db()
+    client = app_module.app.test_client()
+
+    shell = client.get('/?mode=client').get_data(as_text=True)
+    assert '/api/stats/columnar' in shell and 'Склад' not in shell
+
+    response = client.get('/api/stats/columnar')
+    payload = response.get_json()
+    assert payload['schema'] == COLUMNAR_SCHEMA_VERSION and payload['total_responses'] == 3
+    assert payload['locations'] == {'name': ['Офисы', 'Склад'], 'count': [2, 1]}
+    # Parallel arrays: one entry per question in every column
+    questions = payload['questions']
+    assert len({len(column) for column in questions.values()}) == 1
+    assert all(len(answers) == len(counts) for answers, counts in zip(questions['answer'], questions['count']))
+
+    assert client.get('/api/stats/columnar', headers={'If-None-Match': response.headers['ETag']}).status_code == 304
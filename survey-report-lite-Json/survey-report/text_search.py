@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Full-text search with SQLite FTS5.
+
+The index is an FTS5 table holding its own copy of the indexed text for the
+subset of rows selected by a SQL condition (e.g. free-text answers only).
+Triggers on the source table keep it in sync, so every import updates the
+index incrementally, in the same transaction, without a rebuild. The FTS
+rowid is the source table's INTEGER PRIMARY KEY, which VACUUM never
+renumbers.
+"""
+import re
+from markupsafe import escape, Markup
+
+PAGE_SIZE = 20
+
+# Match markers inside snippet(); replaced with <mark> after escaping
+_HL_START = '\x02'
+_HL_END = '\x03'
+
+
+def ensure_search_index(conn, table, columns, fts_table, condition='1', key='id'):
+    """
+    Create the FTS5 index over table.columns (one name or a tuple) for the
+    rows where condition holds, plus the triggers that keep it in sync.
+    condition is a SQL expression over the source row with a {row}
+    placeholder for the row alias (new. in the triggers). key is the table's
+    INTEGER PRIMARY KEY. A new index is filled from existing rows.
+    Call from the startup/migration path: creation takes a write lock, so
+    concurrently starting workers create it exactly once.
+    """
+    def matches(alias):
+        return '(' + condition.format(row=alias) + ')'
+
+    def values(alias):
+        return ', '.join(f'{alias}.{column}' for column in columns)
+
+    columns = (columns,) if isinstance(columns, str) else tuple(columns)
+    names = ', '.join(columns)
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                              (fts_table,)).fetchone()
+        if not exists:
+            conn.execute(f"""
+                CREATE VIRTUAL TABLE {fts_table} USING fts5(
+                    {names}, tokenize='unicode61 remove_diacritics 2'
+                )
+            """)
+            conn.execute(f"""
+                CREATE TRIGGER {fts_table}_ai AFTER INSERT ON {table} WHEN {matches('new')} BEGIN
+                    INSERT INTO {fts_table}(rowid, {names}) VALUES (new.{key}, {values('new')});
+                END
+            """)
+            conn.execute(f"""
+                CREATE TRIGGER {fts_table}_ad AFTER DELETE ON {table} BEGIN
+                    DELETE FROM {fts_table} WHERE rowid = old.{key};
+                END
+            """)
+            conn.execute(f"""
+                CREATE TRIGGER {fts_table}_au AFTER UPDATE ON {table} BEGIN
+                    DELETE FROM {fts_table} WHERE rowid = old.{key};
+                    INSERT INTO {fts_table}(rowid, {names})
+                    SELECT new.{key}, {values('new')} WHERE {matches('new')};
+                END
+            """)
+            conn.execute(f"""
+                INSERT INTO {fts_table}(rowid, {names})
+                SELECT row.{key}, {values('row')} FROM {table} AS row WHERE {matches('row')}
+            """)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def build_match_query(text):
+    """
+    Turn user input into a safe FTS5 query: every word quoted with prefix
+    matching, words joined with AND.
+    """
+    words = re.findall(r'\w+', text or '')
+    return ' '.join(f'"{word}"*' for word in words[:10])
+
+
+def render_snippet(raw):
+    """Escape the text and highlight matches with <mark>."""
+    html = str(escape(raw or ''))
+    return Markup(html.replace(_HL_START, '<mark>').replace(_HL_END, '</mark>'))
+
+
+def search(conn, fts_table, text, page=1, page_size=PAGE_SIZE):
+    """
+    Search the index for text. Returns (total matches, [(rowid, snippet), ...])
+    for the requested page, ordered by relevance (bm25).
+    """
+    match = build_match_query(text)
+    if not match:
+        return 0, []
+
+    total = conn.execute(f"SELECT COUNT(*) FROM {fts_table} WHERE {fts_table} MATCH ?",
+                         (match,)).fetchone()[0]
+    rows = conn.execute(f"""
+        SELECT rowid, snippet({fts_table}, -1, ?, ?, '…', 24)
+        FROM {fts_table}
+        WHERE {fts_table} MATCH ?
+        ORDER BY rank
+        LIMIT ? OFFSET ?
+    """, (_HL_START, _HL_END, match, page_size, (max(page, 1) - 1) * page_size)).fetchall()
+    return total, [(row[0], render_snippet(row[1])) for row in rows]
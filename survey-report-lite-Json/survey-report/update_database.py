@@ -2,9 +2,12 @@
 import sqlite3
 import json
 import re
+from chart_store import render_after_import
+
+DB_PATH = '/var/www/survey-report/survey_complete.db'
 
 def update_database_schema():
-    conn = sqlite3.connect('/var/www/survey-report/survey_complete.db')
+    conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     
     # Создаем таблицу для детальной статистики ответов
@@ -32,6 +35,11 @@ def update_database_schema():
     conn.close()
     print("Схема базы данных обновлена")
 
+    # Графики дашборда строятся только при загрузке данных и командой render-charts
+    chart_error = render_after_import(DB_PATH)
+    if chart_error:
+        print(f"Графики не обновлены: {chart_error}")
+
 def parse_detailed_stats(json_data):
     """Парсит детальную статистику из JSON"""
     stats = {
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Download Bootstrap and Font Awesome into static/vendor/ so pages work
+without CDN access. Run once on a machine with internet access, then copy
+static/vendor/ to the server.
+"""
+import os
+import sys
+import urllib.request
+
+from assets import STATIC_DIR, VENDOR_FILES, FONTAWESOME_WEBFONTS
+
+FONTAWESOME_WEBFONTS_URL = 'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/webfonts/'
+
+
+def download(url, path):
+    full_path = os.path.join(STATIC_DIR, path)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    with urllib.request.urlopen(url, timeout=30) as response:
+        data = response.read()
+    with open(full_path, 'wb') as f:
+        f.write(data)
+    print(f"✅ {path} ({len(data)} bytes)")
+
+
+def main():
+    files = dict(VENDOR_FILES)
+    for name in FONTAWESOME_WEBFONTS:
+        files[f'vendor/fontawesome/webfonts/{name}'] = FONTAWESOME_WEBFONTS_URL + name
+
+    errors = 0
+    for path, url in files.items():
+        try:
+            download(url, path)
+        except Exception as e:
+            print(f"❌ {path}: {e}")
+            errors += 1
+
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,46 @@
+"""
+Общие фикстуры тестов: приложение импортируется с БД и каталогами во
+временном каталоге, каждый тест получает свою пустую БД со схемой init_database().
+"""
+import io
+import os
+import json
+import tempfile
+
+import pytest
+
+# Ручной сценарий импорта, а не модуль тестов
+collect_ignore = ['test_json_import.py']
+
+_root = tempfile.mkdtemp(prefix='survey-lite-tests-')
+for name, value in (('SURVEY_DB_PATH', os.path.join(_root, 'survey.db')),
+                    ('SURVEY_UPLOAD_FOLDER', os.path.join(_root, 'uploads')),
+                    ('SURVEY_ARCHIVE_FOLDER', os.path.join(_root, 'archive')),
+                    ('SURVEY_LOG_DIR', os.path.join(_root, 'logs')),
+                    ('SURVEY_PROFILE_DIR', os.path.join(_root, 'profiles'))):
+    os.environ.setdefault(name, value)
+
+
+@pytest.fixture
+def app_module(tmp_path, monkeypatch):
+    """Модуль приложения, переключенный на пустую БД в tmp_path"""
+    import final_with_charts
+    import dashboard_snapshot
+    monkeypatch.setattr(final_with_charts, 'DB_PATH', str(tmp_path / 'survey.db'))
+    monkeypatch.setattr(dashboard_snapshot, '_memory_snapshot', {'version': None, 'model': None})
+    final_with_charts.init_database()
+    final_with_charts.response_cache.invalidate()
+    return final_with_charts
+
+
+@pytest.fixture
+def import_wave(app_module):
+    """import_wave(респонденты) — загрузка волны через /import_json, возвращает текст страницы"""
+    client = app_module.app.test_client()
+
+    def upload(respondents, filename='wave.json'):
+        data = io.BytesIO(json.dumps(respondents, ensure_ascii=False).encode('utf-8'))
+        response = client.post('/import_json', data={'json_file': (data, filename)},
+                               content_type='multipart/form-data')
+        return response.get_data(as_text=True)
+    return upload
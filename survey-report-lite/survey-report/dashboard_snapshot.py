@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Предрасчитанный снимок (snapshot) модели представления для dashboard_full.html.
+
+Снимок строится один раз после импорта, хранится в SQLite как JSON и
+дублируется в памяти процесса. Маршрут /dashboard только загружает готовую
+модель и рендерит шаблон.
+"""
+import json
+import datetime
+from collections import defaultdict
+
+from text_analytics import init_text_tables, build_themes_model
+
+# Версия формата снимка: увеличиваем при изменении структуры модели,
+# чтобы старые снимки в БД перестраивались автоматически
+SNAPSHOT_FORMAT = 3
+
+QUESTION_TITLES = {
+    'Скорость загрузки': 'Оцените скорость загрузки системы',
+    'Стабильность работы': 'Оцените стабильность работы системы',
+    'Удобство монитора': 'Оцените удобство использования монитора',
+    'Приложения Яндекс': 'Приложения Яндекс',
+    'MS Office': 'MS Office',
+    '1С': '1С',
+    'Bitrix24': 'Bitrix24',
+    'Сторонние приложения': 'Сторонние приложения',
+    'Обновления ПО': 'Обновления ПО'
+}
+
+# Копия последнего загруженного снимка в памяти процесса
+_memory_snapshot = {'version': None, 'model': None}
+
+
+def init_snapshot_table(cursor):
+    """Создает таблицу для хранения снимков"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS dashboard_snapshots (
+            version INTEGER PRIMARY KEY AUTOINCREMENT,
+            format INTEGER NOT NULL,
+            created_at TEXT NOT NULL,
+            payload TEXT NOT NULL
+        )
+    ''')
+
+
+def build_dashboard_model(conn):
+    """Строит модель представления dashboard_full.html по текущим данным"""
+    cursor = conn.cursor()
+
+    # Общее количество по локациям
+    cursor.execute("SELECT SUM(response_count) FROM locations")
+    total_responses_row = cursor.fetchone()
+    total_responses = total_responses_row[0] if total_responses_row and total_responses_row[0] else 0
+
+    # Локации
+    cursor.execute('SELECT location_name, response_count FROM locations ORDER BY response_count DESC')
+    locations = []
+    for name, count in cursor.fetchall():
+        percent = (count / total_responses * 100) if total_responses > 0 else 0
+        locations.append({
+            'name': name,
+            'count': count,
+            'percent': round(percent, 1)
+        })
+
+    # Вопросы (группируем по категории)
+    cursor.execute('''
+        SELECT question_category, answer_text, answer_value, SUM(count) as total_count
+        FROM question_responses
+        GROUP BY question_category, answer_text
+        ORDER BY question_category, total_count DESC
+    ''')
+
+    questions_by_category = defaultdict(list)
+    category_totals = defaultdict(int)
+
+    for category, answer_text, answer_value, total_count in cursor.fetchall():
+        questions_by_category[category].append({
+            'text': answer_text,
+            'count': total_count,
+            'value': answer_value
+        })
+        category_totals[category] += total_count
+
+    questions_sections = []
+    for category, answers in questions_by_category.items():
+        total = category_totals.get(category, 0)
+
+        # Добавляем проценты и сортируем по значению (3, 2, 1)
+        for answer in answers:
+            answer['percent'] = round((answer['count'] / total * 100), 1) if total > 0 else 0
+        answers.sort(key=lambda x: x.get('value') or 0, reverse=True)
+
+        questions_sections.append({
+            'title': QUESTION_TITLES.get(category, category),
+            'subtitle': '',
+            'total': total,
+            'answers': answers[:10]  # Ограничиваем 10 ответами
+        })
+
+    # Проблемы
+    cursor.execute('SELECT problem_type, count FROM problem_responses ORDER BY count DESC')
+    problems = [{'text': text, 'count': count} for text, count in cursor.fetchall()]
+    total_problems = sum(p['count'] for p in problems)
+
+    if problems:
+        for problem in problems:
+            problem['percent'] = round((problem['count'] / total_problems * 100), 1) if total_problems > 0 else 0
+
+        questions_sections.append({
+            'title': 'С какими проблемами вы сталкиваетесь чаще всего?',
+            'subtitle': '',
+            'total': total_problems,
+            'answers': problems
+        })
+
+    # Удовлетворенность
+    cursor.execute('SELECT score, count FROM satisfaction_scores ORDER BY score')
+    satisfaction = [{'text': str(score), 'count': count} for score, count in cursor.fetchall()]
+    total_satisfaction = sum(s['count'] for s in satisfaction)
+
+    if satisfaction:
+        for item in satisfaction:
+            item['percent'] = round((item['count'] / total_satisfaction * 100), 1) if total_satisfaction > 0 else 0
+
+        questions_sections.append({
+            'title': 'Общая удовлетворенность рабочего места',
+            'subtitle': '',
+            'total': total_satisfaction,
+            'answers': satisfaction
+        })
+
+    return {
+        'total_responses': total_responses,
+        'location_stats': {
+            'total': total_responses,
+            'locations': locations
+        },
+        'questions': questions_sections,
+        'themes': build_themes_model(conn),
+        # Время импорта; текущее время страницы подставляет маршрут
+        'imported_at': datetime.datetime.now().strftime('%d.%m.%Y %H:%M')
+    }
+
+
+def rebuild_snapshot(conn):
+    """Перестраивает снимок после изменения данных и возвращает его версию"""
+    cursor = conn.cursor()
+    init_snapshot_table(cursor)
+    init_text_tables(cursor)
+
+    model = build_dashboard_model(conn)
+    cursor.execute('''
+        INSERT INTO dashboard_snapshots (format, created_at, payload)
+        VALUES (?, ?, ?)
+    ''', (SNAPSHOT_FORMAT, datetime.datetime.now().isoformat(),
+          json.dumps(model, ensure_ascii=False, separators=(',', ':'))))
+    version = cursor.lastrowid
+
+    # Храним только актуальный снимок
+    cursor.execute("DELETE FROM dashboard_snapshots WHERE version < ?", (version,))
+    conn.commit()
+
+    _memory_snapshot['version'] = version
+    _memory_snapshot['model'] = model
+    return version
+
+
+def get_snapshot_version(conn):
+    """Возвращает версию актуального снимка или None"""
+    row = conn.execute('''
+        SELECT version FROM dashboard_snapshots
+        WHERE format = ?
+        ORDER BY version DESC LIMIT 1
+    ''', (SNAPSHOT_FORMAT,)).fetchone()
+    return row[0] if row else None
+
+
+def load_snapshot(conn):
+    """
+    Возвращает (версия, модель) актуального снимка.
+    Снимок читается из БД только если его версия изменилась
+    (например, импорт выполнил другой процесс); иначе берется копия из памяти.
+    """
+    init_snapshot_table(conn.cursor())
+
+    version = get_snapshot_version(conn)
+    if version is None:
+        version = rebuild_snapshot(conn)
+        return version, _memory_snapshot['model']
+
+    if version != _memory_snapshot['version']:
+        row = conn.execute("SELECT payload FROM dashboard_snapshots WHERE version = ?",
+                           (version,)).fetchone()
+        _memory_snapshot['version'] = version
+        _memory_snapshot['model'] = json.loads(row[0])
+
+    return version, _memory_snapshot['model']
@@ -1,5 +1,5 @@
 #!/usr/bin/env python3
-from flask import Flask, render_template, request, redirect, url_for
+from flask import Flask, render_template, request, redirect, url_for, jsonify
 import sqlite3
 import pandas as pd
 import os
@@ -9,15 +9,48 @@ import traceback
 import re
 import datetime
 from collections import defaultdict, Counter
+from dashboard_snapshot import init_snapshot_table, rebuild_snapshot, load_snapshot
+from wave_archive import WaveArchive, write_archive, archive_path, identical, EXTENSION as ARCHIVE_EXTENSION
+from response_cache import ResponseCache, db_file_version, compress_response
+from assets import AssetPipeline
+from text_analytics import (init_text_tables, clear_text_counts, update_text_counts,
+                            comment_question, is_comment, top_terms, comment_count,
+                            comment_questions, TERM_KINDS)
+import metrics
+from metrics import span, timed
+from profiling import RequestProfiler
+import request_log
+
+# Путь к БД можно переопределить (например, для нагрузочных тестов)
+DB_PATH = os.environ.get('SURVEY_DB_PATH', '/var/www/survey-report/survey_complete.db')
 
 app = Flask(__name__)
-app.config['UPLOAD_FOLDER'] = '/var/www/survey-report/uploads'
+app.config['UPLOAD_FOLDER'] = os.environ.get('SURVEY_UPLOAD_FOLDER', '/var/www/survey-report/uploads')
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB
+# Импортированные волны хранятся в компактном архиве (.srvw), а не в исходном JSON
+app.config['ARCHIVE_FOLDER'] = os.environ.get('SURVEY_ARCHIVE_FOLDER', '/var/www/survey-report/archive')
+
+# Журналы запросов и медленных SQL (JSON lines); подключается первым, чтобы видеть итоговый ответ
+request_log.init_app(app, os.environ.get('SURVEY_LOG_DIR', '/var/www/survey-report/logs'))
+# Замеры времени запросов и участков, /metrics
+metrics.init_app(app)
+# Профили медленных запросов (SURVEY_PROFILE_SLOW_MS), /debug/profiles
+profiler = RequestProfiler(os.environ.get('SURVEY_PROFILE_DIR', '/var/www/survey-report/profiles')).init_app(app)
 
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+os.makedirs(app.config['ARCHIVE_FOLDER'], exist_ok=True)
+
+# Кэш готовых страниц, сбрасывается при любом изменении файла БД и после импорта
+response_cache = ResponseCache(lambda: db_file_version(DB_PATH))
+metrics.register_cache('response_cache', response_cache)
+
+# Статические ресурсы (минификация, отпечатки, бессрочный кэш) и сжатие ответов
+assets = AssetPipeline(app)
+assets.prebuild()
+app.after_request(compress_response)
 
 def init_database():
-    conn = sqlite3.connect('/var/www/survey-report/survey_complete.db')
+    conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     
     cursor.execute('''
@@ -55,26 +88,31 @@ def init_database():
         )
     ''')
     
+    init_snapshot_table(cursor)
+    init_text_tables(cursor)
+    
     conn.commit()
     conn.close()
 
 def get_db_connection():
-    conn = sqlite3.connect('/var/www/survey-report/survey_complete.db')
+    conn = metrics.connect(DB_PATH)
     conn.row_factory = sqlite3.Row
     return conn
 
+@timed('json_parse')
 def parse_correct_json_data(json_data):
     """Исправленный парсер для точного извлечения данных"""
     location_stats = Counter()
     question_stats = defaultdict(Counter)
     problem_stats = Counter()
     satisfaction_stats = Counter()
-    comments_stats = defaultdict(list)  # Для комментариев
+    comments = []  # Свободные ответы: (вопрос, локация, текст)
     
     print(f"Обработка {len(json_data)} ответов...")
     
     for respondent_idx, respondent_data in enumerate(json_data):
         current_location = None
+        previous_question = None
         
         for item in respondent_data:
             if len(item) < 2:
@@ -88,6 +126,14 @@ def parse_correct_json_data(json_data):
             
             question_lower = question.lower().strip()
             
+            # Свободный ответ: предложения или комментарий к предыдущей оценке
+            if is_comment(answer):
+                topic = comment_question(question, previous_question)
+                if topic:
+                    comments.append((topic, current_location, answer))
+            if question_lower:
+                previous_question = question
+            
             # 1. ЛОКАЦИЯ
             if "локацию" in question_lower or "локация" in question_lower or "вашу локацию" in question_lower:
                 if answer and isinstance(answer, str) and answer.strip():
@@ -187,6 +233,7 @@ def parse_correct_json_data(json_data):
     print(f"Категорий вопросов: {len(question_stats)}")
     print(f"Типов проблем: {len(problem_stats)}")
     print(f"Оценок удовлетворенности: {len(satisfaction_stats)}")
+    print(f"Комментариев: {len(comments)}")
     
     # Выводим отладочную информацию
     for category, answers in question_stats.items():
@@ -199,12 +246,14 @@ def parse_correct_json_data(json_data):
         'questions': question_stats,
         'problems': problem_stats,
         'satisfaction': satisfaction_stats,
+        'comments': comments,
         'total_respondents': len(json_data)
     }
 
+@timed('import')
 def save_correct_data(parsed_data):
     """Сохраняет исправленные данные"""
-    conn = sqlite3.connect('/var/www/survey-report/survey_complete.db')
+    conn = metrics.connect(DB_PATH)
     cursor = conn.cursor()
     
     try:
@@ -213,6 +262,7 @@ def save_correct_data(parsed_data):
         cursor.execute("DELETE FROM question_responses")
         cursor.execute("DELETE FROM problem_responses")
         cursor.execute("DELETE FROM satisfaction_scores")
+        clear_text_counts(cursor)
         conn.commit()
         
         # Локации
@@ -256,7 +306,13 @@ def save_correct_data(parsed_data):
                     VALUES (?, ?)
                 ''', (score, count))
         
+        # Частые слова в комментариях
+        update_text_counts(conn, parsed_data['comments'])
+        
         conn.commit()
+        
+        # Данные изменились — перестраиваем снимок дашборда
+        rebuild_snapshot(conn)
         return True, None
         
     except Exception as e:
@@ -271,129 +327,15 @@ def index():
     return redirect(url_for('dashboard'))
 
 @app.route('/dashboard')
+@response_cache.cached
 def dashboard():
     conn = get_db_connection()
-    cursor = conn.cursor()
     
     try:
-        # Общее количество по локациям
-        cursor.execute("SELECT SUM(response_count) FROM locations")
-        total_responses_row = cursor.fetchone()
-        total_responses = total_responses_row[0] if total_responses_row and total_responses_row[0] else 0
-        
-        # Локации
-        cursor.execute('SELECT location_name, response_count FROM locations ORDER BY response_count DESC')
-        locations = []
-        for row in cursor.fetchall():
-            percent = (row['response_count'] / total_responses * 100) if total_responses > 0 else 0
-            locations.append({
-                'name': row['location_name'],
-                'count': row['response_count'],
-                'percent': round(percent, 1)
-            })
-        
-        # Вопросы (группируем по категории)
-        cursor.execute('''
-            SELECT question_category, question_text, answer_text, answer_value, SUM(count) as total_count
-            FROM question_responses 
-            GROUP BY question_category, answer_text
-            ORDER BY question_category, total_count DESC
-        ''')
-        
-        questions_by_category = defaultdict(list)
-        category_totals = defaultdict(int)
-        
-        for row in cursor.fetchall():
-            questions_by_category[row['question_category']].append({
-                'text': row['answer_text'],
-                'count': row['total_count'],
-                'value': row['answer_value']
-            })
-            category_totals[row['question_category']] += row['total_count']
-        
-        questions_sections = []
-        question_titles = {
-            'Скорость загрузки': 'Оцените скорость загрузки системы',
-            'Стабильность работы': 'Оцените стабильность работы системы', 
-            'Удобство монитора': 'Оцените удобство использования монитора',
-            'Приложения Яндекс': 'Приложения Яндекс',
-            'MS Office': 'MS Office',
-            '1С': '1С',
-            'Bitrix24': 'Bitrix24',
-            'Сторонние приложения': 'Сторонние приложения',
-            'Обновления ПО': 'Обновления ПО'
-        }
-        
-        for category, answers in questions_by_category.items():
-            total = category_totals.get(category, 0)
-            
-            # Добавляем проценты и сортируем по значению
-            for answer in answers:
-                answer['percent'] = round((answer['count'] / total * 100), 1) if total > 0 else 0
-            
-            # Сортируем по значению (3, 2, 1)
-            answers.sort(key=lambda x: x.get('value', 0), reverse=True)
-            
-            title = question_titles.get(category, category)
-            questions_sections.append({
-                'title': title,
-                'subtitle': '',
-                'total': total,
-                'answers': answers[:10]  # Ограничиваем 10 ответами
-            })
-        
-        # Проблемы
-        cursor.execute('SELECT problem_type, count FROM problem_responses ORDER BY count DESC')
-        problems = []
-        total_problems = 0
-        for row in cursor.fetchall():
-            problems.append({
-                'text': row['problem_type'],
-                'count': row['count']
-            })
-            total_problems += row['count']
-        
-        if problems:
-            for problem in problems:
-                problem['percent'] = round((problem['count'] / total_problems * 100), 1) if total_problems > 0 else 0
-            
-            questions_sections.append({
-                'title': 'С какими проблемами вы сталкиваетесь чаще всего?',
-                'subtitle': '',
-                'total': total_problems,
-                'answers': problems
-            })
-        
-        # Удовлетворенность
-        cursor.execute('SELECT score, count FROM satisfaction_scores ORDER BY score')
-        satisfaction = []
-        total_satisfaction = 0
-        for row in cursor.fetchall():
-            satisfaction.append({
-                'text': str(row['score']),
-                'count': row['count']
-            })
-            total_satisfaction += row['count']
-        
-        if satisfaction:
-            for item in satisfaction:
-                item['percent'] = round((item['count'] / total_satisfaction * 100), 1) if total_satisfaction > 0 else 0
-            
-            questions_sections.append({
-                'title': 'Общая удовлетворенность рабочего места',
-                'subtitle': '',
-                'total': total_satisfaction,
-                'answers': satisfaction
-            })
-        
-        return render_template('dashboard_full.html',
-                             total_responses=total_responses,
-                             location_stats={
-                                 'total': total_responses,
-                                 'locations': locations
-                             },
-                             questions=questions_sections,
-                             update_time=datetime.datetime.now().strftime('%d.%m.%Y %H:%M'))
+        # Модель представления строится при импорте, здесь только загружаем снимок
+        version, model = load_snapshot(conn)
+        return render_template('dashboard_full.html', **model,
+                               update_time=datetime.datetime.now().strftime('%d.%m.%Y %H:%M'))
                              
     except Exception as e:
         print(f"Dashboard error: {e}")
@@ -402,10 +344,33 @@ def dashboard():
                              total_responses=0,
                              location_stats={'total': 0, 'locations': []},
                              questions=[],
-                             update_time=datetime.datetime.now().strftime('%d.%m.%Y %H:%M'))
+                             update_time=datetime.datetime.now().strftime('%d.%m.%Y %H:%M')), 500
     finally:
         conn.close()
 
+@timed('archive')
+def archive_wave(filepath, json_data):
+    """
+    Сохраняет импортированную волну в архив; исходный JSON удаляется,
+    только если архив распаковывается в точности в те же данные (с учетом
+    типов значений). Существующий архив не перезаписывается: повторная
+    загрузка того же файла лишь сверяется с ним
+    """
+    path = archive_path(filepath, app.config['ARCHIVE_FOLDER'])
+    try:
+        if not os.path.exists(path):
+            try:
+                write_archive(json_data, path)
+            except FileExistsError:
+                pass  # тот же файл архивирован параллельным импортом
+        with WaveArchive(path) as archive:
+            if not identical(archive.respondents(), json_data):
+                print(f"Архив {path} не совпадает с исходным JSON, JSON сохранен")
+                return
+        os.remove(filepath)
+    except Exception as e:
+        print(f"Ошибка архивирования {filepath}: {e}")
+
 @app.route('/import')
 def import_page():
     return render_template('import_simple.html')
@@ -423,14 +388,20 @@ def handle_import_json():
                              message='Файл не выбран',
                              message_type='error')
     
-    if file and file.filename.endswith('.json'):
+    # JSON-выгрузка или архив волны (.srvw) — например, для повторного импорта прошлой волны
+    if file and file.filename.endswith(('.json', ARCHIVE_EXTENSION)):
         filename = secure_filename(file.filename)
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
         file.save(filepath)
         
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                json_data = json.load(f)
+            with span('json_load'):
+                if filename.endswith(ARCHIVE_EXTENSION):
+                    with WaveArchive(filepath) as archive:
+                        json_data = archive.respondents()
+                else:
+                    with open(filepath, 'r', encoding='utf-8') as f:
+                        json_data = json.load(f)
             
             print(f"Загружен JSON с {len(json_data)} ответами")
             
@@ -439,12 +410,15 @@ def handle_import_json():
             
             # Сохраняем
             success, error = save_correct_data(parsed_data)
+            response_cache.invalidate()
             
             if not success:
                 return render_template('import_simple.html',
                                      message=f'Ошибка сохранения: {error}',
                                      message_type='error')
             else:
+                if not filename.endswith(ARCHIVE_EXTENSION):
+                    archive_wave(filepath, json_data)
                 return render_template('import_simple.html',
                                      message=f'Успешно импортировано {parsed_data["total_respondents"]} ответов',
                                      message_type='success')
@@ -456,11 +430,12 @@ def handle_import_json():
                                  details=traceback.format_exc())
     
     return render_template('import_simple.html',
-                         message='Неверный формат файла. Требуется JSON',
+                         message='Неверный формат файла. Требуется JSON или архив .srvw',
                          message_type='error')
 
 # Простые маршруты
 @app.route('/locations')
+@response_cache.cached
 def locations():
     conn = get_db_connection()
     cursor = conn.cursor()
@@ -470,6 +445,7 @@ def locations():
     return render_template('simple_locations.html', locations=locations)
 
 @app.route('/questions')
+@response_cache.cached
 def questions():
     conn = get_db_connection()
     cursor = conn.cursor()
@@ -483,6 +459,30 @@ def questions():
     conn.close()
     return render_template('simple_questions.html', questions=questions_data)
 
+@app.route('/api/themes')
+@response_cache.cached
+def api_themes():
+    """Частые слова (kind=term) или словосочетания (kind=bigram) в комментариях"""
+    kind = request.args.get('kind', 'term')
+    if kind not in TERM_KINDS:
+        return jsonify({'error': f'kind должен быть одним из: {", ".join(TERM_KINDS)}'}), 400
+    question = request.args.get('question') or None
+    location = request.args.get('location') or None
+    limit = max(1, min(request.args.get('limit', 20, type=int) or 20, 100))
+    
+    conn = get_db_connection()
+    try:
+        return jsonify({
+            'kind': kind,
+            'question': question,
+            'location': location,
+            'comments': comment_count(conn, question, location),
+            'items': top_terms(conn, kind, question, location, limit),
+            'questions': comment_questions(conn)
+        })
+    finally:
+        conn.close()
+
 if __name__ == '__main__':
     init_database()
     print("Сервер запускается на порту 5004...")
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Замеры времени и метрики в формате Prometheus.
+
+span(имя) / @timed(имя) замеряют участки горячего пути (запросы к БД,
+сбор статистики, графики, шаблоны, импорт): время пишется в гистограмму
+survey_span_seconds и накапливается по запросу для заголовка Server-Timing.
+init_app() подключает замер времени запросов, счетчики ответов, замер
+шаблонов (сигналы Flask) и маршрут /metrics. Соединения с БД, открытые
+через connect(), замеряют execute/executemany/fetch* без правки запросов.
+
+Внешних зависимостей нет: текстовый формат Prometheus формируется здесь.
+Метрики хранятся в памяти процесса, у каждого воркера — свои.
+"""
+import os
+import time
+import sqlite3
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import g, has_request_context, request, Response, before_render_template, template_rendered
+
+# Границы корзин гистограмм, секунды
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Заголовок Server-Timing включается переменной окружения SURVEY_SERVER_TIMING=1
+SERVER_TIMING = os.environ.get('SURVEY_SERVER_TIMING', '') not in ('', '0')
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            items = sorted(self._values.items())
+        lines.extend(f'{self.name}{_format_labels(key)} {_format_value(value)}' for key, value in items)
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Счетчики по корзинам (последняя — +Inf), сумма и количество
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def collect(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            items = sorted((key, [list(series[0]), series[1], series[2]])
+                           for key, series in self._series.items())
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                labels = key + (('le', _format_value(bound)),)
+                lines.append(f'{self.name}_bucket{_format_labels(labels)} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(key)} {_format_value(total)}')
+            lines.append(f'{self.name}_count{_format_labels(key)} {count}')
+        return lines
+
+
+class Gauge:
+    """Значение, вычисляемое в момент сбора метрик (kind='counter' — для растущих счетчиков)"""
+
+    def __init__(self, name, documentation, func, kind='gauge'):
+        self.name = name
+        self.documentation = documentation
+        self.func = func
+        self.kind = kind
+
+    def collect(self):
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}',
+                f'{self.name} {_format_value(self.func())}']
+
+
+REQUEST_SECONDS = Histogram('survey_http_request_duration_seconds', 'HTTP request processing time')
+REQUESTS_TOTAL = Counter('survey_http_requests_total', 'Number of HTTP requests')
+SPAN_SECONDS = Histogram('survey_span_seconds', 'Time spent in request processing sections')
+
+_metrics = [REQUEST_SECONDS, REQUESTS_TOTAL, SPAN_SECONDS]
+
+
+def register(metric):
+    """Добавляет метрику в вывод /metrics"""
+    _metrics.append(metric)
+    return metric
+
+
+def register_cache(name, cache):
+    """Счетчики попаданий и промахов кэша (объект с полями hits / misses) и доля попаданий"""
+    register(Gauge(f'survey_{name}_hits_total', f'{name} cache hits', lambda: cache.hits, 'counter'))
+    register(Gauge(f'survey_{name}_misses_total', f'{name} cache misses', lambda: cache.misses, 'counter'))
+    register(Gauge(f'survey_{name}_hit_ratio', f'{name} cache hit ratio',
+                   lambda: cache.hits / (cache.hits + cache.misses) if cache.hits + cache.misses else 0.0))
+
+
+def render():
+    """Все метрики в текстовом формате Prometheus"""
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.collect())
+    return '\n'.join(lines) + '\n'
+
+
+def record_span(name, seconds):
+    SPAN_SECONDS.observe(seconds, span=name)
+    if has_request_context():
+        spans = g.setdefault('metrics_spans', {})
+        spans[name] = spans.get(name, 0.0) + seconds
+
+
+@contextmanager
+def span(name):
+    """Замеряет блок кода"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, time.perf_counter() - started)
+
+
+def timed(name):
+    """Декоратор: замеряет каждый вызов функции"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# Обработчики замеров запросов: func(курсор, sql, параметры, секунды)
+QUERY_LISTENERS = []
+
+
+class TimedCursor(sqlite3.Cursor):
+    """
+    Курсор с замером запросов. Время выборки (fetch* и обход курсора в for)
+    относится к последнему выполненному запросу курсора, поэтому слушатели
+    видят и медленные SELECT, у которых основное время уходит не на execute,
+    а на чтение строк.
+    """
+    _query = None
+    _iterated = None
+
+    def _report(self, query, elapsed):
+        record_span('db', elapsed)
+        if query is not None:
+            for listener in QUERY_LISTENERS:
+                listener(self, query[0], query[1], elapsed)
+
+    def _timed(self, method, query, *args):
+        started = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            self._report(query, time.perf_counter() - started)
+
+    def _flush_iteration(self):
+        if self._iterated is not None:
+            elapsed, self._iterated = self._iterated, None
+            self._report(self._query, elapsed)
+
+    def __next__(self):
+        # for row in cursor: время строк копится и сообщается одним замером в конце обхода
+        # (или при следующем execute / close, если обход прерван)
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._iterated = (self._iterated or 0.0) + time.perf_counter() - started
+            self._flush_iteration()
+            raise
+        self._iterated = (self._iterated or 0.0) + time.perf_counter() - started
+        return row
+
+    def execute(self, sql, parameters=()):
+        self._flush_iteration()
+        self._query = (sql, parameters)
+        return self._timed(super().execute, self._query, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        self._flush_iteration()
+        # Параметры пачки для EXPLAIN не нужны
+        self._query = (sql, None)
+        return self._timed(super().executemany, self._query, sql, seq_of_parameters)
+
+    def fetchone(self):
+        return self._timed(super().fetchone, self._query)
+
+    def fetchmany(self, *args):
+        return self._timed(super().fetchmany, self._query, *args)
+
+    def fetchall(self):
+        return self._timed(super().fetchall, self._query)
+
+    def close(self):
+        self._flush_iteration()
+        super().close()
+
+
+class TimedConnection(sqlite3.Connection):
+    """Соединение, все запросы которого попадают в участок 'db'"""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    # Connection.execute создает курсор в обход cursor(), поэтому переопределяем явно
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def connect(db_path):
+    """sqlite3.connect с замером запросов"""
+    return sqlite3.connect(db_path, factory=TimedConnection)
+
+
+def _before_request():
+    g.metrics_started = time.perf_counter()
+
+
+def _after_request(response):
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    if route != '/metrics':
+        REQUEST_SECONDS.observe(elapsed, method=request.method, route=route)
+        REQUESTS_TOTAL.inc(method=request.method, route=route, status=response.status_code)
+
+    if SERVER_TIMING:
+        entries = [f'{name};dur={seconds * 1000:.1f}'
+                   for name, seconds in sorted(g.get('metrics_spans', {}).items())]
+        entries.append(f'total;dur={elapsed * 1000:.1f}')
+        response.headers['Server-Timing'] = ', '.join(entries)
+    return response
+
+
+def _template_started(sender, template, context, **extra):
+    g.setdefault('metrics_templates', []).append(time.perf_counter())
+
+
+def _template_finished(sender, template, context, **extra):
+    started = g.get('metrics_templates')
+    if started:
+        record_span('render_template', time.perf_counter() - started.pop())
+
+
+def metrics_view():
+    return Response(render(), content_type=CONTENT_TYPE)
+
+
+def init_app(app):
+    """Подключает замеры запросов и шаблонов и маршрут /metrics"""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    before_render_template.connect(_template_started, app)
+    template_rendered.connect(_template_finished, app)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
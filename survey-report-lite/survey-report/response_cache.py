@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Кэш готовых HTTP-ответов для страниц только для чтения.
+
+Ключ кэша: (маршрут, параметры запроса, версия данных). Тело хранится сразу
+в нескольких вариантах (identity, gzip и, если установлен модуль brotli, br),
+поэтому повторный GET не вызывает ни запросов к БД, ни Jinja, ни сжатия.
+Поддерживаются ETag / If-None-Match. Импорт данных вызывает invalidate().
+Остальные HTML/JSON ответы сжимаются обработчиком compress_response.
+"""
+import os
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from flask import request, make_response, session, g
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Ответы меньше этого размера не сжимаем
+MIN_COMPRESS_SIZE = 512
+
+
+def db_file_version(db_path):
+    """
+    Дешевая (один stat) межпроцессная версия данных: любой импорт меняет
+    mtime/размер файла БД, поэтому все воркеры видят новую версию.
+    """
+    try:
+        st = os.stat(db_path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def choose_encoding(accept_encoding, available):
+    """Выбирает лучшее доступное кодирование по заголовку Accept-Encoding"""
+    accepted = set()
+    for part in (accept_encoding or '').split(','):
+        token, _, params = part.strip().partition(';')
+        if params.strip().replace(' ', '') in ('q=0', 'q=0.0'):
+            continue
+        accepted.add(token.strip().lower())
+    for encoding in ('br', 'gzip'):
+        if encoding in available and (encoding in accepted or '*' in accepted):
+            return encoding
+    return 'identity'
+
+
+def compress_variants(body):
+    """Готовит сжатые варианты тела ответа"""
+    variants = {'identity': body}
+    if len(body) >= MIN_COMPRESS_SIZE:
+        variants['gzip'] = gzip.compress(body, compresslevel=6)
+        if brotli is not None:
+            variants['br'] = brotli.compress(body, quality=5)
+    return variants
+
+
+COMPRESSIBLE_MIMETYPES = {'text/html', 'application/json', 'text/csv', 'image/svg+xml'}
+
+
+def compress_response(response):
+    """
+    after_request-обработчик: сжимает HTML/JSON/SVG ответы, которые не прошли
+    через кэш, по заголовку Accept-Encoding конкретного запроса
+    """
+    if (response.status_code != 200 or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    body = response.get_data()
+    if len(body) < MIN_COMPRESS_SIZE:
+        return response
+
+    available = ('br', 'gzip') if brotli is not None else ('gzip',)
+    encoding = choose_encoding(request.headers.get('Accept-Encoding'), available)
+    if encoding == 'br':
+        response.set_data(brotli.compress(body, quality=5))
+    elif encoding == 'gzip':
+        response.set_data(gzip.compress(body, compresslevel=6))
+    else:
+        return response
+
+    response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+class ResponseCache:
+    def __init__(self, version_func, max_entries=256):
+        self.version_func = version_func
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def invalidate(self):
+        """Сбрасывает кэш (вызывается из всех путей импорта)"""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def _key(self):
+        args = tuple(sorted(request.args.items(multi=True)))
+        return (request.path, args, self.version_func(), self._generation)
+
+    def _build_entry(self, response):
+        body = response.get_data()
+        return {
+            'etag': hashlib.sha1(body).hexdigest(),
+            'mimetype': response.mimetype,
+            'variants': compress_variants(body),
+        }
+
+    def _respond(self, entry):
+        etag = entry['etag']
+        if etag in request.if_none_match:
+            response = make_response('', 304)
+        else:
+            encoding = choose_encoding(request.headers.get('Accept-Encoding'),
+                                       entry['variants'])
+            response = make_response(entry['variants'][encoding])
+            response.mimetype = entry['mimetype']
+            if encoding != 'identity':
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(etag)
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+    def cached(self, view):
+        """Декоратор для маршрутов только для чтения"""
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # Страницы с flash-сообщениями не кэшируем
+            if request.method != 'GET' or session.get('_flashes'):
+                g.cache_status = 'bypass'
+                return view(*args, **kwargs)
+
+            key = self._key()
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+            if entry is not None:
+                g.cache_status = 'hit'
+                return self._respond(entry)
+
+            # Статус для журнала запросов
+            g.cache_status = 'miss'
+            response = make_response(view(*args, **kwargs))
+            # Неполную страницу (например, с заглушкой вместо графика) не кэшируем
+            if response.status_code != 200 or response.direct_passthrough or g.pop('cache_skip', False):
+                return response
+
+            entry = self._build_entry(response)
+            with self._lock:
+                self.misses += 1
+                # Пока рендерили, мог пройти импорт
+                if key[3] == self._generation:
+                    self._entries[key] = entry
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+            return self._respond(entry)
+
+        return wrapper
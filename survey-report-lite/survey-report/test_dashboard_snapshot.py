@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""Снимок дашборда: строится при импорте, время импорта хранится в снимке"""
+import sqlite3
+
+from dashboard_snapshot import load_snapshot, SNAPSHOT_FORMAT
+
+WAVE = [
+    [['Укажите вашу локацию ', 'Офисы'], ['Оцените скорость загрузки системы', '3 - Хорошо'],
+     ['Общая удовлетворенность рабочего места', '8']],
+    [['Укажите вашу локацию ', 'Склад'], ['Оцените скорость загрузки системы', '1 - Плохо'],
+     ['Общая удовлетворенность рабочего места', '5']],
+]
+
+
+def snapshots(app_module):
+    conn = sqlite3.connect(app_module.DB_PATH)
+    rows = conn.execute("SELECT version, format FROM dashboard_snapshots").fetchall()
+    conn.close()
+    return rows
+
+
+def test_import_rebuilds_the_only_snapshot(app_module, import_wave):
+    assert 'Успешно импортировано 2' in import_wave(WAVE)
+    [(first, fmt)] = snapshots(app_module)
+    assert fmt == SNAPSHOT_FORMAT
+
+    import_wave(WAVE[:1], 'second.json')
+    [(second, _)] = snapshots(app_module)
+    assert second > first
+
+    conn = app_module.get_db_connection()
+    version, model = load_snapshot(conn)
+    conn.close()
+    assert version == second and model['total_responses'] == 1
+
+
+def test_page_shows_import_time_from_snapshot(app_module, import_wave):
+    import_wave(WAVE)
+    conn = app_module.get_db_connection()
+    _, model = load_snapshot(conn)
+    conn.close()
+
+    page = app_module.app.test_client().get('/dashboard').get_data(as_text=True)
+    assert f"Данные импортированы: {model['imported_at']}" in page
+    assert 'Страница сформирована:' in page
+
+
+def test_snapshot_of_old_format_is_rebuilt(app_module, import_wave):
+    import_wave(WAVE)
+    conn = sqlite3.connect(app_module.DB_PATH)
+    conn.execute("UPDATE dashboard_snapshots SET format = ?", (SNAPSHOT_FORMAT - 1,))
+    conn.commit()
+    conn.close()
+
+    conn = app_module.get_db_connection()
+    version, model = load_snapshot(conn)
+    conn.close()
+    assert model['total_responses'] == 2
+    assert (version, SNAPSHOT_FORMAT) in snapshots(app_module)
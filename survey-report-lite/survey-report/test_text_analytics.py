@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""Частые слова и словосочетания в комментариях: разбор, счетчики, /api/themes"""
+import sqlite3
+
+from text_analytics import (stem, tokenize, comment_question, is_comment, init_text_tables,
+                            update_text_counts, top_terms, comment_count)
+
+QUESTION = 'Ваши предложения по улучшению рабочего места'
+
+
+def test_tokenize_drops_stopwords_digits_and_short_words():
+    assert tokenize('Очень медленно ГРУЗИТСЯ почта, 2 раза в день и ёлки') == [
+        (stem('медленно'), 'медленно'), (stem('грузится'), 'грузится'), (stem('почта'), 'почта'),
+        (stem('раза'), 'раза'), (stem('елки'), 'елки')]
+    # Окончание отсекается, только если основа не короче четырех букв
+    assert stem('принтеры') == stem('принтер') == 'принтер'
+    assert stem('мыши') == 'мыши'
+
+
+def test_comment_detection():
+    assert comment_question(QUESTION + ' / Другое', None) == QUESTION
+    assert comment_question('', 'Оцените работу 1С') == 'Оцените работу 1С'
+    assert comment_question('Оцените скорость загрузки системы', None) is None
+    assert is_comment('Шумно в офисе') and not is_comment('2 - Приемлемо') and not is_comment('7')
+
+
+def test_counts_accumulate_across_batches_once_per_comment():
+    conn = sqlite3.connect(':memory:')
+    init_text_tables(conn.cursor())
+    comments = [(QUESTION, 'Офисы', 'Принтер не печатает, принтер старый'),
+                (QUESTION, 'Склад', 'Новый принтер'),
+                (QUESTION, 'Офисы', 'спасибо')]
+    # Пачками по одному комментарию — те же счетчики, что одной пачкой
+    assert update_text_counts(conn, comments, batch_size=1) == 2
+    assert top_terms(conn, limit=1) == [{'term': 'принтер', 'label': 'принтер', 'count': 2}]
+    assert top_terms(conn, location='Склад', limit=1)[0]['count'] == 1
+    assert comment_count(conn) == 2 and comment_count(conn, location='Офисы') == 1
+
+    update_text_counts(conn, comments[1:2])
+    assert top_terms(conn, limit=1)[0]['count'] == 3
+    assert {'term': f"{stem('новый')} принтер", 'label': 'новый принтер', 'count': 2} in top_terms(conn, 'bigram')
+
+
+def test_api_themes(app_module, import_wave):
+    import_wave([
+        [['Укажите вашу локацию ', 'Офисы'], [QUESTION, 'Медленный принтер']],
+        [['Укажите вашу локацию ', 'Склад'], [QUESTION, 'Сломался принтер']],
+    ])
+    client = app_module.app.test_client()
+    data = client.get('/api/themes?limit=1').get_json()
+    assert data['comments'] == 2
+    assert data['items'] == [{'term': 'принтер', 'label': 'принтер', 'count': 2}]
+    assert data['questions'] == [{'question': QUESTION, 'comments': 2}]
+
+    assert client.get('/api/themes?location=Склад').get_json()['comments'] == 1
+    assert client.get('/api/themes?kind=trigram').status_code == 400
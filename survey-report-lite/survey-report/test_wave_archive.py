@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""Архив волны опроса: точный обратный разбор, типы значений, без перезаписи"""
+import json
+
+import pytest
+
+from wave_archive import WaveArchive, write_archive, archive_path, identical, main
+
+WAVE = [
+    [['Укажите вашу локацию', 'Офисы'], ['Оцените скорость', '3 - Хорошо'], ['Комментарий', 'Все хорошо']],
+    [['Укажите вашу локацию', 'Склад'], ['Оцените скорость', 1], ['Оценка', 1.0], ['Согласие', True]],
+    [['Укажите вашу локацию', 'Склад'], ['Оцените скорость', None], ['Вложенное', {'a': [1, 2]}]],
+    [],
+]
+
+
+def write_json(path, data):
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding='utf-8')
+    return str(path)
+
+
+def test_round_trip_is_exact(tmp_path):
+    path = str(tmp_path / 'wave.srvw')
+    write_archive(WAVE, path)
+    with WaveArchive(path) as archive:
+        assert len(archive) == len(WAVE)
+        assert identical(archive.respondents(), WAVE)
+        assert archive.answers('Укажите вашу локацию') == ['Офисы', 'Склад', 'Склад', None]
+
+
+def test_equal_values_of_different_types_stay_distinct(tmp_path):
+    # 1, 1.0 и True равны и совпадают как ключи dict, но в JSON это разные ответы
+    wave = [[['Ответ', 1]], [['Ответ', 1.0]], [['Ответ', True]], [['Ответ', 1]]]
+    path = str(tmp_path / 'wave.srvw')
+    write_archive(wave, path)
+    with WaveArchive(path) as archive:
+        answers = archive.answers('Ответ')
+    assert [type(answer) for answer in answers] == [int, float, bool, int]
+    assert identical(answers, [1, 1.0, True, 1])
+
+
+def test_identical_compares_types():
+    assert identical([['q', 1]], [['q', 1]])
+    assert not identical([['q', 1]], [['q', True]])
+    assert not identical([['q', 1]], [['q', 1.0]])
+    assert not identical({'a': 1}, {'a': 1, 'b': 2})
+
+
+def test_existing_archive_is_never_overwritten(tmp_path):
+    path = str(tmp_path / 'wave.srvw')
+    write_archive(WAVE, path)
+    with pytest.raises(FileExistsError):
+        write_archive(WAVE[:1], path)
+    with WaveArchive(path) as archive:
+        assert identical(archive.respondents(), WAVE)
+    assert [p.name for p in tmp_path.iterdir()] == ['wave.srvw']
+
+
+def test_archive_name_depends_on_content(tmp_path):
+    first = archive_path(write_json(tmp_path / 'wave.json', WAVE), str(tmp_path))
+    same = archive_path(write_json(tmp_path / 'wave.json', WAVE), str(tmp_path))
+    other = archive_path(write_json(tmp_path / 'wave.json', WAVE[:2]), str(tmp_path))
+    assert first == same
+    assert first != other
+    assert first.startswith(str(tmp_path / 'wave-')) and first.endswith('.srvw')
+
+
+def test_pack_refuses_existing_output(tmp_path):
+    source = write_json(tmp_path / 'wave.json', WAVE)
+    main(['pack', source])
+    with pytest.raises(SystemExit):
+        main(['pack', source])
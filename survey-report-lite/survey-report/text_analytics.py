@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Анализ свободных ответов: частые слова и словосочетания.
+
+Комментарии разбиваются на слова (нижний регистр, ё -> е, стоп-слова,
+простое отсечение окончаний) без внешних моделей. Счетчики слов и биграмм
+хранятся в SQLite по вопросу и локации и наращиваются UPSERT-ом пачками
+по мере импорта — уже обработанные комментарии повторно не читаются.
+Каждое слово или биграмма учитывается один раз на комментарий, то есть
+счетчик показывает, сколько человек упомянули тему.
+"""
+import re
+from collections import Counter
+from itertools import islice
+
+BATCH_SIZE = 500
+
+MIN_WORD_LENGTH = 3
+MIN_STEM_LENGTH = 4
+
+TERM_KINDS = ('term', 'bigram')
+
+# Ответы-оценки вида "2 - Приемлемо" или "7" — это не комментарии
+_RATING_RE = re.compile(r'^\s*\d+\s*(-|$)')
+_WORD_RE = re.compile(r'[a-zа-я0-9]+')
+
+# Вопросы со свободным ответом; ответ под пустым вопросом — комментарий
+# к предыдущей оценке
+COMMENT_KEYWORDS = ('предложения', 'дополнительные приложения', 'какие дополнительные',
+                    'оцените работу')
+
+STOPWORDS = frozenset('''
+    и в во не что он на я с со как а то все она так его но да ты к у же вы за бы по
+    только ее мне было вот от меня еще нет о из ему теперь когда даже ну вдруг ли если
+    уже или ни быть был него до вас нибудь опять уж вам ведь там потом себя ничего ей
+    может они тут где есть надо ней для мы тебя их чем была сам чтоб без будто чего раз
+    тоже себе под будет ж тогда кто этот того потому этого какой совсем ним здесь этом
+    один почти мой тем чтобы нее сейчас были куда зачем всех никогда можно при наконец
+    два об другой хоть после над больше тот через эти нас про всего них какая много
+    разве три эту моя впрочем хорошо свою этой перед иногда лучше чуть том нельзя такой
+    им более всегда конечно всю между это очень также просто есть нужно хотелось бы
+    день добрый здравствуйте спасибо пожалуйста части пока
+'''.replace('ё', 'е').split())
+
+# Окончания, от длинных к коротким
+_ENDINGS = sorted('''
+    иями ями ами ость ости ение ения ений ению ением ого его ому ему ыми ими ешь ишь
+    ать ять ить еть ует уют ает ают яет яют ет ют ит ят ат ых их ой ей ий ый ая яя ое
+    ее ую юю ам ям ах ях ом ем ов ев ия ие ию ии ть а я о е ы и у ю ь й
+'''.split(), key=len, reverse=True)
+
+
+def stem(word):
+    """Отсекает одно окончание, если остается основа не короче MIN_STEM_LENGTH"""
+    for ending in _ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM_LENGTH:
+            return word[:-len(ending)]
+    return word
+
+
+def tokenize(text):
+    """Возвращает [(основа, слово), ...] без стоп-слов и коротких слов"""
+    words = _WORD_RE.findall(str(text).lower().replace('ё', 'е'))
+    return [(stem(word), word) for word in words
+            if len(word) >= MIN_WORD_LENGTH and word not in STOPWORDS and not word.isdigit()]
+
+
+def comment_question(question, previous_question):
+    """
+    Определяет, к какому вопросу относится свободный ответ.
+    Возвращает текст вопроса (без подвопроса после "/") или None.
+    """
+    title = question.strip()
+    if not title:
+        title = (previous_question or '').strip()
+    elif not any(keyword in title.lower() for keyword in COMMENT_KEYWORDS):
+        return None
+    return title.split('/', 1)[0].strip() or None
+
+
+def is_comment(answer):
+    """Непустой текстовый ответ, не являющийся оценкой"""
+    return isinstance(answer, str) and bool(answer.strip()) and not _RATING_RE.match(answer)
+
+
+def init_text_tables(cursor):
+    """Создает таблицы счетчиков"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS text_terms (
+            kind TEXT NOT NULL,
+            term TEXT NOT NULL,
+            question TEXT NOT NULL,
+            location TEXT NOT NULL,
+            label TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (kind, term, question, location)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS text_comments (
+            question TEXT NOT NULL,
+            location TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (question, location)
+        ) WITHOUT ROWID
+    ''')
+
+
+def clear_text_counts(cursor):
+    """Сбрасывает счетчики (импорт заменяет все данные опроса)"""
+    cursor.execute("DELETE FROM text_terms")
+    cursor.execute("DELETE FROM text_comments")
+
+
+def count_batch(comments):
+    """
+    Считает слова и биграммы для пачки комментариев [(вопрос, локация, текст), ...].
+    Возвращает (счетчик терминов, подписи терминов, счетчик комментариев).
+    """
+    terms = Counter()
+    labels = {}
+    documents = Counter()
+
+    for question, location, text in comments:
+        tokens = tokenize(text)
+        if not tokens:
+            continue
+        location = location or ''
+        documents[(question, location)] += 1
+
+        seen = set()
+        for stem_, word in tokens:
+            seen.add(('term', stem_))
+            labels.setdefault(('term', stem_), word)
+        for (stem1, word1), (stem2, word2) in zip(tokens, tokens[1:]):
+            term = f'{stem1} {stem2}'
+            seen.add(('bigram', term))
+            labels.setdefault(('bigram', term), f'{word1} {word2}')
+
+        for kind, term in seen:
+            terms[(kind, term, question, location)] += 1
+
+    return terms, labels, documents
+
+
+def update_text_counts(conn, comments, batch_size=BATCH_SIZE):
+    """
+    Наращивает счетчики по потоку комментариев, пачка за пачкой.
+    Возвращает количество учтенных комментариев.
+    """
+    comments = iter(comments)
+    processed = 0
+    while True:
+        batch = list(islice(comments, batch_size))
+        if not batch:
+            break
+        terms, labels, documents = count_batch(batch)
+        conn.executemany('''
+            INSERT INTO text_terms (kind, term, question, location, label, count)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(kind, term, question, location) DO UPDATE SET count = count + excluded.count
+        ''', [(kind, term, question, location, labels[(kind, term)], count)
+              for (kind, term, question, location), count in terms.items()])
+        conn.executemany('''
+            INSERT INTO text_comments (question, location, count)
+            VALUES (?, ?, ?)
+            ON CONFLICT(question, location) DO UPDATE SET count = count + excluded.count
+        ''', [(question, location, count) for (question, location), count in documents.items()])
+        processed += sum(documents.values())
+    return processed
+
+
+def _filters(question, location):
+    conditions, params = [], []
+    if question:
+        conditions.append('question = ?')
+        params.append(question)
+    if location:
+        conditions.append('location = ?')
+        params.append(location)
+    return ''.join(f' AND {condition}' for condition in conditions), params
+
+
+def top_terms(conn, kind='term', question=None, location=None, limit=10):
+    """Самые частые слова или биграммы, при необходимости по вопросу и локации"""
+    where, params = _filters(question, location)
+    rows = conn.execute(f'''
+        SELECT term, MIN(label), SUM(count) AS total
+        FROM text_terms
+        WHERE kind = ?{where}
+        GROUP BY term
+        ORDER BY total DESC, term
+        LIMIT ?
+    ''', [kind] + params + [limit]).fetchall()
+    return [{'term': term, 'label': label, 'count': count} for term, label, count in rows]
+
+
+def comment_count(conn, question=None, location=None):
+    """Количество учтенных комментариев"""
+    where, params = _filters(question, location)
+    return conn.execute(f"SELECT COALESCE(SUM(count), 0) FROM text_comments WHERE 1 = 1{where}",
+                        params).fetchone()[0]
+
+
+def comment_questions(conn):
+    """Вопросы со свободными ответами и количеством комментариев"""
+    rows = conn.execute('''
+        SELECT question, SUM(count) AS total FROM text_comments
+        GROUP BY question ORDER BY total DESC, question
+    ''').fetchall()
+    return [{'question': question, 'comments': total} for question, total in rows]
+
+
+def build_themes_model(conn, limit=10, per_question=5):
+    """Раздел "Основные темы" для дашборда"""
+    by_question = []
+    for item in comment_questions(conn):
+        item['terms'] = top_terms(conn, 'term', item['question'], limit=per_question)
+        item['bigrams'] = top_terms(conn, 'bigram', item['question'], limit=per_question)
+        by_question.append(item)
+    return {
+        'comments': comment_count(conn),
+        'terms': top_terms(conn, 'term', limit=limit),
+        'bigrams': top_terms(conn, 'bigram', limit=limit),
+        'by_question': by_question
+    }
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Компактный архив волны опроса (.srvw).
+
+Выгрузка JSON — список респондентов, у каждого список пар [вопрос, ответ],
+и полный текст вопроса повторяется в каждой паре. В архиве тексты хранятся
+один раз: общий словарь вопросов в заголовке и словарь ответов для каждой
+позиции (столбца) пары. Сами ответы — коды фиксированной ширины
+(uint8, а если значений больше 255 — uint16 / uint32) по столбцам.
+Каждый блок (коды вопросов, коды ответов, словарь ответов столбца) сжат
+отдельно: zstd, если установлен модуль zstandard, иначе deflate (zlib).
+
+WaveArchive открывает файл через mmap и разбирает только заголовок;
+столбец распаковывается при первом обращении. Архив без потерь:
+respondents() возвращает ровно исходный JSON, включая типы значений
+(1, 1.0 и true — разные ответы; сравнение — identical()).
+
+Имя архива содержит хэш содержимого выгрузки, а существующий архив
+никогда не перезаписывается.
+
+    python wave_archive.py pack волна.json [-o волна.srvw]
+    python wave_archive.py unpack волна.srvw [-o волна.json]
+    python wave_archive.py info волна.srvw
+"""
+import os
+import sys
+import json
+import mmap
+import time
+import zlib
+import hashlib
+import struct
+import argparse
+
+import numpy as np
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MAGIC = b'SRVW'
+FORMAT_VERSION = 1
+
+# Магия, версия, кодек, длина заголовка
+PREFIX = struct.Struct('<4sBBI')
+
+CODECS = {1: 'zlib', 2: 'zstd'}
+DEFAULT_CODEC = 'zstd' if zstandard is not None else 'zlib'
+
+# Код 0 — пары в этой позиции у респондента нет
+ABSENT = 0
+
+EXTENSION = '.srvw'
+
+
+def _compress(data, codec):
+    if codec == 'zstd':
+        return zstandard.ZstdCompressor(level=19).compress(data)
+    return zlib.compress(data, 9)
+
+
+def _decompress(data, codec):
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError('Архив сжат zstd: требуется модуль zstandard')
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+def _dtype(size):
+    """Самый узкий беззнаковый тип для кодов 0..size"""
+    if size <= 0xFF:
+        return '<u1'
+    if size <= 0xFFFF:
+        return '<u2'
+    return '<u4'
+
+
+def _encode_json(value):
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class _Dictionary:
+    """
+    Словарь значений -> коды 1..n. Ключ — JSON значения, поэтому 1, 1.0 и
+    True получают разные коды (в dict они один ключ)
+    """
+
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def __len__(self):
+        return len(self.values)
+
+    def code(self, value):
+        key = _encode_json(value)
+        code = self.codes.get(key)
+        if code is None:
+            self.values.append(value)
+            code = self.codes[key] = len(self.values)
+        return code
+
+
+def identical(a, b):
+    """Равенство данных JSON с учетом типов: 1, 1.0 и True различаются"""
+    if type(a) is not type(b):
+        return False
+    if isinstance(a, list):
+        return len(a) == len(b) and all(identical(x, y) for x, y in zip(a, b))
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(identical(a[key], b[key]) for key in a)
+    return a == b
+
+
+def write_archive(respondents, path, codec=DEFAULT_CODEC):
+    """
+    Записывает волну (список респондентов из пар [вопрос, ответ]) в архив.
+    Существующий файл не перезаписывается (FileExistsError).
+    Возвращает размер файла в байтах.
+    """
+    codec_id = {name: key for key, name in CODECS.items()}[codec]
+    width = max((len(pairs) for pairs in respondents), default=0)
+
+    questions = _Dictionary()
+    columns = []
+    for column in range(width):
+        answers = _Dictionary()
+        question_codes = np.zeros(len(respondents), dtype=np.uint32)
+        answer_codes = np.zeros(len(respondents), dtype=np.uint32)
+        for row, pairs in enumerate(respondents):
+            if column < len(pairs):
+                question, answer = pairs[column]
+                question_codes[row] = questions.code(question)
+                answer_codes[row] = answers.code(answer)
+        columns.append((question_codes, answer_codes, answers.values))
+
+    blocks = []
+    offset = 0
+    layout = []
+
+    def add_block(data):
+        nonlocal offset
+        packed = _compress(data, codec)
+        blocks.append(packed)
+        offset += len(packed)
+        return [offset - len(packed), len(packed)]
+
+    for question_codes, answer_codes, answers in columns:
+        question_dtype = _dtype(len(questions))
+        answer_dtype = _dtype(len(answers))
+        layout.append({
+            'questions': add_block(question_codes.astype(question_dtype).tobytes()),
+            'question_dtype': question_dtype,
+            'codes': add_block(answer_codes.astype(answer_dtype).tobytes()),
+            'dtype': answer_dtype,
+            'answers': add_block(_encode_json(answers)),
+        })
+
+    header = _compress(_encode_json({
+        'respondents': len(respondents),
+        'questions': questions.values,
+        'columns': layout,
+    }), codec)
+
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(PREFIX.pack(MAGIC, FORMAT_VERSION, codec_id, len(header)))
+            f.write(header)
+            for block in blocks:
+                f.write(block)
+        # link, а не replace: атомарно и с ошибкой, если архив уже есть
+        os.link(tmp_path, path)
+    finally:
+        os.remove(tmp_path)
+    return os.path.getsize(path)
+
+
+class WaveArchive:
+    """Чтение архива волны; столбцы распаковываются лениво и кэшируются"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, codec_id, header_size = PREFIX.unpack_from(self._map)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self.close()
+            raise ValueError(f'{path}: не архив волны опроса (или неизвестная версия)')
+        self.codec = CODECS[codec_id]
+        start = PREFIX.size
+        header = json.loads(_decompress(self._map[start:start + header_size], self.codec))
+        self._data_start = start + header_size
+        self._columns = header['columns']
+        self.questions = header['questions']
+        self.size = header['respondents']
+        self._cache = {}
+
+    def __len__(self):
+        return self.size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._map.close()
+
+    @property
+    def width(self):
+        """Число позиций пар (максимальное у респондентов)"""
+        return len(self._columns)
+
+    def _block(self, span):
+        start = self._data_start + span[0]
+        return _decompress(self._map[start:start + span[1]], self.codec)
+
+    def _cached(self, key, load):
+        if key not in self._cache:
+            self._cache[key] = load()
+        return self._cache[key]
+
+    def question_codes(self, column):
+        """Коды вопросов столбца (0 — пары нет)"""
+        layout = self._columns[column]
+        return self._cached(('questions', column),
+                            lambda: np.frombuffer(self._block(layout['questions']), dtype=layout['question_dtype']))
+
+    def answer_codes(self, column):
+        """Коды ответов столбца (0 — пары нет)"""
+        layout = self._columns[column]
+        return self._cached(('codes', column),
+                            lambda: np.frombuffer(self._block(layout['codes']), dtype=layout['dtype']))
+
+    def answer_values(self, column):
+        """Словарь ответов столбца: код - 1 -> текст"""
+        return self._cached(('answers', column), lambda: json.loads(self._block(self._columns[column]['answers'])))
+
+    def column(self, column):
+        """Пары столбца по респондентам: (вопрос, ответ) или None"""
+        questions = self.question_codes(column)
+        codes = self.answer_codes(column)
+        values = self.answer_values(column)
+        return [(self.questions[q - 1], values[a - 1]) if q != ABSENT else None
+                for q, a in zip(questions.tolist(), codes.tolist())]
+
+    def answers(self, question):
+        """
+        Ответы на вопрос по респондентам (None — вопрос не задан). Читаются
+        только коды вопросов и столбцы, где этот вопрос встречается.
+        """
+        try:
+            code = self.questions.index(question) + 1
+        except ValueError:
+            raise KeyError(question) from None
+        result = [None] * self.size
+        for column in range(self.width):
+            rows = np.flatnonzero(self.question_codes(column) == code)
+            if not len(rows):
+                continue
+            codes = self.answer_codes(column)
+            values = self.answer_values(column)
+            for row in rows.tolist():
+                if result[row] is None:
+                    result[row] = values[codes[row] - 1]
+        return result
+
+    def respondents(self):
+        """Исходный список респондентов (как в выгрузке JSON)"""
+        rows = [[] for _ in range(self.size)]
+        for column in range(self.width):
+            for row, pair in enumerate(self.column(column)):
+                if pair is not None:
+                    rows[row].append(list(pair))
+        return rows
+
+
+def content_hash(path):
+    """Хэш содержимого файла (для имени архива)"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def archive_path(json_path, directory):
+    """
+    Путь архива для выгрузки json_path в каталоге directory:
+    <имя>-<хэш содержимого>.srvw. Повторная загрузка того же файла дает тот
+    же путь, другой выгрузки с тем же именем — другой
+    """
+    stem = os.path.splitext(os.path.basename(json_path))[0]
+    return os.path.join(directory, f'{stem}-{content_hash(json_path)}{EXTENSION}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Архив волны опроса (.srvw)')
+    commands = parser.add_subparsers(dest='command', required=True)
+    pack = commands.add_parser('pack', help='JSON -> архив')
+    pack.add_argument('source')
+    pack.add_argument('-o', '--output')
+    pack.add_argument('--codec', choices=sorted(CODECS.values()), default=DEFAULT_CODEC)
+    unpack = commands.add_parser('unpack', help='архив -> JSON')
+    unpack.add_argument('source')
+    unpack.add_argument('-o', '--output')
+    info = commands.add_parser('info', help='сведения об архиве')
+    info.add_argument('source')
+    args = parser.parse_args(argv)
+
+    if args.command == 'pack':
+        with open(args.source, encoding='utf-8') as f:
+            respondents = json.load(f)
+        output = args.output or archive_path(args.source, os.path.dirname(args.source) or '.')
+        if os.path.exists(output):
+            sys.exit(f'{output}: архив уже существует')
+        size = write_archive(respondents, output, args.codec)
+        with WaveArchive(output) as archive:
+            if not identical(archive.respondents(), respondents):
+                sys.exit(f'{output}: проверка архива не прошла')
+        source_size = os.path.getsize(args.source)
+        print(f'{output}: {size} байт ({source_size / size:.0f}x меньше {source_size} байт JSON), '
+              f'{len(respondents)} респондентов')
+    elif args.command == 'unpack':
+        with WaveArchive(args.source) as archive:
+            respondents = archive.respondents()
+        output = args.output or os.path.splitext(args.source)[0] + '.json'
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(respondents, f, ensure_ascii=False, indent=2)
+        print(f'{output}: {len(respondents)} респондентов')
+    else:
+        started = time.perf_counter()
+        with WaveArchive(args.source) as archive:
+            opened = time.perf_counter()
+            respondents = archive.respondents()
+            loaded = time.perf_counter()
+            print(f'{args.source}: {os.path.getsize(args.source)} байт, кодек {archive.codec}')
+            print(f'респондентов: {len(archive)}, вопросов: {len(archive.questions)}, позиций: {archive.width}')
+            print(f'открытие: {(opened - started) * 1000:.2f} мс, '
+                  f'полная распаковка: {(loaded - opened) * 1000:.2f} мс')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Матрица ответов респондентов в файлах рядом с БД (np.memmap).
+
+После импорта ответов respondent_answers выгружается в каталог
+<имя БД>.answers: codes-<метка>.npy — коды ответов uint8 формы
+[вопрос, респондент] (строка массива — столбец анкеты, лежит в файле
+подряд), locations-<метка>.npy — код локации каждого респондента,
+meta.json — список вопросов, локаций и текущая метка. meta.json
+заменяется атомарно последним, поэтому читатель всегда видит целый набор
+файлов; старые файлы остаются открытыми у тех, кто их уже отобразил.
+
+Сборка идет под блокировкой файла .lock (fcntl.flock), поэтому
+одновременные импорты в разных воркерах собирают матрицу по очереди.
+Удаляются только файлы меток старше предыдущей: набор, на который
+ссылался прежний meta.json, остается на диске для читателя, который уже
+прочитал meta.json, но еще не открыл файлы.
+
+Матрица собирается только после импорта ответов и из командной строки,
+но не при старте приложения.
+
+Код ответа — числовое значение ("2 - Приемлемо" -> 2), 0 — ответа нет,
+OTHER_CODE — ответ без числа или вне диапазона uint8.
+
+MatrixStore.current() открывает файлы через np.load(mmap_mode='r'): данные не
+разбираются и не копируются в память процесса, все воркеры делят одну
+копию в page cache, открытие мгновенное при любом объеме.
+
+    python3 answer_matrix.py [путь к БД]   — пересобрать матрицу
+"""
+import os
+import sys
+import json
+import time
+import fcntl
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+from scoring import load_registry, answer_value, build_lookup, BUCKETS
+
+NO_ANSWER = 0
+OTHER_CODE = 255
+
+META_FILE = 'meta.json'
+LOCK_FILE = '.lock'
+
+
+def matrix_dir(db_path):
+    """Каталог матрицы для файла БД: survey_complete.db -> survey_complete.answers"""
+    return os.path.splitext(db_path)[0] + '.answers'
+
+
+def answer_code(answer):
+    value = answer_value(answer)
+    return value if value is not None and 0 < value < OTHER_CODE else OTHER_CODE
+
+
+def _save(directory, name, array):
+    tmp_path = os.path.join(directory, f'.{name}.tmp')
+    with open(tmp_path, 'wb') as f:
+        np.save(f, array)
+    os.replace(tmp_path, os.path.join(directory, name))
+
+
+def _stamp_time(stamp):
+    """Время сборки из метки '<time_ns hex>-<pid>'"""
+    return int(stamp.split('-', 1)[0], 16)
+
+
+def read_meta(directory):
+    """meta.json каталога или None, если матрица еще не собрана"""
+    try:
+        with open(os.path.join(directory, META_FILE), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+@contextmanager
+def _build_lock(directory):
+    """Исключительная блокировка каталога на всю сборку (между процессами)"""
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, LOCK_FILE), 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _remove_old_files(directory, previous_stamp):
+    """Удаляет файлы меток старше previous_stamp (сам набор previous_stamp остается)"""
+    if previous_stamp is None:
+        return
+    oldest_kept = _stamp_time(previous_stamp)
+    for name in os.listdir(directory):
+        if not name.endswith('.npy'):
+            continue
+        stamp = name[:-len('.npy')].split('-', 1)[1]
+        try:
+            if _stamp_time(stamp) < oldest_kept:
+                os.remove(os.path.join(directory, name))
+        except (ValueError, FileNotFoundError):
+            continue
+
+
+def build_matrix(conn, directory):
+    """
+    Выгружает respondent_answers в файлы матрицы. Вопросы — в порядке реестра
+    шкал (плюс вопросы вне реестра), респонденты — по respondent_id.
+    Возвращает meta.
+    """
+    with _build_lock(directory):
+        previous = read_meta(directory)
+        meta = _build(conn, directory)
+        _remove_old_files(directory, previous and previous['stamp'])
+    return meta
+
+
+def _build(conn, directory):
+    _, registry = load_registry(conn)
+    questions = [question_text for _, question_text, _, _ in registry]
+    extra = conn.execute("SELECT DISTINCT question_text FROM respondent_answers ORDER BY question_text").fetchall()
+    questions += [row[0] for row in extra if row[0] not in questions]
+    question_index = {question_text: i for i, question_text in enumerate(questions)}
+
+    respondents = conn.execute("SELECT COUNT(DISTINCT respondent_id) FROM respondent_answers").fetchone()[0]
+    codes = np.zeros((len(questions), respondents), dtype=np.uint8)
+    location_codes = np.zeros(respondents, dtype=np.uint32)
+    locations = {}
+
+    row_index = -1
+    current = None
+    # Порядок первичного ключа: SQLite читает таблицу подряд, без сортировки
+    for respondent_id, question_text, answer, location in conn.execute('''
+        SELECT respondent_id, question_text, answer, COALESCE(location, '') FROM respondent_answers
+        ORDER BY respondent_id, question_text
+    '''):
+        if respondent_id != current:
+            current = respondent_id
+            row_index += 1
+            location_codes[row_index] = locations.setdefault(location, len(locations))
+        codes[question_index[question_text], row_index] = answer_code(answer)
+
+    dtype = np.uint16 if len(locations) <= 0xFFFF else np.uint32
+    stamp = f'{time.time_ns():x}-{os.getpid()}'
+    _save(directory, f'codes-{stamp}.npy', codes)
+    _save(directory, f'locations-{stamp}.npy', location_codes.astype(dtype))
+    meta = {'stamp': stamp, 'respondents': respondents, 'questions': questions, 'locations': list(locations)}
+    tmp_path = os.path.join(directory, f'.{META_FILE}.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(tmp_path, os.path.join(directory, META_FILE))
+    return meta
+
+
+def score_matrix(conn, matrix):
+    """
+    То же, что scoring.score_all, но по матрице, без прохода по
+    respondent_answers: код ответа -> категория через таблицу поиска шкалы,
+    счетчики [локация, категория] вопроса — одним np.bincount по столбцу.
+    None, если в шкалах есть значения, которых нет среди кодов матрицы
+    (0 или от OTHER_CODE) — тогда считать по SQL.
+    """
+    scales, registry = load_registry(conn)
+    if any(value <= NO_ANSWER or value >= OTHER_CODE for points in scales.values() for value in points):
+        return None
+    questions = [question_text for _, question_text, _, _ in registry]
+    scale_names = sorted({scale for _, _, _, scale in registry})
+    lookup = build_lookup(scales, scale_names)
+    overflow = lookup.shape[1] - 1
+
+    # [шкала, код матрицы] -> категория; NO_ANSWER не считается, OTHER_CODE и
+    # значения вне всех шкал — в зарезервированный столбец, как в score_all
+    codes = np.minimum(np.arange(OTHER_CODE + 1), overflow)
+    codes[OTHER_CODE] = overflow
+    buckets_by_code = lookup[:, codes]
+    buckets_by_code[:, NO_ANSWER] = -1
+
+    labels = matrix.meta['locations']
+    locations = sorted(labels)
+    order = np.array([labels.index(location) for location in locations], dtype=np.intp)
+    location_codes = np.asarray(matrix.location_codes, dtype=np.intp)
+    grid = np.zeros((len(questions), len(locations), len(BUCKETS)), dtype=np.int64)
+    for i, (_, question_text, _, scale) in enumerate(registry):
+        if question_text not in matrix.meta['questions']:
+            continue
+        buckets = buckets_by_code[scale_names.index(scale)][matrix.column(question_text)]
+        mapped = buckets >= 0
+        pairs = location_codes[mapped] * len(BUCKETS) + buckets[mapped]
+        counts = np.bincount(pairs, minlength=len(labels) * len(BUCKETS)).reshape(len(labels), len(BUCKETS))
+        grid[i] = counts[order]
+
+    return {'questions': questions, 'categories': [category for _, _, category, _ in registry],
+            'locations': locations, 'counts': grid}
+
+
+class AnswerMatrix:
+    """Открытый набор файлов матрицы (только чтение)"""
+
+    def __init__(self, directory, meta):
+        self.meta = meta
+        stamp = meta['stamp']
+        self.codes = np.load(os.path.join(directory, f'codes-{stamp}.npy'), mmap_mode='r')
+        self.location_codes = np.load(os.path.join(directory, f'locations-{stamp}.npy'), mmap_mode='r')
+
+    def column(self, question_text):
+        """Коды ответов на вопрос по респондентам (отображение файла, без копии)"""
+        return self.codes[self.meta['questions'].index(question_text)]
+
+    def crosstab(self, question_text, by=None):
+        """
+        Распределение ответов на вопрос по локациям или по ответам на вопрос by
+        (только респонденты, ответившие на оба). Возвращает
+        {'rows': коды ответов, 'columns': локации или коды, 'counts': [[...]]}.
+        """
+        values = self.column(question_text)
+        if by is None:
+            groups = self.location_codes
+            labels = self.meta['locations']
+            answered = values != NO_ANSWER
+        else:
+            groups = self.column(by)
+            labels = None
+            answered = (values != NO_ANSWER) & (groups != NO_ANSWER)
+
+        width = len(labels) if labels is not None else OTHER_CODE + 1
+        pairs = values[answered].astype(np.int64) * width + groups[answered]
+        grid = np.bincount(pairs, minlength=(OTHER_CODE + 1) * width).reshape(OTHER_CODE + 1, width)
+
+        rows = np.flatnonzero(grid.sum(axis=1))
+        columns = np.flatnonzero(grid.sum(axis=0))
+        return {
+            'rows': rows.tolist(),
+            'columns': [labels[i] for i in columns] if labels is not None else columns.tolist(),
+            'counts': grid[np.ix_(rows, columns)].tolist()
+        }
+
+
+class MatrixStore:
+    """
+    Последняя собранная матрица каталога. current() проверяет meta.json
+    (один stat) и открывает новый набор файлов после пересборки.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._opened = (None, None)
+
+    def _meta_version(self):
+        try:
+            st = os.stat(os.path.join(self.directory, META_FILE))
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_ino)
+
+    def current(self):
+        """AnswerMatrix или None, если матрица еще не собрана"""
+        version = self._meta_version()
+        if version is None:
+            return None
+        opened_version, matrix = self._opened
+        if version == opened_version:
+            return matrix
+        with self._lock:
+            if self._opened[0] != version:
+                meta = read_meta(self.directory)
+                if meta is None:
+                    return None
+                self._opened = (version, AnswerMatrix(self.directory, meta))
+            return self._opened[1]
+
+
+if __name__ == '__main__':
+    import sqlite3
+    db_path = sys.argv[1] if len(sys.argv) > 1 else 'survey_complete.db'
+    conn = sqlite3.connect(db_path)
+    meta = build_matrix(conn, matrix_dir(db_path))
+    conn.close()
+    print(f"Матрица ответов: {meta['respondents']} респондентов x {len(meta['questions'])} вопросов "
+          f"-> {matrix_dir(db_path)}")
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+import os
+import re
+import hashlib
+import threading
+
+from flask import abort, make_response, request
+
+from response_cache import choose_encoding, compress_variants
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+
+VENDOR_FILES = {
+    'vendor/bootstrap/css/bootstrap.min.css':
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/css/bootstrap.min.css',
+    'vendor/bootstrap/js/bootstrap.bundle.min.js':
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/js/bootstrap.bundle.min.js',
+    'vendor/fontawesome/css/all.min.css':
+        'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css',
+}
+
+FONTAWESOME_WEBFONTS = [
+    f'{name}.{ext}'
+    for name in ('fa-brands-400', 'fa-regular-400', 'fa-solid-900', 'fa-v4compatibility')
+    for ext in ('woff2', 'ttf')
+]
+
+MIMETYPES = {
+    '.css': 'text/css',
+    '.js': 'application/javascript',
+    '.woff2': 'font/woff2',
+    '.ttf': 'font/ttf',
+    '.svg': 'image/svg+xml',
+    '.png': 'image/png',
+}
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+CSS_URL_RE = re.compile(r'''url\((['"]?)([^'"?#()]+)([?#][^'"()]*)?\1\)''')
+
+
+def minify_css(text):
+    text = re.sub(r'/\*.*?\*/', '', text, flags=re.S)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\s*([{};,>])\s*', r'\1', text)
+    return text.replace(';}', '}').strip()
+
+
+def minify_js(text):
+    lines = (line.strip() for line in text.splitlines())
+    return '\n'.join(line for line in lines if line and not line.startswith('//'))
+
+
+class AssetPipeline:
+    def __init__(self, app=None, static_dir=STATIC_DIR, url_prefix='/assets'):
+        self.static_dir = static_dir
+        self.url_prefix = url_prefix
+        self._assets = {}
+        self._by_url = {}
+        self._lock = threading.RLock()
+        self._prebuilt = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.add_url_rule(f'{self.url_prefix}/<path:filename>', 'assets', self.serve)
+        app.jinja_env.globals['asset_url'] = self.asset_url
+        app.jinja_env.globals['vendor_asset'] = self.vendor_asset
+
+    def _build(self, path):
+        full_path = os.path.join(self.static_dir, path)
+        with open(full_path, 'rb') as f:
+            body = f.read()
+
+        base, ext = os.path.splitext(path)
+        if not base.endswith('.min'):
+            if ext == '.css':
+                body = minify_css(body.decode('utf-8')).encode('utf-8')
+            elif ext == '.js':
+                body = minify_js(body.decode('utf-8')).encode('utf-8')
+        if ext == '.css':
+            body = self._fingerprint_urls(path, body.decode('utf-8')).encode('utf-8')
+
+        digest = hashlib.sha256(body).hexdigest()[:12]
+        url_path = f'{base}.{digest}{ext}'
+
+        variants = compress_variants(body) if ext in ('.css', '.js', '.svg', '.ttf') else {'identity': body}
+        return {
+            'url_path': url_path,
+            'etag': digest,
+            'mimetype': MIMETYPES.get(ext, 'application/octet-stream'),
+            'variants': variants,
+        }
+
+    def _fingerprint_urls(self, path, text):
+        directory = os.path.dirname(path)
+
+        def replace(match):
+            quote, target, suffix = match.group(1), match.group(2), match.group(3) or ''
+            if target.startswith(('/', 'data:')) or '://' in target:
+                return match.group(0)
+            resolved = os.path.normpath(os.path.join(directory, target)).replace(os.sep, '/')
+            if not os.path.isfile(os.path.join(self.static_dir, resolved)):
+                return match.group(0)
+            return f'url({quote}{self.asset_url(resolved)}{suffix}{quote})'
+
+        return CSS_URL_RE.sub(replace, text)
+
+    def _get(self, path):
+        asset = self._assets.get(path)
+        if asset is None:
+            with self._lock:
+                asset = self._assets.get(path)
+                if asset is None:
+                    asset = self._build(path)
+                    self._assets[path] = asset
+                    self._by_url[asset['url_path']] = asset
+        return asset
+
+    def asset_url(self, path):
+        return f"{self.url_prefix}/{self._get(path)['url_path']}"
+
+    def vendor_asset(self, path):
+        local_path = f'vendor/{path}'
+        if os.path.exists(os.path.join(self.static_dir, local_path)):
+            return self.asset_url(local_path)
+        return VENDOR_FILES[local_path]
+
+    def prebuild(self):
+        for root, _, files in os.walk(self.static_dir):
+            for name in files:
+                path = os.path.relpath(os.path.join(root, name), self.static_dir)
+                self._get(path.replace(os.sep, '/'))
+        self._prebuilt = True
+
+    def serve(self, filename):
+        asset = self._by_url.get(filename)
+        if asset is None and not self._prebuilt:
+            self.prebuild()
+            asset = self._by_url.get(filename)
+        if asset is None:
+            abort(404)
+
+        if asset['etag'] in request.if_none_match:
+            response = make_response('', 304)
+        else:
+            encoding = choose_encoding(request.headers.get('Accept-Encoding'), asset['variants'])
+            response = make_response(asset['variants'][encoding])
+            response.mimetype = asset['mimetype']
+            if encoding != 'identity':
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(asset['etag'])
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Cache-Control'] = IMMUTABLE
+        return response
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Построение графиков matplotlib без pyplot.
+
+Используется объектный API (Figure + FigureCanvasAgg): у pyplot глобальное
+состояние «текущей фигуры», поэтому параллельные запросы в потоках мешают
+друг другу. Здесь у каждого потока свои фигуры — по одной на шаблон
+графика; фигура очищается и переиспользуется, а не создается заново.
+
+Шаблон (ChartTemplate) задает размер, dpi и оформление. Параметры rcParams
+выставляются один раз при импорте, warmup() при старте воркера рисует
+каждый шаблон с кириллическим текстом: поиск и разбор шрифтов, импорт
+бэкенда и кэши разметки текста заполняются до первого запроса (объекты
+FT2Font matplotlib держит отдельно для каждого потока).
+
+Формат вывода — SURVEY_CHART_FORMAT: svg (по умолчанию; текст остается
+текстом, а не контурами глифов, файл в разы меньше PNG и масштабируется
+под ширину страницы), png или webp. render() возвращает ChartImage —
+байты и тип изображения (для сохранения в БД или data URI).
+Число столбцов ограничено: top_n() оставляет крупнейшие элементы и сводит
+остальные в «Прочие», поэтому размер и время построения графика не растут
+с числом локаций или вариантов ответа.
+"""
+import io
+import os
+import hashlib
+import base64
+import threading
+from collections import namedtuple
+from dataclasses import dataclass
+
+import matplotlib
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+# Глобальные настройки только на чтение после импорта
+matplotlib.rcParams.update({
+    'font.family': 'DejaVu Sans',  # есть кириллица, поставляется с matplotlib
+    'axes.titleweight': 'bold',
+    'savefig.format': 'png',
+    # SVG: текст без перевода в контуры, стабильные id (одинаковые данные — одинаковые байты)
+    'svg.fonttype': 'none',
+    'svg.hashsalt': 'survey-report',
+})
+
+WARMUP_TEXT = 'Удовлетворенность по локациям 0123456789 %'
+
+PLACEHOLDER_TEXT = 'График временно недоступен'
+
+MIME_TYPES = {'svg': 'image/svg+xml', 'png': 'image/png', 'webp': 'image/webp'}
+
+CHART_FORMAT = os.environ.get('SURVEY_CHART_FORMAT', 'svg')
+if CHART_FORMAT not in MIME_TYPES:
+    raise ValueError(f'SURVEY_CHART_FORMAT: неизвестный формат {CHART_FORMAT!r}')
+
+OTHER_LABEL = 'Прочие'
+
+
+class ChartImage(namedtuple('ChartImage', 'mimetype data')):
+    """Готовое изображение графика"""
+    __slots__ = ()
+
+    @property
+    def digest(self):
+        return hashlib.sha1(self.data).hexdigest()[:16]
+
+    @property
+    def data_uri(self):
+        return f'data:{self.mimetype};base64,' + base64.b64encode(self.data).decode('ascii')
+
+
+def shorten(label, width):
+    """Подпись не длиннее width символов"""
+    label = str(label)
+    return label if len(label) <= width else label[:width - 1].rstrip() + '…'
+
+
+def top_n(items, limit, weight, merge):
+    """
+    Не больше limit элементов: limit - 1 самых весомых (weight(элемент))
+    и merge(остальные) — один сводный элемент. Короткий список не меняется.
+    """
+    items = list(items)
+    if limit <= 0 or len(items) <= limit:
+        return items
+    ranked = sorted(items, key=weight, reverse=True)
+    return ranked[:limit - 1] + [merge(ranked[limit - 1:])]
+
+
+@dataclass(frozen=True)
+class ChartTemplate:
+    figsize: tuple = (10, 6)
+    dpi: int = 100
+    title_size: int = 14
+    label_size: int = 12
+    # bbox_inches='tight' при сохранении
+    tight_bbox: bool = True
+    # Сколько столбцов рисовать (остальные сводятся в «Прочие»), длина подписи
+    max_items: int = 20
+    label_chars: int = 30
+    # Высота на столбец, дюймы: горизонтальный график не выше, чем нужно (0 — высота фиксирована)
+    item_height: float = 0
+
+
+class ChartEngine:
+    def __init__(self, templates, fmt=CHART_FORMAT):
+        self.templates = dict(templates)
+        self.fmt = fmt
+        self._local = threading.local()
+        self._placeholders = {}
+
+    def _figure(self, name):
+        """Фигура шаблона для текущего потока (создается при первом использовании)"""
+        figures = getattr(self._local, 'figures', None)
+        if figures is None:
+            figures = self._local.figures = {}
+        fig = figures.get(name)
+        if fig is None:
+            template = self.templates[name]
+            fig = Figure(figsize=template.figsize, dpi=template.dpi)
+            FigureCanvasAgg(fig)
+            figures[name] = fig
+        else:
+            fig.clear()
+        return fig
+
+    def render(self, name, draw, items=None):
+        """
+        Рисует график по шаблону name: draw(ax, template) заполняет оси.
+        items — число столбцов (для шаблонов с item_height).
+        Возвращает ChartImage в формате self.fmt.
+        """
+        template = self.templates[name]
+        fig = self._figure(name)
+        width, height = template.figsize
+        if template.item_height and items:
+            height = min(height, 1.5 + items * template.item_height)
+        fig.set_size_inches(width, height)
+        ax = fig.add_subplot()
+        draw(ax, template)
+        fig.tight_layout()
+
+        buf = io.BytesIO()
+        # Без даты в метаданных SVG: одинаковые данные дают одинаковый файл
+        fig.savefig(buf, format=self.fmt, dpi=template.dpi,
+                    bbox_inches='tight' if template.tight_bbox else None,
+                    metadata={'Date': None} if self.fmt == 'svg' else None)
+        # Оси и артисты больше не нужны; сама фигура остается для следующего графика
+        fig.clear()
+        return ChartImage(MIME_TYPES[self.fmt], buf.getvalue())
+
+    def placeholder(self, name, text=PLACEHOLDER_TEXT):
+        """Заглушка вместо графика: шаблон name с текстом по центру (кэшируется)"""
+        key = (name, text)
+        if key not in self._placeholders:
+            def draw(ax, template):
+                ax.set_axis_off()
+                ax.text(0.5, 0.5, text, ha='center', va='center', fontsize=template.title_size, color='#7f8c8d')
+            self._placeholders[key] = self.render(name, draw)
+        return self._placeholders[key]
+
+    def warmup(self):
+        """Рисует каждый шаблон один раз, чтобы прогреть шрифты и кэш глифов"""
+        def draw(ax, template):
+            bars = ax.barh([WARMUP_TEXT[:12], WARMUP_TEXT[13:25]], [1, 2])
+            ax.set_title(WARMUP_TEXT, fontsize=template.title_size)
+            ax.set_xlabel(WARMUP_TEXT, fontsize=template.label_size)
+            ax.text(bars[0].get_width(), 0, WARMUP_TEXT)
+
+        for name in self.templates:
+            self.render(name, draw)
+
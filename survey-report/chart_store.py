@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Готовые графики в БД.
+
+Графики зависят только от загруженных данных, поэтому строятся один раз —
+после импорта или командой render-charts — и хранятся в таблице
+chart_images (байты изображения, тип и хэш). Страница ссылается на
+/charts/<имя>/<хэш>: URL меняется вместе с содержимым, поэтому браузер
+кэширует изображение бессрочно, а запрос страницы не вызывает matplotlib.
+
+source — необязательный отпечаток входных данных графика (source_digest):
+по нему видно, что данные изменились и график нужно перестроить.
+"""
+import json
+import hashlib
+
+from flask import abort, make_response, url_for
+
+# Изображение по URL с хэшем не меняется
+CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def init_chart_table(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS chart_images (
+            name TEXT PRIMARY KEY,
+            mimetype TEXT NOT NULL,
+            data BLOB NOT NULL,
+            digest TEXT NOT NULL,
+            source TEXT,
+            rendered_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.commit()
+
+
+def source_digest(inputs):
+    """Отпечаток входных данных графика (любые значения, сериализуемые в JSON)"""
+    encoded = json.dumps(inputs, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()
+
+
+def save_chart(conn, name, image, source=None):
+    """Сохраняет график (ChartImage); None — удаляет его (нет данных для графика)"""
+    if image is None:
+        conn.execute("DELETE FROM chart_images WHERE name = ?", (name,))
+        return
+    conn.execute('''
+        INSERT INTO chart_images (name, mimetype, data, digest, source) VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(name) DO UPDATE SET mimetype = excluded.mimetype, data = excluded.data,
+            digest = excluded.digest, source = excluded.source, rendered_at = CURRENT_TIMESTAMP
+    ''', (name, image.mimetype, image.data, image.digest, source))
+
+
+def stored_charts(conn):
+    """Сохраненные графики без самих изображений: {имя: {'digest': ..., 'source': ...}}"""
+    rows = conn.execute("SELECT name, digest, source FROM chart_images").fetchall()
+    return {row[0]: {'digest': row[1], 'source': row[2]} for row in rows}
+
+
+def chart_url(name, digest):
+    return url_for('chart_image', name=name, digest=digest)
+
+
+def init_app(app, connect):
+    """Маршрут /charts/<имя>/<хэш>; connect() — соединение с БД приложения"""
+    def chart_image(name, digest):
+        conn = connect()
+        row = conn.execute("SELECT mimetype, data FROM chart_images WHERE name = ? AND digest = ?",
+                           (name, digest)).fetchone()
+        conn.close()
+        if row is None:
+            abort(404)
+        response = make_response(bytes(row[1]))
+        response.mimetype = row[0]
+        response.set_etag(digest)
+        response.headers['Cache-Control'] = CACHE_CONTROL
+        return response
+
+    app.add_url_rule('/charts/<name>/<digest>', 'chart_image', chart_image)
@@ -0,0 +1,51 @@
+"""
+Общие фикстуры тестов: приложение импортируется с БД и каталогами во
+временном каталоге, каждый тест получает свою пустую БД со схемой init_db().
+"""
+import os
+import csv
+import sqlite3
+import tempfile
+
+import pytest
+
+from answer_matrix import MatrixStore, matrix_dir
+
+_root = tempfile.mkdtemp(prefix='survey-tests-')
+for name, value in (('SURVEY_DB_PATH', os.path.join(_root, 'survey.db')),
+                    ('SURVEY_UPLOAD_FOLDER', os.path.join(_root, 'uploads')),
+                    ('SURVEY_LOG_DIR', os.path.join(_root, 'logs')),
+                    ('SURVEY_PROFILE_DIR', os.path.join(_root, 'profiles'))):
+    os.environ.setdefault(name, value)
+
+
+@pytest.fixture
+def app_module(tmp_path, monkeypatch):
+    """Модуль приложения, переключенный на пустую БД в tmp_path"""
+    import final_with_charts
+    monkeypatch.setattr(final_with_charts, 'DB_PATH', str(tmp_path / 'survey.db'))
+    monkeypatch.setattr(final_with_charts, 'answer_matrix',
+                        MatrixStore(matrix_dir(final_with_charts.DB_PATH)))
+    final_with_charts.init_db()
+    final_with_charts.response_cache.invalidate()
+    return final_with_charts
+
+
+@pytest.fixture
+def conn(app_module):
+    connection = sqlite3.connect(app_module.DB_PATH)
+    yield connection
+    connection.close()
+
+
+@pytest.fixture
+def write_tsv(tmp_path):
+    """write_tsv(имя, заголовок, строки) — файл в формате выгрузки (TSV) в tmp_path"""
+    def write(name, header, rows):
+        path = tmp_path / name
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f, delimiter='\t')
+            writer.writerow(header)
+            writer.writerows(rows)
+        return str(path)
+    return write
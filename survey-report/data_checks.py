@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Проверка согласованности данных опроса.
+
+Заменяет разовые скрипты check_data_consistency.py / compare_with_reality.py /
+verify_fix.py / final_check.py: все инварианты считаются условными агрегатами
+за один проход по каждой таблице, строки-нарушители выбираются только если
+нарушения есть. Количество респондентов берется из данных, а не из константы.
+"""
+import time
+from datetime import datetime
+
+from scoring import BUCKET_WEIGHTS
+from respondent_counts import get_count
+
+# Допустимое расхождение сохраненного процента удовлетворенности
+# с пересчитанным по категориям ответов (в процентных пунктах)
+PERCENT_TOLERANCE = 1.0
+
+# Сколько строк-нарушителей показывать для каждой проверки
+MAX_DETAILS = 10
+
+STATUS_ORDER = ('ok', 'warning', 'error')
+
+# Процент удовлетворенности, пересчитанный так же, как в scoring.score_counts()
+CALCULATED_PERCENT = (f"(positive_responses * {BUCKET_WEIGHTS['positive']}.0"
+                      f" + neutral_responses * {BUCKET_WEIGHTS['neutral']}.0"
+                      f" + negative_responses * {BUCKET_WEIGHTS['negative']}.0) / total_responses")
+
+
+def _check(name, status, message, details=None):
+    return {'name': name, 'status': status, 'message': message, 'details': details or []}
+
+
+def _location_totals(conn):
+    count, responses, bad_values = conn.execute('''
+        SELECT COUNT(*),
+               COALESCE(SUM(responses), 0),
+               COALESCE(SUM(responses < 0 OR satisfaction < 0 OR satisfaction > 10), 0)
+        FROM locations
+    ''').fetchone()
+    return {'count': count, 'responses': responses, 'bad_values': bad_values}
+
+
+def _question_totals(conn, tolerance):
+    # Количество ответов сравнивается только внутри локации: рядом с итогом
+    # по всем локациям лежат строки отдельных локаций с меньшими total_responses
+    mismatched_locations = conn.execute('''
+        SELECT COUNT(*) FROM (
+            SELECT MIN(total_responses) AS min_total, MAX(total_responses) AS max_total
+            FROM questions GROUP BY COALESCE(location, '')
+        ) WHERE min_total != max_total
+    ''').fetchone()[0]
+    row = conn.execute(f'''
+        SELECT COUNT(*),
+               MAX(total_responses),
+               COALESCE(SUM(positive_responses + neutral_responses + negative_responses
+                            != total_responses), 0),
+               COALESCE(SUM(total_responses > 0
+                            AND ABS({CALCULATED_PERCENT} - satisfaction_percent) > ?), 0),
+               COALESCE(SUM(positive_responses < 0 OR neutral_responses < 0
+                            OR negative_responses < 0
+                            OR satisfaction_percent < 0 OR satisfaction_percent > 100), 0)
+        FROM questions
+    ''', (tolerance,)).fetchone()
+    return {
+        'count': row[0],
+        'max_total': row[1],
+        'mismatched_locations': mismatched_locations,
+        'sum_mismatch': row[2],
+        'percent_mismatch': row[3],
+        'bad_values': row[4]
+    }
+
+
+def _details(conn, sql, params=()):
+    cursor = conn.execute(f'{sql} LIMIT {MAX_DETAILS}', params)
+    columns = [col[0] for col in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def run_checks(conn, expected_respondents=None, tolerance=PERCENT_TOLERANCE):
+    """
+    Выполняет все проверки и возвращает отчет:
+    {'status', 'respondents', 'checks': [...], 'checked_at', 'duration_ms'}.
+    expected_respondents — известное количество респондентов, если есть.
+    """
+    started = time.perf_counter()
+    locations = _location_totals(conn)
+    questions = _question_totals(conn, tolerance)
+    checks = []
+
+    # Количество респондентов — счетчик, который ведется при импорте;
+    # каждый респондент отвечает на все вопросы, поэтому total_responses
+    # у вопросов одной локации должен совпадать
+    respondents = get_count(conn) or questions['max_total']
+    if questions['count'] == 0:
+        checks.append(_check('question_totals', 'warning', 'Вопросов в базе нет'))
+    elif questions['mismatched_locations']:
+        checks.append(_check(
+            'question_totals', 'warning',
+            f"Разное количество ответов в вопросах одной локации: "
+            f"локаций с расхождением {questions['mismatched_locations']}",
+            _details(conn, '''
+                SELECT q.id, q.question_text, q.location, q.total_responses, m.max_total
+                FROM questions q
+                JOIN (SELECT COALESCE(location, '') AS location, MAX(total_responses) AS max_total
+                      FROM questions GROUP BY COALESCE(location, '')) m
+                  ON m.location = COALESCE(q.location, '')
+                WHERE q.total_responses != m.max_total
+                ORDER BY q.id
+            ''')))
+    else:
+        checks.append(_check('question_totals', 'ok',
+                             'Количество ответов на вопросы совпадает в пределах каждой локации'))
+
+    if expected_respondents is not None:
+        if respondents != expected_respondents:
+            checks.append(_check('expected_respondents', 'error',
+                                 f'В базе {respondents} респондентов, ожидалось {expected_respondents}'))
+        else:
+            checks.append(_check('expected_respondents', 'ok',
+                                 f'Количество респондентов совпадает: {respondents}'))
+
+    # Сумма по локациям = количество респондентов
+    if locations['count'] == 0:
+        checks.append(_check('location_sum', 'warning', 'Локаций в базе нет'))
+    elif respondents is not None and locations['responses'] != respondents:
+        checks.append(_check('location_sum', 'error',
+                             f"Сумма ответов по локациям {locations['responses']} "
+                             f"не равна количеству респондентов {respondents}"))
+    else:
+        checks.append(_check('location_sum', 'ok',
+                             f"Сумма ответов по локациям: {locations['responses']}"))
+
+    # positive + neutral + negative = total
+    if questions['sum_mismatch']:
+        checks.append(_check(
+            'answer_sum', 'error',
+            f"Сумма положительных, нейтральных и отрицательных ответов не равна total_responses "
+            f"в {questions['sum_mismatch']} вопросах",
+            _details(conn, '''
+                SELECT id, question_text, total_responses,
+                       positive_responses + neutral_responses + negative_responses AS calculated_total
+                FROM questions
+                WHERE positive_responses + neutral_responses + negative_responses != total_responses
+                ORDER BY id
+            ''')))
+    else:
+        checks.append(_check('answer_sum', 'ok', 'Суммы ответов в вопросах сходятся'))
+
+    # Пересчитанный процент ≈ сохраненный
+    if questions['percent_mismatch']:
+        checks.append(_check(
+            'satisfaction_percent', 'warning',
+            f"satisfaction_percent расходится с расчетом более чем на {tolerance} п.п. "
+            f"в {questions['percent_mismatch']} вопросах",
+            _details(conn, f'''
+                SELECT id, question_text, satisfaction_percent,
+                       ROUND({CALCULATED_PERCENT}, 1) AS calculated_percent
+                FROM questions
+                WHERE total_responses > 0
+                  AND ABS({CALCULATED_PERCENT} - satisfaction_percent) > ?
+                ORDER BY id
+            ''', (tolerance,))))
+    else:
+        checks.append(_check('satisfaction_percent', 'ok',
+                             'Проценты удовлетворенности совпадают с расчетом'))
+
+    # Значения вне допустимых диапазонов
+    bad_values = locations['bad_values'] + questions['bad_values']
+    if bad_values:
+        checks.append(_check('value_ranges', 'error',
+                             f'Значений вне допустимого диапазона: {bad_values}'))
+    else:
+        checks.append(_check('value_ranges', 'ok', 'Все значения в допустимых диапазонах'))
+
+    status = max((check['status'] for check in checks), key=STATUS_ORDER.index)
+    return {
+        'status': status,
+        'respondents': respondents,
+        'locations': locations['count'],
+        'questions': questions['count'],
+        'checks': checks,
+        'checked_at': datetime.now().isoformat(timespec='seconds'),
+        'duration_ms': round((time.perf_counter() - started) * 1000, 2)
+    }
+
+
+def problems(report):
+    """Сообщения непройденных проверок"""
+    return [check['message'] for check in report['checks'] if check['status'] != 'ok']
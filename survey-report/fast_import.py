@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Быстрый импорт таблиц locations / questions / tasks.
+
+Листы Excel читаются потоково (python-calamine, если установлен, иначе
+openpyxl в режиме read_only), CSV/TSV — модулем csv с автоопределением
+кодировки и разделителя. Берутся только нужные столбцы, строки сразу
+приводятся к типизированным кортежам и пишутся в БД пачками через
+executemany. Память не растет с размером файла.
+"""
+import io
+import os
+import csv
+import codecs
+import sqlite3
+from itertools import islice
+
+BATCH_SIZE = 5000
+
+# Значение колонки location для вопросов, посчитанных по всем респондентам
+# (итог в файле агрегатов без локации и пересчет по ответам пишут одно и то же)
+ALL_LOCATIONS = 'Все локации'
+
+DELIMITED_EXTENSIONS = {'.csv', '.tsv', '.txt'}
+
+# Разделители CSV в порядке предпочтения
+DELIMITERS = '\t;,|'
+
+# Объем начала файла для определения кодировки и разделителя
+SNIFF_SIZE = 64 * 1024
+
+
+def to_str(value, default=''):
+    if value is None:
+        return default
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    text = str(value).strip()
+    return text if text and text.lower() != 'nan' else default
+
+
+def to_int(value, default=0):
+    if value is None or value == '':
+        return default
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return default
+
+
+def to_float(value, default=0.0):
+    if value is None or value == '':
+        return default
+    try:
+        return float(str(value).replace(',', '.'))
+    except (TypeError, ValueError):
+        return default
+
+
+# Для каждого типа импорта: таблица, столбцы файла по порядку
+# (поле, конвертер, значение по умолчанию) и естественный ключ записи
+IMPORT_SPECS = {
+    'locations': {
+        'table': 'locations',
+        'columns': [('name', to_str, ''), ('category', to_str, ''), ('responses', to_int, 0),
+                    ('satisfaction', to_float, 0.0), ('problems', to_str, '')],
+        'key': ('name',),
+        'label': 'локаций'
+    },
+    'questions': {
+        'table': 'questions',
+        'columns': [('question_text', to_str, ''), ('category', to_str, ''),
+                    ('total_responses', to_int, 0), ('positive_responses', to_int, 0),
+                    ('neutral_responses', to_int, 0), ('negative_responses', to_int, 0),
+                    ('satisfaction_percent', to_float, 0.0), ('location', to_str, ALL_LOCATIONS)],
+        'key': ('question_text', 'location'),
+        'label': 'вопросов'
+    },
+    'tasks': {
+        'table': 'tasks',
+        'columns': [('task_key', to_str, ''), ('summary', to_str, ''), ('status', to_str, 'В работе'),
+                    ('category', to_str, ''), ('location', to_str, ''), ('priority', to_int, 3)],
+        'key': ('task_key',),
+        'label': 'задач'
+    }
+}
+
+
+def upsert_sql(spec):
+    """
+    INSERT ... ON CONFLICT DO UPDATE по естественному ключу.
+    Строка обновляется только если значения действительно изменились,
+    поэтому неизмененные записи не трогают ни страницы БД, ни счетчик изменений.
+    """
+    table = spec['table']
+    fields = [name for name, _, _ in spec['columns']]
+    values = [name for name in fields if name not in spec['key']]
+    return f"""
+        INSERT INTO {table} ({', '.join(fields)})
+        VALUES ({', '.join('?' * len(fields))})
+        ON CONFLICT({', '.join(spec['key'])}) DO UPDATE SET
+            {', '.join(f'{name} = excluded.{name}' for name in values)}
+        WHERE ({', '.join(f'{table}.{name}' for name in values)})
+            IS NOT ({', '.join(f'excluded.{name}' for name in values)})
+    """
+
+
+def natural_key_index(spec):
+    return f"ux_{spec['table']}_{'_'.join(spec['key'])}"
+
+
+def has_natural_key(conn, import_type):
+    """Есть ли уникальный индекс, на который опирается UPSERT импорта"""
+    index_name = natural_key_index(IMPORT_SPECS[import_type])
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?",
+                        (index_name,)).fetchone() is not None
+
+
+def ensure_natural_keys(conn):
+    """
+    Создает уникальные индексы по естественным ключам, не трогая данные.
+    Таблицы с дубликатами от прежних импортов пропускаются: их чистит
+    migrate_natural_keys (flask migrate-keys). Возвращает список таких таблиц.
+    """
+    pending = []
+    for import_type, spec in IMPORT_SPECS.items():
+        if has_natural_key(conn, import_type):
+            continue
+        try:
+            conn.execute(f"CREATE UNIQUE INDEX {natural_key_index(spec)} ON {spec['table']} ({', '.join(spec['key'])})")
+        except sqlite3.IntegrityError:
+            pending.append(spec['table'])
+    conn.commit()
+    return pending
+
+
+def migrate_natural_keys(conn):
+    """
+    Разовая миграция: удаляет дубликаты по естественным ключам, накопленные
+    прежними импортами (остается последняя запись), и создает уникальные
+    индексы. Возвращает {таблица: удалено строк}.
+    """
+    deleted = {}
+    for import_type, spec in IMPORT_SPECS.items():
+        table = spec['table']
+        key = ', '.join(spec['key'])
+        deleted[table] = conn.execute(f"""
+            DELETE FROM {table}
+            WHERE id NOT IN (SELECT MAX(id) FROM {table} GROUP BY {key})
+        """).rowcount
+        conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {natural_key_index(spec)} ON {table} ({key})")
+    conn.commit()
+    return deleted
+
+
+def unify_all_locations(conn):
+    """
+    Приводит итоговые строки вопросов к одному значению location: прежние
+    импорты агрегатов писали '' (или NULL) вместо ALL_LOCATIONS, и вопрос
+    задваивался. Из дубликатов остается последняя запись. Разовая миграция
+    (flask migrate-keys); возвращает число удаленных строк.
+    """
+    deleted = conn.execute('''
+        DELETE FROM questions
+        WHERE (location IS NULL OR location IN ('', :all))
+          AND id NOT IN (SELECT MAX(id) FROM questions
+                         WHERE location IS NULL OR location IN ('', :all)
+                         GROUP BY question_text)
+    ''', {'all': ALL_LOCATIONS}).rowcount
+    conn.execute("UPDATE questions SET location = ? WHERE location IS NULL OR location = ''", (ALL_LOCATIONS,))
+    conn.commit()
+    return deleted
+
+
+def convert_rows(raw_rows, columns):
+    """Приводит сырые строки листа к типизированным кортежам, пропуская пустые"""
+    width = len(columns)
+    converters = [(convert, default) for _, convert, default in columns]
+    for raw in raw_rows:
+        raw = tuple(raw[:width])
+        if not any(value not in (None, '') for value in raw):
+            continue
+        raw += (None,) * (width - len(raw))
+        yield tuple(convert(value, default) for (convert, default), value in zip(converters, raw))
+
+
+def iter_excel_rows(filepath, width, skip_header=True):
+    """Потоково читает первый лист Excel (по умолчанию без строки заголовка)"""
+    ext = os.path.splitext(filepath)[1].lower()
+
+    try:
+        from python_calamine import CalamineWorkbook
+    except ImportError:
+        CalamineWorkbook = None
+
+    if CalamineWorkbook is not None:
+        sheet = CalamineWorkbook.from_path(filepath).get_sheet_by_index(0)
+        rows = sheet.iter_rows()
+        if skip_header:
+            next(rows, None)
+        for row in rows:
+            yield row[:width]
+        return
+
+    if ext == '.xls':
+        # Старый формат openpyxl не читает
+        import pandas as pd
+        df = pd.read_excel(filepath, dtype=object, header=0 if skip_header else None).iloc[:, :width]
+        yield from df.where(df.notna(), None).itertuples(index=False, name=None)
+        return
+
+    from openpyxl import load_workbook
+    workbook = load_workbook(filepath, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        yield from sheet.iter_rows(min_row=2 if skip_header else 1, max_col=width, values_only=True)
+    finally:
+        workbook.close()
+
+
+def detect_encoding(sample):
+    """Определяет кодировку по BOM, иначе пробует UTF-8 и откатывается на cp1251"""
+    if sample.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+    try:
+        sample.decode('utf-8')
+    except UnicodeDecodeError as e:
+        # Образец мог оборваться посреди многобайтового символа
+        if e.start < len(sample) - 3:
+            return 'cp1251'
+    return 'utf-8'
+
+
+def detect_delimiter(text_sample, filepath):
+    """
+    Определяет разделитель по началу файла: подходит тот, с которым все строки
+    образца делятся на одинаковое число колонок (больше одной). Поэтому дробные
+    числа с запятой в CSV через ';' (выгрузка Excel в русской локали) не
+    сбивают выбор. Иначе — csv.Sniffer, по умолчанию — по расширению
+    """
+    rows_sample = text_sample
+    if len(text_sample) >= SNIFF_SIZE:
+        # Последняя строка образца может быть оборвана
+        rows_sample = text_sample[:text_sample.rfind('\n') + 1]
+    for delimiter in DELIMITERS:
+        widths = {len(row) for row in csv.reader(io.StringIO(rows_sample), delimiter=delimiter) if row}
+        if len(widths) == 1 and widths.pop() > 1:
+            return delimiter
+    try:
+        return csv.Sniffer().sniff(text_sample, delimiters=DELIMITERS).delimiter
+    except csv.Error:
+        return '\t' if filepath.lower().endswith('.tsv') else ','
+
+
+def iter_delimited_rows(filepath, width, skip_header=True):
+    """Потоково читает CSV/TSV (по умолчанию без строки заголовка)"""
+    with open(filepath, 'rb') as f:
+        sample = f.read(SNIFF_SIZE)
+    encoding = detect_encoding(sample)
+
+    with open(filepath, 'r', encoding=encoding, errors='replace', newline='') as f:
+        delimiter = detect_delimiter(f.read(SNIFF_SIZE), filepath)
+        f.seek(0)
+        reader = csv.reader(f, delimiter=delimiter)
+        if skip_header:
+            next(reader, None)
+        for row in reader:
+            yield row[:width]
+
+
+def iter_file_rows(filepath, width, skip_header=True):
+    """
+    Выбирает потоковый читатель по расширению файла.
+    width=None — все столбцы строки.
+    """
+    if os.path.splitext(filepath)[1].lower() in DELIMITED_EXTENSIONS:
+        return iter_delimited_rows(filepath, width, skip_header)
+    return iter_excel_rows(filepath, width, skip_header)
+
+
+def bulk_upsert(conn, import_type, rows):
+    """
+    Пишет типизированные строки пачками через UPSERT.
+    Возвращает отчет: сколько строк добавлено, обновлено и осталось без изменений.
+    Новые записи считаются по диапазону id (AUTOINCREMENT только растет),
+    измененные — по rowcount (без изменений, сделанных триггерами),
+    без пересчета всей таблицы.
+    """
+    spec = IMPORT_SPECS[import_type]
+    table = spec['table']
+    sql = upsert_sql(spec)
+
+    max_id_before = conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}").fetchone()[0]
+
+    total = 0
+    changed = 0
+    while True:
+        batch = list(islice(rows, BATCH_SIZE))
+        if not batch:
+            break
+        changed += conn.executemany(sql, batch).rowcount
+        total += len(batch)
+
+    inserted = conn.execute(f"SELECT COUNT(*) FROM {table} WHERE id > ?",
+                            (max_id_before,)).fetchone()[0]
+    return {
+        'total': total,
+        'inserted': inserted,
+        'updated': changed - inserted,
+        'unchanged': total - changed
+    }
+
+
+def format_report(import_type, report):
+    """Текст отчета об импорте для flash-сообщения"""
+    return (f"Импортировано {report['total']} {IMPORT_SPECS[import_type]['label']}: "
+            f"добавлено {report['inserted']}, обновлено {report['updated']}, "
+            f"без изменений {report['unchanged']}")
+
+
+def import_file(conn, import_type, filepath):
+    """Импортирует файл указанного типа, возвращает отчет bulk_upsert()"""
+    if not has_natural_key(conn, import_type):
+        raise ValueError(f"В таблице {IMPORT_SPECS[import_type]['table']} есть дубликаты прежних импортов: "
+                         f"выполните flask migrate-keys")
+    columns = IMPORT_SPECS[import_type]['columns']
+    raw_rows = iter_file_rows(filepath, len(columns))
+    return bulk_upsert(conn, import_type, convert_rows(raw_rows, columns))
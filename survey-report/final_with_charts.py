@@ -1,24 +1,55 @@
 #!/usr/bin/env python3
-from flask import Flask, render_template, request, redirect, url_for, flash
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, g
 import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-import pandas as pd
-import io
-import base64
 import json
 import os
 import sqlite3
 from datetime import datetime
 from werkzeug.utils import secure_filename
+from response_cache import ResponseCache, db_file_version, compress_response
+from assets import AssetPipeline
+from fast_import import IMPORT_SPECS, import_file, format_report, ensure_natural_keys, migrate_natural_keys, unify_all_locations
+from listings import (ensure_listing_indexes, filters_from, page_size_from, distinct_values,
+                      fetch_tasks_page, task_status_summary, TASK_FILTERS,
+                      fetch_locations_page, location_summary, LOCATION_FILTERS)
+from text_search import ensure_search_index, search, PAGE_SIZE as SEARCH_PAGE_SIZE
+from data_checks import run_checks, problems
+from scoring import init_answers_table, import_answers, format_answers_report, load_location_scores, location_scores
+from chart_engine import ChartEngine, ChartTemplate, top_n, shorten, OTHER_LABEL
+import chart_store
+from chart_store import init_chart_table, save_chart, stored_charts, chart_url
+from answer_matrix import MatrixStore, build_matrix, matrix_dir, score_matrix
+from respondent_counts import init_counts_table, reconcile_after_import, get_count, get_counts, LOCATION, QUESTION
+import metrics
+from metrics import span, timed
+from profiling import RequestProfiler
+import request_log
+
+# Путь к БД можно переопределить (например, для нагрузочных тестов)
+DB_PATH = os.environ.get('SURVEY_DB_PATH', '/var/www/survey-report/survey_complete.db')
+
+# Матрица ответов респондентов в файлах рядом с БД (np.memmap, общая для всех воркеров)
+answer_matrix = MatrixStore(matrix_dir(DB_PATH))
 
 app = Flask(__name__)
 app.secret_key = 'survey-report-secret-2025'
-app.config['UPLOAD_FOLDER'] = '/var/www/survey-report/uploads'
+app.config['UPLOAD_FOLDER'] = os.environ.get('SURVEY_UPLOAD_FOLDER', '/var/www/survey-report/uploads')
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
 
+# Журналы запросов и медленных SQL (JSON lines); подключается первым, чтобы видеть итоговый ответ
+request_log.init_app(app, os.environ.get('SURVEY_LOG_DIR', '/var/www/survey-report/logs'))
+# Замеры времени запросов и участков, /metrics
+metrics.init_app(app)
+# Профили медленных запросов (SURVEY_PROFILE_SLOW_MS), /debug/profiles
+profiler = RequestProfiler(os.environ.get('SURVEY_PROFILE_DIR', '/var/www/survey-report/profiles')).init_app(app)
+
+# Статические ресурсы (минификация, отпечатки, бессрочный кэш) и сжатие ответов
+assets = AssetPipeline(app)
+assets.prebuild()
+app.after_request(compress_response)
+
 def init_db():
-    conn = sqlite3.connect('/var/www/survey-report/survey_complete.db')
+    conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     
     cursor.execute('''
@@ -62,27 +93,74 @@ def init_db():
     ''')
     
     conn.commit()
+    # Дубликаты и итоговые строки прежних импортов не трогаются при старте: для них нужна flask migrate-keys
+    pending = ensure_natural_keys(conn)
+    if pending:
+        print(f"Нет уникальных ключей (дубликаты): {', '.join(pending)} — выполните flask migrate-keys")
+    ensure_listing_indexes(conn)
+    ensure_search_index(conn, 'tasks', ('task_key', 'summary'), 'tasks_fts')
+    init_answers_table(conn)
+    init_counts_table(conn)
+    init_chart_table(conn)
     conn.close()
 
 init_db()
 
-ALLOWED_EXTENSIONS = {'xlsx', 'xls', 'csv'}
+# Кэш готовых страниц: сбрасывается при изменении файла БД и после импорта
+response_cache = ResponseCache(lambda: db_file_version(DB_PATH))
+metrics.register_cache('response_cache', response_cache)
+
+ALLOWED_EXTENSIONS = {'xlsx', 'xls', 'csv', 'tsv', 'txt'}
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 def get_db_connection():
-    conn = sqlite3.connect('/var/www/survey-report/survey_complete.db')
+    conn = metrics.connect(DB_PATH)
     conn.row_factory = sqlite3.Row
     return conn
 
+# Готовые графики из БД: /charts/<имя>/<хэш>
+chart_store.init_app(app, get_db_connection)
+
+# Шаблоны графиков; рисуются через объектный API, безопасно из нескольких потоков
+charts = ChartEngine({
+    'locations': ChartTemplate(figsize=(12, 8), item_height=0.35),
+    'questions': ChartTemplate(figsize=(14, 8), item_height=0.35),
+})
+charts.warmup()
+# Заглушки строятся при старте: запрос страницы matplotlib не вызывает
+chart_placeholders = {name: charts.placeholder(name, 'График еще не построен').data_uri for name in charts.templates}
+
+def merge_locations(rest):
+    """Сводная «локация» для графика: средняя удовлетворенность, взвешенная по ответам"""
+    responses = sum(loc['responses'] or 0 for loc in rest)
+    if responses:
+        satisfaction = sum((loc['satisfaction'] or 0) * (loc['responses'] or 0) for loc in rest) / responses
+    else:
+        satisfaction = sum(loc['satisfaction'] or 0 for loc in rest) / len(rest)
+    return {'name': f'{OTHER_LABEL} ({len(rest)})', 'satisfaction': satisfaction, 'responses': responses}
+
+def merge_questions(rest):
+    """Сводный «вопрос» для графика: процент удовлетворенности, взвешенный по ответам"""
+    responses = sum(q['total_responses'] or 0 for q in rest)
+    if responses:
+        percent = sum((q['satisfaction_percent'] or 0) * (q['total_responses'] or 0) for q in rest) / responses
+    else:
+        percent = sum(q['satisfaction_percent'] or 0 for q in rest) / len(rest)
+    return {'question_text': f'{OTHER_LABEL} ({len(rest)})', 'satisfaction_percent': percent,
+            'total_responses': responses}
+
+@timed('chart')
 def create_satisfaction_chart(locations):
     if not locations:
         return None
     
-    fig, ax = plt.subplots(figsize=(12, 8))
+    # Крупнейшие по числу ответов локации, остальные — одним столбцом
+    template = charts.templates['locations']
+    locations = top_n(locations, template.max_items, lambda loc: loc['responses'] or 0, merge_locations)
     
-    loc_names = [loc['name'] for loc in locations]
+    loc_names = [shorten(loc['name'], template.label_chars) for loc in locations]
     satisfaction_scores = [loc['satisfaction'] for loc in locations]
     responses = [loc['responses'] for loc in locations]
     
@@ -102,111 +180,179 @@ def create_satisfaction_chart(locations):
         else:
             colors.append('#e74c3c')
     
-    bars = ax.barh(loc_names, satisfaction_scores, color=colors)
-    ax.set_xlabel('Удовлетворенность (из 10)', fontsize=12)
-    ax.set_title('Удовлетворенность по локациям', fontsize=14, fontweight='bold')
-    ax.set_xlim(0, 10)
-    
-    for bar, score, resp in zip(bars, satisfaction_scores, responses):
-        width = bar.get_width()
-        ax.text(width + 0.1, bar.get_y() + bar.get_height()/2,
-               f'{score:.1f} ({resp} отв.)', ha='left', va='center')
-    
-    plt.tight_layout()
-    
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png', dpi=100, bbox_inches='tight')
-    buf.seek(0)
-    img_base64 = base64.b64encode(buf.getvalue()).decode('utf-8')
-    plt.close()
+    def draw(ax, template):
+        # По позициям: одинаковые после сокращения подписи не сливаются в один столбец
+        bars = ax.barh(range(len(loc_names)), satisfaction_scores, color=colors)
+        ax.set_yticks(range(len(loc_names)), loc_names)
+        ax.set_xlabel('Удовлетворенность (из 10)', fontsize=template.label_size)
+        ax.set_title('Удовлетворенность по локациям', fontsize=template.title_size)
+        ax.set_xlim(0, 10)
+        
+        for bar, score, resp in zip(bars, satisfaction_scores, responses):
+            width = bar.get_width()
+            ax.text(width + 0.1, bar.get_y() + bar.get_height()/2,
+                   f'{score:.1f} ({resp} отв.)', ha='left', va='center')
     
-    return img_base64
+    return charts.render('locations', draw, items=len(loc_names))
 
+@timed('chart')
 def create_questions_chart(questions):
     if not questions:
         return None
     
-    fig, ax = plt.subplots(figsize=(14, 8))
+    template = charts.templates['questions']
+    questions = top_n(questions, template.max_items, lambda q: q['total_responses'] or 0, merge_questions)
     
-    question_texts = [q['question_text'][:30] + '...' if len(q['question_text']) > 30 else q['question_text'] 
-                     for q in questions]
+    question_texts = [shorten(q['question_text'], template.label_chars) for q in questions]
     satisfaction = [q['satisfaction_percent'] for q in questions]
     
     sorted_indices = sorted(range(len(satisfaction)), key=lambda i: satisfaction[i])
     question_texts = [question_texts[i] for i in sorted_indices]
     satisfaction = [satisfaction[i] for i in sorted_indices]
     
-    colors = plt.cm.viridis([s/100 for s in satisfaction])
-    bars = ax.barh(question_texts, satisfaction, color=colors)
-    
-    ax.set_xlabel('Процент удовлетворенности', fontsize=12)
-    ax.set_title('Удовлетворенность по вопросам', fontsize=14, fontweight='bold')
-    ax.set_xlim(0, 100)
-    
-    for bar, score in zip(bars, satisfaction):
-        width = bar.get_width()
-        ax.text(width + 0.5, bar.get_y() + bar.get_height()/2,
-               f'{score:.1f}%', ha='left', va='center')
+    colors = matplotlib.colormaps['viridis']([s/100 for s in satisfaction])
     
-    plt.tight_layout()
-    
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png', dpi=100, bbox_inches='tight')
-    buf.seek(0)
-    img_base64 = base64.b64encode(buf.getvalue()).decode('utf-8')
-    plt.close()
+    def draw(ax, template):
+        bars = ax.barh(range(len(question_texts)), satisfaction, color=colors)
+        ax.set_yticks(range(len(question_texts)), question_texts)
+        
+        ax.set_xlabel('Процент удовлетворенности', fontsize=template.label_size)
+        ax.set_title('Удовлетворенность по вопросам', fontsize=template.title_size)
+        ax.set_xlim(0, 100)
+        
+        for bar, score in zip(bars, satisfaction):
+            width = bar.get_width()
+            ax.text(width + 0.5, bar.get_y() + bar.get_height()/2,
+                   f'{score:.1f}%', ha='left', va='center')
     
-    return img_base64
+    return charts.render('questions', draw, items=len(question_texts))
+
+@timed('charts')
+def render_stored_charts(conn):
+    """
+    Строит графики страниц по всем данным и сохраняет их в БД:
+    после каждого импорта и командой render-charts (после смены оформления)
+    """
+    locations_list = [dict(row) for row in conn.execute('SELECT name, satisfaction, responses FROM locations')]
+    questions_list = [dict(row) for row in conn.execute(
+        'SELECT question_text, satisfaction_percent, total_responses FROM questions')]
+    save_chart(conn, 'locations', create_satisfaction_chart(locations_list))
+    save_chart(conn, 'questions', create_questions_chart(questions_list))
+    conn.commit()
+
+def current_location_scores(conn, location=None):
+    """
+    Разбивка вопросов по локациям: по матрице ответов, если она собрана,
+    иначе из question_location_scores. Порядок тот же: вопрос, локация
+    """
+    matrix = answer_matrix.current()
+    scores = score_matrix(conn, matrix) if matrix is not None else None
+    if scores is None:
+        return load_location_scores(conn, location)
+    rows = [item for item in location_scores(scores) if not location or item['location'] == location]
+    return sorted(rows, key=lambda item: (item['question_text'], item['location']))
+
+def page_chart(conn, name, table):
+    """
+    URL готового графика по данным таблицы table. Графики строятся только при
+    импорте и командой render-charts: если данные есть, а графика нет
+    (импорт до появления графиков), страница получает заглушку и не кэшируется
+    """
+    chart = stored_charts(conn).get(name)
+    if chart is not None:
+        return chart_url(name, chart['digest'])
+    if conn.execute(f'SELECT 1 FROM {table} LIMIT 1').fetchone():
+        g.cache_skip = True
+        return chart_placeholders[name]
+    return None
+
+@app.cli.command('render-charts')
+def render_charts_command():
+    """Перестроить сохраненные графики (например, после смены оформления)"""
+    conn = get_db_connection()
+    render_stored_charts(conn)
+    charts_info = stored_charts(conn)
+    conn.close()
+    response_cache.invalidate()
+    for name, chart in sorted(charts_info.items()):
+        print(f'{name}: {chart["digest"]}')
+
+@app.cli.command('migrate-keys')
+def migrate_keys_command():
+    """Объединить итоговые строки вопросов, удалить дубликаты прежних импортов и создать уникальные ключи"""
+    conn = get_db_connection()
+    merged = unify_all_locations(conn)
+    deleted = migrate_natural_keys(conn)
+    conn.close()
+    response_cache.invalidate()
+    print(f'questions: объединено итоговых строк {merged}')
+    for table, count in deleted.items():
+        print(f'{table}: удалено дубликатов {count}')
+
+@app.cli.command('build-matrix')
+def build_matrix_command():
+    """Пересобрать матрицу ответов (например, для БД, импортированной до ее появления)"""
+    conn = get_db_connection()
+    meta = build_matrix(conn, answer_matrix.directory)
+    conn.close()
+    response_cache.invalidate()
+    print(f"Матрица ответов: {meta['respondents']} респондентов x {len(meta['questions'])} вопросов")
 
 @app.route('/')
 def index():
     return redirect('/locations')
 
 @app.route('/locations')
+@response_cache.cached
 def locations():
+    filters = filters_from(request.args, LOCATION_FILTERS)
+    page_size = page_size_from(request.args)
+    
     conn = get_db_connection()
-    locations_data = conn.execute('SELECT * FROM locations ORDER BY satisfaction DESC').fetchall()
+    locations_list, next_cursor = fetch_locations_page(conn, filters, request.args.get('after'), page_size)
+    summary = location_summary(conn, filters)
+    categories = distinct_values(conn, 'locations', 'category')
+    # Без фильтров общее число респондентов берется из счетчика
+    total_responses = summary['total_responses'] if filters else get_count(conn)
+    # Готовый график по всем локациям (и при фильтрах: запрос страницы графики не рисует)
+    chart = page_chart(conn, 'locations', 'locations')
     conn.close()
     
-    locations_list = []
-    total_responses = 0
-    total_satisfaction = 0
-    
-    for loc in locations_data:
-        loc_dict = dict(loc)
+    for loc_dict in locations_list:
         loc_dict['css_class'] = f"location-{loc_dict.get('category', 'default')}"
-        locations_list.append(loc_dict)
-        total_responses += loc_dict.get('responses', 0)
-        total_satisfaction += loc_dict.get('satisfaction', 0)
-    
-    avg_satisfaction = total_satisfaction / len(locations_list) if locations_list else 0
-    
-    chart = create_satisfaction_chart(locations_list)
     
     return render_template('locations.html',
                          locations=locations_list,
+                         summary=summary,
+                         filters=filters,
+                         categories=categories,
+                         next_cursor=next_cursor,
+                         page_size=page_size,
                          total_responses=total_responses,
-                         avg_satisfaction=round(avg_satisfaction, 1),
+                         avg_satisfaction=round(summary['avg_satisfaction'], 1),
                          chart=chart,
                          now_time=datetime.now().strftime('%d.%m.%Y %H:%M'))
 
 @app.route('/questions')
+@response_cache.cached
 def questions():
     conn = get_db_connection()
     questions_data = conn.execute('SELECT * FROM questions ORDER BY satisfaction_percent DESC').fetchall()
+    scores = current_location_scores(conn)
+    # Количество респондентов — из счетчика, который ведется при импорте
+    total_responses = get_count(conn)
+    chart = page_chart(conn, 'questions', 'questions')
     conn.close()
     
+    # Удовлетворенность по локациям (вопрос x локация): матрица ответов или scoring.py
+    score_locations = sorted({item['location'] for item in scores})
+    scores_by_question = {}
+    for item in scores:
+        scores_by_question.setdefault(item['question_text'], {})[item['location']] = item
+    
     questions_list = []
     total_questions = len(questions_data)
     
-    # ВАЖНО: total_responses - это количество РЕСПОНДЕНТОВ, а не сумма ответов на все вопросы
-    # Предполагаем, что все вопросы были заданы одним и тем же людям
-    # Поэтому берем максимальное значение ответов среди всех вопросов
-    total_responses = 0
-    if questions_data:
-        # Берем первое значение (все вопросы должны иметь одинаковое количество респондентов)
-        total_responses = questions_data[0]['total_responses']
-    
     avg_satisfaction = 0
     
     for q in questions_data:
@@ -216,32 +362,67 @@ def questions():
     
     avg_satisfaction = avg_satisfaction / total_questions if total_questions > 0 else 0
     
-    chart = create_questions_chart(questions_list)
-    
     return render_template('questions.html',
                          questions=questions_list,
                          total_questions=total_questions,
                          total_responses=total_responses,  # Теперь это количество респондентов
                          avg_satisfaction=round(avg_satisfaction, 1),
+                         score_locations=score_locations,
+                         score_matrix=scores_by_question,
                          chart=chart,
                          now_time=datetime.now().strftime('%d.%m.%Y %H:%M'))
 
 @app.route('/tasks')
+@response_cache.cached
 def tasks():
+    filters = filters_from(request.args, TASK_FILTERS)
+    page_size = page_size_from(request.args)
+    
     conn = get_db_connection()
-    tasks_data = conn.execute('SELECT * FROM tasks ORDER BY priority ASC, created_at DESC').fetchall()
+    tasks_list, next_cursor = fetch_tasks_page(conn, filters, request.args.get('after'), page_size)
+    summary = task_status_summary(conn, filters)
+    filter_options = {name: distinct_values(conn, 'tasks', name) for name in TASK_FILTERS}
     conn.close()
     
-    tasks_list = [dict(task) for task in tasks_data]
-    completed_tasks = sum(1 for t in tasks_list if 'Выполнено' in str(t.get('status', '')))
-    total_tasks = len(tasks_list)
-    
     return render_template('tasks_simple.html',
                          tasks=tasks_list,
-                         completed_tasks=completed_tasks,
-                         total_tasks=total_tasks,
+                         summary=summary,
+                         filters=filters,
+                         filter_options=filter_options,
+                         next_cursor=next_cursor,
+                         page_size=page_size,
+                         completed_tasks=summary['completed'],
+                         total_tasks=summary['total'],
                          now_time=datetime.now().strftime('%d.%m.%Y %H:%M'))
 
+@app.route('/search')
+def search_page():
+    query = request.args.get('q', '').strip()
+    page = request.args.get('page', 1, type=int)
+    
+    total, results = 0, []
+    if query:
+        conn = get_db_connection()
+        total, matches = search(conn, 'tasks_fts', query, page, SEARCH_PAGE_SIZE)
+        if matches:
+            ids = [rowid for rowid, _ in matches]
+            rows = conn.execute(f'''
+                SELECT id, task_key, status, location FROM tasks
+                WHERE id IN ({', '.join('?' * len(ids))})
+            ''', ids).fetchall()
+            by_id = {row['id']: dict(row) for row in rows}
+            for rowid, snippet in matches:
+                if rowid in by_id:
+                    results.append(dict(by_id[rowid], snippet=snippet))
+        conn.close()
+    
+    return render_template('search.html',
+                         query=query,
+                         page=page,
+                         page_size=SEARCH_PAGE_SIZE,
+                         total=total,
+                         results=results)
+
 @app.route('/import', methods=['GET', 'POST'])
 def import_data():
     if request.method == 'POST':
@@ -264,59 +445,31 @@ def import_data():
             try:
                 conn = get_db_connection()
                 
-                if import_type == 'locations':
-                    df = pd.read_excel(filepath)
-                    for _, row in df.iterrows():
-                        conn.execute('''
-                            INSERT OR REPLACE INTO locations (name, category, responses, satisfaction, problems)
-                            VALUES (?, ?, ?, ?, ?)
-                        ''', (
-                            str(row.iloc[0]) if len(row) > 0 else '',
-                            str(row.iloc[1]) if len(row) > 1 else '',
-                            int(row.iloc[2]) if len(row) > 2 else 0,
-                            float(row.iloc[3]) if len(row) > 3 else 0.0,
-                            str(row.iloc[4]) if len(row) > 4 else ''
-                        ))
-                    flash(f'Импортировано {len(df)} локаций', 'success')
-                    
-                elif import_type == 'questions':
-                    df = pd.read_excel(filepath)
-                    for _, row in df.iterrows():
-                        conn.execute('''
-                            INSERT OR REPLACE INTO questions 
-                            (question_text, category, total_responses, positive_responses, 
-                             neutral_responses, negative_responses, satisfaction_percent, location)
-                            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                        ''', (
-                            str(row.iloc[0]) if len(row) > 0 else '',
-                            str(row.iloc[1]) if len(row) > 1 else '',
-                            int(row.iloc[2]) if len(row) > 2 else 0,
-                            int(row.iloc[3]) if len(row) > 3 else 0,
-                            int(row.iloc[4]) if len(row) > 4 else 0,
-                            int(row.iloc[5]) if len(row) > 5 else 0,
-                            float(row.iloc[6]) if len(row) > 6 else 0.0,
-                            str(row.iloc[7]) if len(row) > 7 else ''
-                        ))
-                    flash(f'Импортировано {len(df)} вопросов', 'success')
+                with span('import'):
+                    if import_type in IMPORT_SPECS:
+                        report = import_file(conn, import_type, filepath)
+                        reconcile_after_import(conn)
+                        flash(format_report(import_type, report), 'success')
+                    elif import_type == 'answers':
+                        # Ответы респондентов: статистика вопросов пересчитывается по шкалам
+                        report = import_answers(conn, filepath)
+                        flash(format_answers_report(report), 'success')
+                        if 'warning' in report:
+                            flash(report['warning'], 'warning')
                     
-                elif import_type == 'tasks':
-                    df = pd.read_excel(filepath)
-                    for _, row in df.iterrows():
-                        conn.execute('''
-                            INSERT OR REPLACE INTO tasks (task_key, summary, status, category, location, priority)
-                            VALUES (?, ?, ?, ?, ?, ?)
-                        ''', (
-                            str(row.iloc[0]) if len(row) > 0 else '',
-                            str(row.iloc[1]) if len(row) > 1 else '',
-                            str(row.iloc[2]) if len(row) > 2 else 'В работе',
-                            str(row.iloc[3]) if len(row) > 3 else '',
-                            str(row.iloc[4]) if len(row) > 4 else '',
-                            int(row.iloc[5]) if len(row) > 5 else 3
-                        ))
-                    flash(f'Импортировано {len(df)} задач', 'success')
+                    conn.commit()
+                    if import_type == 'answers':
+                        build_matrix(conn, answer_matrix.directory)
                 
-                conn.commit()
+                # Проверяем согласованность данных после каждого импорта
+                with span('data_checks'):
+                    report = run_checks(conn)
+                for message in problems(report):
+                    flash(f'Проверка данных: {message}', 'warning')
+                # Графики строятся здесь, а не при открытии страниц
+                render_stored_charts(conn)
                 conn.close()
+                response_cache.invalidate()
                 
             except Exception as e:
                 flash(f'Ошибка импорта: {str(e)}', 'error')
@@ -326,6 +479,58 @@ def import_data():
     return render_template('import_simple.html',
                          now_time=datetime.now().strftime('%d.%m.%Y %H:%M'))
 
+@app.route('/api/scores')
+@response_cache.cached
+def api_scores():
+    # Статистика вопросов по локациям (?location= — одна локация)
+    conn = get_db_connection()
+    scores = current_location_scores(conn, request.args.get('location'))
+    conn.close()
+    
+    return jsonify({'scores': scores})
+
+@app.route('/api/crosstab')
+@response_cache.cached
+def api_crosstab():
+    # Ответы на вопрос ?question= по локациям (или по ответам на вопрос ?by=) из матрицы ответов
+    question_text = request.args.get('question', '')
+    by = request.args.get('by') or None
+    matrix = answer_matrix.current()
+    if matrix is None:
+        return jsonify({'error': 'Матрица ответов не собрана: импортируйте ответы или выполните flask build-matrix'}), 404
+    
+    for name in (question_text, by):
+        if name is not None and name not in matrix.meta['questions']:
+            return jsonify({'error': f'Неизвестный вопрос: {name}', 'questions': matrix.meta['questions']}), 400
+    
+    table = matrix.crosstab(question_text, by)
+    return jsonify(dict(table, question=question_text, by=by or 'location',
+                        respondents=matrix.meta['respondents']))
+
+@app.route('/api/counts')
+def api_counts():
+    # Количество респондентов: всего, по локациям и знаменатели вопросов
+    conn = get_db_connection()
+    counts = {
+        'respondents': get_count(conn),
+        'locations': get_counts(conn, LOCATION),
+        'questions': get_counts(conn, QUESTION)
+    }
+    conn.close()
+    
+    return jsonify(counts)
+
+@app.route('/api/health/data')
+def health_data():
+    # ?expected=N — сверить с известным количеством респондентов
+    expected = request.args.get('expected', type=int)
+    
+    conn = get_db_connection()
+    report = run_checks(conn, expected)
+    conn.close()
+    
+    return jsonify(report), 503 if report['status'] == 'error' else 200
+
 if __name__ == '__main__':
     if not os.path.exists(app.config['UPLOAD_FOLDER']):
         os.makedirs(app.config['UPLOAD_FOLDER'])
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 import sqlite3
 import sys
+from fast_import import ensure_natural_keys
 
 def init_db():
     """Создаем таблицы если их нет"""
@@ -51,6 +52,9 @@ def init_db():
     ''')
     
     conn.commit()
+    
+    # Уникальные естественные ключи для UPSERT при импорте
+    ensure_natural_keys(conn)
     print("✅ Таблицы созданы")
     return conn, cursor
 
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Постраничный вывод задач и локаций.
+
+Используется keyset-пагинация (курсор — значения ключа сортировки последней
+строки страницы), поэтому стоимость страницы не зависит от ее номера и
+размера таблицы. Составные индексы совпадают с порядком сортировки,
+агрегаты по статусам и категориям считаются в SQL.
+
+Сравнение (a, b) < (?, ?) не пропускает строки только при отсутствии NULL
+в ключах сортировки, поэтому ensure_listing_indexes заполняет пустые ключи
+(импорт пишет значения по умолчанию, NULL остаются от старых загрузок).
+"""
+import json
+import base64
+import binascii
+
+from flask import abort
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Фильтры, которые можно передать в строке запроса
+TASK_FILTERS = ('status', 'category', 'location')
+LOCATION_FILTERS = ('category',)
+
+LISTING_INDEXES = [
+    # /tasks: ORDER BY priority ASC, created_at DESC, id DESC (+ фильтры)
+    "CREATE INDEX IF NOT EXISTS ix_tasks_order ON tasks (priority, created_at DESC, id DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_tasks_status_order ON tasks (status, priority, created_at DESC, id DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_tasks_category_order ON tasks (category, priority, created_at DESC, id DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_tasks_location_order ON tasks (location, priority, created_at DESC, id DESC)",
+    # /locations: ORDER BY satisfaction DESC, id DESC (+ фильтр по категории)
+    "CREATE INDEX IF NOT EXISTS ix_locations_order ON locations (satisfaction DESC, id DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_locations_category_order ON locations (category, satisfaction DESC, id DESC)",
+]
+
+
+# NULL в ключах сортировки -> значение по умолчанию столбца. Пустой created_at
+# заменяется самой ранней датой: при DESC-сортировке такие строки, как и
+# прежде, идут последними
+NULL_KEY_BACKFILL = [
+    "UPDATE tasks SET priority = 3 WHERE priority IS NULL",
+    "UPDATE tasks SET created_at = '1970-01-01 00:00:00' WHERE created_at IS NULL",
+    "UPDATE locations SET satisfaction = 0.0 WHERE satisfaction IS NULL",
+]
+
+
+def ensure_listing_indexes(conn):
+    """Создает индексы под сортировки и фильтры списков, заполняет NULL в ключах сортировки"""
+    for sql in NULL_KEY_BACKFILL:
+        conn.execute(sql)
+    for sql in LISTING_INDEXES:
+        conn.execute(sql)
+    conn.commit()
+
+
+def encode_cursor(values):
+    """Упаковывает ключ сортировки последней строки в токен для URL"""
+    raw = json.dumps(list(values), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, length):
+    """
+    Распаковывает токен курсора (без токена — первая страница). Поддельный
+    или испорченный ?after= отвечает 400: значения идут параметрами в SQL
+    """
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        abort(400)
+    if (not isinstance(values, list) or len(values) != length
+            or not all(value is None or isinstance(value, (str, int, float)) for value in values)):
+        abort(400)
+    return values
+
+
+def page_size_from(args):
+    """Размер страницы из ?limit=, ограниченный MAX_PAGE_SIZE"""
+    try:
+        size = int(args.get('limit', PAGE_SIZE))
+    except (TypeError, ValueError):
+        size = PAGE_SIZE
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def filters_from(args, allowed):
+    """Непустые фильтры из строки запроса"""
+    return {name: args.get(name) for name in allowed if args.get(name)}
+
+
+def where_clause(filters):
+    """Условие WHERE (без ключевого слова) и параметры для фильтров"""
+    if not filters:
+        return '1 = 1', []
+    return ' AND '.join(f'{name} = ?' for name in filters), list(filters.values())
+
+
+def fetch_tasks_page(conn, filters, cursor_token, page_size):
+    """
+    Страница задач в порядке priority ASC, created_at DESC, id DESC.
+    Порядок смешанный, поэтому продолжение после курсора — объединение двух
+    диапазонных выборок по индексу: тот же приоритет с меньшими (created_at, id)
+    и все следующие приоритеты.
+    """
+    where, params = where_clause(filters)
+    cursor = decode_cursor(cursor_token, 3)
+
+    if cursor is None:
+        rows = conn.execute(f'''
+            SELECT * FROM tasks WHERE {where}
+            ORDER BY priority ASC, created_at DESC, id DESC
+            LIMIT ?
+        ''', params + [page_size + 1]).fetchall()
+    else:
+        priority, created_at, task_id = cursor
+        rows = conn.execute(f'''
+            SELECT * FROM (
+                SELECT * FROM tasks
+                WHERE {where} AND priority = ? AND (created_at, id) < (?, ?)
+                ORDER BY created_at DESC, id DESC
+                LIMIT ?
+            )
+            UNION ALL
+            SELECT * FROM (
+                SELECT * FROM tasks
+                WHERE {where} AND priority > ?
+                ORDER BY priority ASC, created_at DESC, id DESC
+                LIMIT ?
+            )
+            ORDER BY priority ASC, created_at DESC, id DESC
+            LIMIT ?
+        ''', params + [priority, created_at, task_id, page_size + 1]
+             + params + [priority, page_size + 1]
+             + [page_size + 1]).fetchall()
+
+    rows = [dict(row) for row in rows]
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor((last['priority'], last['created_at'], last['id']))
+    return rows, next_cursor
+
+
+def task_status_summary(conn, filters):
+    """Количество задач по статусам (одна агрегирующая выборка по индексу)"""
+    where, params = where_clause(filters)
+    counts = dict(conn.execute(f'''
+        SELECT status, COUNT(*) FROM tasks WHERE {where} GROUP BY status
+    ''', params).fetchall())
+    return {
+        'total': sum(counts.values()),
+        'completed': sum(count for status, count in counts.items() if 'Выполнено' in str(status or '')),
+        'in_progress': counts.get('В работе', 0),
+        'planned': counts.get('Запланировано', 0),
+        'by_status': counts
+    }
+
+
+def distinct_values(conn, table, column):
+    """Варианты значения для выпадающего фильтра"""
+    return [row[0] for row in conn.execute(f'''
+        SELECT {column} FROM {table}
+        WHERE {column} IS NOT NULL AND {column} != ''
+        GROUP BY {column} ORDER BY {column}
+    ''').fetchall()]
+
+
+def fetch_locations_page(conn, filters, cursor_token, page_size):
+    """Страница локаций в порядке satisfaction DESC, id DESC"""
+    where, params = where_clause(filters)
+    cursor = decode_cursor(cursor_token, 2)
+
+    if cursor is None:
+        rows = conn.execute(f'''
+            SELECT * FROM locations WHERE {where}
+            ORDER BY satisfaction DESC, id DESC
+            LIMIT ?
+        ''', params + [page_size + 1]).fetchall()
+    else:
+        rows = conn.execute(f'''
+            SELECT * FROM locations
+            WHERE {where} AND (satisfaction, id) < (?, ?)
+            ORDER BY satisfaction DESC, id DESC
+            LIMIT ?
+        ''', params + cursor + [page_size + 1]).fetchall()
+
+    rows = [dict(row) for row in rows]
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor((last['satisfaction'], last['id']))
+    return rows, next_cursor
+
+
+def location_summary(conn, filters):
+    """Сводка по локациям, посчитанная в SQL"""
+    where, params = where_clause(filters)
+    count, total_responses, avg_satisfaction = conn.execute(f'''
+        SELECT COUNT(*), COALESCE(SUM(responses), 0), COALESCE(AVG(satisfaction), 0)
+        FROM locations WHERE {where}
+    ''', params).fetchone()
+    categories = dict(conn.execute(f'''
+        SELECT category, COUNT(*) FROM locations WHERE {where} GROUP BY category
+    ''', params).fetchall())
+    best = conn.execute(f'''
+        SELECT name, satisfaction FROM locations WHERE {where}
+        ORDER BY satisfaction DESC, id DESC LIMIT 1
+    ''', params).fetchone()
+    worst = conn.execute(f'''
+        SELECT name, satisfaction FROM locations WHERE {where}
+        ORDER BY satisfaction ASC, id ASC LIMIT 1
+    ''', params).fetchone()
+    return {
+        'count': count,
+        'total_responses': total_responses,
+        'avg_satisfaction': avg_satisfaction,
+        'categories': categories,
+        'best': dict(best) if best else None,
+        'worst': dict(worst) if worst else None
+    }
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+import io
+import os
+import re
+import sys
+import time
+import pstats
+import cProfile
+import threading
+from collections import Counter
+from datetime import datetime
+
+from flask import g, request, abort, send_from_directory, render_template_string
+
+SLOW_MS = float(os.environ.get('SURVEY_PROFILE_SLOW_MS') or 0)
+ALLOW_FLAG = os.environ.get('SURVEY_PROFILE_FLAG', '') not in ('', '0')
+PROFILER = os.environ.get('SURVEY_PROFILER', 'cprofile')
+ALLOWED_ADDRS = tuple(addr.strip() for addr in
+                      os.environ.get('SURVEY_PROFILE_ALLOW', '127.0.0.1,::1').split(',') if addr.strip())
+
+SAMPLE_INTERVAL = 0.005
+MAX_PROFILES = 50
+SUMMARY_LINES = 40
+
+PROFILE_EXTENSIONS = ('.pstats', '.txt', '.collapsed')
+
+_active = threading.Lock()
+
+INDEX_TEMPLATE = '''<!DOCTYPE html>
+<html lang="ru">
+<head><meta charset="utf-8"><title>Профили запросов</title></head>
+<body>
+<h1>Профили запросов</h1>
+<p>Порог: {{ slow_ms or '—' }} мс, профайлер: {{ profiler }}, ?profile=1: {{ 'да' if allow_flag else 'нет' }}</p>
+{% if captures %}
+<table border="1" cellpadding="4" cellspacing="0">
+<tr><th>Время</th><th>Запрос</th><th>Длительность, мс</th><th>Файлы</th></tr>
+{% for item in captures %}
+<tr>
+<td>{{ item.time }}</td><td>{{ item.request }}</td><td>{{ item.ms }}</td>
+<td>{% for name in item.files %}<a href="{{ url_for('debug_profile_file', name=name) }}">{{ name.rsplit('.', 1)[1] }}</a> {% endfor %}</td>
+</tr>
+{% endfor %}
+</table>
+{% else %}
+<p>Снимков пока нет.</p>
+{% endif %}
+</body>
+</html>'''
+
+_NAME_RE = re.compile(r'^(\d{8}-\d{6}-\d{6})_([A-Z]+)_(.*)_(\d+)ms$')
+
+
+class StackSampler:
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def collapsed(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+class RequestProfiler:
+    def __init__(self, directory, slow_ms=SLOW_MS, allow_flag=ALLOW_FLAG, profiler=PROFILER,
+                 allowed_addrs=ALLOWED_ADDRS):
+        self.directory = directory
+        self.slow_ms = slow_ms
+        self.allow_flag = allow_flag
+        self.profiler = profiler
+        self.allowed_addrs = allowed_addrs
+
+    @property
+    def enabled(self):
+        return bool(self.slow_ms or self.allow_flag)
+
+    def _start(self):
+        forced = self.allow_flag and request.args.get('profile') == '1' and self._trusted()
+        if not (forced or self.slow_ms) or request.path.startswith('/debug/profiles'):
+            return
+        if not _active.acquire(blocking=False):
+            return
+        if self.profiler == 'sample':
+            profile = StackSampler(threading.get_ident())
+            profile.start()
+        else:
+            profile = cProfile.Profile()
+            profile.enable()
+        g.profile = (profile, forced, time.perf_counter())
+
+    def _stop(self, response=None):
+        state = g.pop('profile', None)
+        if state is None:
+            return response
+        profile, forced, started = state
+        try:
+            if isinstance(profile, StackSampler):
+                profile.stop()
+            else:
+                profile.disable()
+        finally:
+            _active.release()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if forced or elapsed_ms >= self.slow_ms:
+            self.save(profile, elapsed_ms)
+        return response
+
+    def _teardown(self, exc):
+        self._stop()
+
+    def save(self, profile, elapsed_ms):
+        os.makedirs(self.directory, exist_ok=True)
+        route = re.sub(r'[^A-Za-z0-9_]+', '-', request.path).strip('-') or 'root'
+        base = os.path.join(self.directory, f"{datetime.now():%Y%m%d-%H%M%S-%f}_{request.method}_{route}_"
+                                            f"{int(elapsed_ms)}ms")
+        if isinstance(profile, StackSampler):
+            with open(base + '.collapsed', 'w', encoding='utf-8') as f:
+                f.write(profile.collapsed())
+        else:
+            profile.dump_stats(base + '.pstats')
+            summary = io.StringIO()
+            stats = pstats.Stats(profile, stream=summary)
+            stats.sort_stats('cumulative').print_stats(SUMMARY_LINES)
+            with open(base + '.txt', 'w', encoding='utf-8') as f:
+                f.write(f'{request.method} {request.path}  {elapsed_ms:.1f} ms\n')
+                f.write(summary.getvalue())
+        self._prune()
+
+    def _files(self):
+        try:
+            return sorted(name for name in os.listdir(self.directory) if name.endswith(PROFILE_EXTENSIONS))
+        except FileNotFoundError:
+            return []
+
+    def _prune(self):
+        captures = sorted({name.rsplit('.', 1)[0] for name in self._files()})
+        stale = set(captures[:-MAX_PROFILES])
+        for name in self._files():
+            if name.rsplit('.', 1)[0] in stale:
+                os.remove(os.path.join(self.directory, name))
+
+    def captures(self):
+        grouped = {}
+        for name in self._files():
+            grouped.setdefault(name.rsplit('.', 1)[0], []).append(name)
+        items = []
+        for base, files in sorted(grouped.items(), reverse=True):
+            match = _NAME_RE.match(base)
+            if match is None:
+                continue
+            stamp, method, route, ms = match.groups()
+            items.append({
+                'time': datetime.strptime(stamp, '%Y%m%d-%H%M%S-%f').strftime('%d.%m.%Y %H:%M:%S'),
+                'request': f"{method} /{route.replace('-', '/') if route != 'root' else ''}",
+                'ms': int(ms),
+                'files': files
+            })
+        return items
+
+    def _trusted(self):
+        return request.remote_addr in self.allowed_addrs
+
+    def _check_access(self):
+        if not self.enabled:
+            abort(404)
+        if not self._trusted():
+            abort(403)
+
+    def index_view(self):
+        self._check_access()
+        return render_template_string(INDEX_TEMPLATE, captures=self.captures(), slow_ms=self.slow_ms,
+                                      profiler=self.profiler, allow_flag=self.allow_flag)
+
+    def file_view(self, name):
+        self._check_access()
+        if not name.endswith(PROFILE_EXTENSIONS):
+            abort(404)
+        return send_from_directory(self.directory, name, as_attachment=name.endswith('.pstats'),
+                                   mimetype=None if name.endswith('.pstats') else 'text/plain')
+
+    def init_app(self, app):
+        app.before_request(self._start)
+        app.after_request(self._stop)
+        app.teardown_request(self._teardown)
+        app.add_url_rule('/debug/profiles', 'debug_profiles', self.index_view)
+        app.add_url_rule('/debug/profiles/<name>', 'debug_profile_file', self.file_view)
+        return self
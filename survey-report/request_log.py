@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from logging.handlers import WatchedFileHandler
+
+from flask import g, has_request_context, request
+
+import metrics
+
+SLOW_QUERY_MS = float(os.environ.get('SURVEY_SLOW_QUERY_MS') or 100)
+
+PLAN_CACHE_SIZE = 256
+
+MAX_SQL_LENGTH = 2000
+
+EXPLAINABLE = ('select', 'with', 'insert', 'update', 'delete', 'replace')
+
+access_logger = logging.getLogger('survey.access')
+query_logger = logging.getLogger('survey.queries')
+
+_plans = OrderedDict()
+_plans_lock = threading.Lock()
+
+
+class JsonLinesFormatter(logging.Formatter):
+    def format(self, record):
+        document = {'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+                    'event': record.getMessage()}
+        document.update(getattr(record, 'fields', {}))
+        return json.dumps(document, ensure_ascii=False, default=str)
+
+
+def _configure(logger, path):
+    if any(getattr(handler, 'baseFilename', None) == os.path.abspath(path) for handler in logger.handlers):
+        return
+    handler = WatchedFileHandler(path, encoding='utf-8')
+    handler.setFormatter(JsonLinesFormatter())
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def query_plan(connection, sql, parameters):
+    with _plans_lock:
+        plan = _plans.get(sql)
+        if plan is not None:
+            _plans.move_to_end(sql)
+            return plan
+    try:
+        rows = sqlite3.Connection.execute(connection, f'EXPLAIN QUERY PLAN {sql}', parameters).fetchall()
+        plan = [row[3] for row in rows]
+    except sqlite3.Error as e:
+        plan = [f'EXPLAIN failed: {e}']
+    with _plans_lock:
+        _plans[sql] = plan
+        while len(_plans) > PLAN_CACHE_SIZE:
+            _plans.popitem(last=False)
+    return plan
+
+
+def log_slow_query(cursor, sql, parameters, seconds):
+    elapsed_ms = seconds * 1000
+    if elapsed_ms < SLOW_QUERY_MS:
+        return
+    statement = ' '.join(sql.split())
+    fields = {'duration_ms': round(elapsed_ms, 2), 'sql': statement[:MAX_SQL_LENGTH]}
+    if has_request_context():
+        fields['route'] = request.url_rule.rule if request.url_rule is not None else request.path
+    if parameters is None:
+        fields['batch'] = True
+    elif statement.split(' ', 1)[0].lower() in EXPLAINABLE:
+        plan = query_plan(cursor.connection, sql, parameters)
+        fields['plan'] = plan
+        fields['table_scan'] = any(step.startswith('SCAN') and 'USING' not in step for step in plan)
+    query_logger.warning('slow_query', extra={'fields': fields})
+
+
+def _before_request():
+    g.access_started = time.perf_counter()
+
+
+def _after_request(response):
+    started = g.pop('access_started', None)
+    if started is None:
+        return response
+    spans = g.get('metrics_spans', {})
+    access_logger.info('request', extra={'fields': {
+        'method': request.method,
+        'route': request.url_rule.rule if request.url_rule is not None else None,
+        'path': request.path,
+        'query': request.query_string.decode('utf-8', 'replace') or None,
+        'status': response.status_code,
+        'duration_ms': round((time.perf_counter() - started) * 1000, 2),
+        'db_ms': round(spans['db'] * 1000, 2) if 'db' in spans else None,
+        'bytes': response.content_length,
+        'encoding': response.headers.get('Content-Encoding'),
+        'cache': g.get('cache_status'),
+        'remote_addr': request.remote_addr
+    }})
+    return response
+
+
+def init_app(app, directory):
+    os.makedirs(directory, exist_ok=True)
+    _configure(access_logger, os.path.join(directory, 'access.log'))
+    _configure(query_logger, os.path.join(directory, 'queries.log'))
+    if log_slow_query not in metrics.QUERY_LISTENERS:
+        metrics.QUERY_LISTENERS.append(log_slow_query)
+    app.before_request(_before_request)
+    app.after_request(_after_request)
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Единый счетчик респондентов.
+
+Количество респондентов (всего, по локациям и по вопросам) хранится в
+небольшой таблице survey_counts и обновляется при импорте: для ответов
+респондентов — приращениями по новым строкам, для агрегированных таблиц —
+сверкой с locations / questions. Маршруты читают готовые значения по
+первичному ключу и ничего не пересчитывают.
+"""
+from collections import Counter
+
+# Области счетчиков
+TOTAL = 'total'
+LOCATION = 'location'
+QUESTION = 'question'
+
+
+def init_counts_table(conn):
+    """Создает таблицу счетчиков; при первом запуске заполняет ее по текущим данным"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS survey_counts (
+            scope TEXT NOT NULL,
+            key TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (scope, key)
+        ) WITHOUT ROWID
+    ''')
+    if not conn.execute("SELECT 1 FROM survey_counts LIMIT 1").fetchone():
+        if has_respondent_answers(conn):
+            rebuild_from_answers(conn)
+        else:
+            sync_from_aggregates(conn)
+    conn.commit()
+
+
+def has_respondent_answers(conn):
+    return conn.execute("SELECT 1 FROM respondent_answers LIMIT 1").fetchone() is not None
+
+
+def get_count(conn, scope=TOTAL, key=''):
+    """Значение одного счетчика (0, если его нет)"""
+    row = conn.execute("SELECT count FROM survey_counts WHERE scope = ? AND key = ?",
+                       (scope, key)).fetchone()
+    return row[0] if row else 0
+
+
+def get_counts(conn, scope):
+    """Все счетчики области: {ключ: значение}"""
+    return dict(conn.execute("SELECT key, count FROM survey_counts WHERE scope = ? ORDER BY key",
+                             (scope,)).fetchall())
+
+
+def apply_deltas(conn, deltas):
+    """Прибавляет приращения {(область, ключ): delta} к счетчикам"""
+    conn.executemany('''
+        INSERT INTO survey_counts (scope, key, count) VALUES (?, ?, ?)
+        ON CONFLICT(scope, key) DO UPDATE SET count = count + excluded.count
+    ''', [(scope, key, delta) for (scope, key), delta in deltas.items() if delta])
+    conn.execute("DELETE FROM survey_counts WHERE count <= 0 AND scope != ?", (TOTAL,))
+
+
+def set_counts(conn, scope, counts, replace=False):
+    """Записывает значения счетчиков области; replace=True удаляет остальные ключи"""
+    if replace:
+        conn.execute("DELETE FROM survey_counts WHERE scope = ?", (scope,))
+    conn.executemany('''
+        INSERT INTO survey_counts (scope, key, count) VALUES (?, ?, ?)
+        ON CONFLICT(scope, key) DO UPDATE SET count = excluded.count
+    ''', [(scope, key, count) for key, count in counts.items()])
+
+
+class RespondentTracker:
+    """
+    Накапливает приращения счетчиков во время импорта ответов.
+    Для каждого респондента файла проверяется (по первичному ключу), был ли
+    он уже в базе и в какой локации, — без пересчета по всей таблице.
+    Респонденты, уже встреченные в этом импорте, берутся из памяти: их
+    строки могут быть еще не записаны в базу.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.deltas = Counter()
+        # Респондент -> локация, с которой он учтен в счетчиках
+        self.locations = {}
+        if not has_respondent_answers(conn):
+            # Первый импорт ответов: счетчики, взятые из агрегированных
+            # таблиц, заменяются подсчетом по респондентам с нуля
+            set_counts(conn, TOTAL, {'': 0}, replace=True)
+            set_counts(conn, LOCATION, {}, replace=True)
+
+    def _location(self, respondent_id):
+        """Локация, с которой респондент учтен, или None, если его нет"""
+        if respondent_id in self.locations:
+            return self.locations[respondent_id]
+        row = self.conn.execute(
+            "SELECT COALESCE(location, '') FROM respondent_answers WHERE respondent_id = ? LIMIT 1",
+            (respondent_id,)).fetchone()
+        return row[0] if row else None
+
+    def rename(self, old_id, new_id):
+        """
+        Переносит ответы респондента под новый идентификатор. Если респондент
+        new_id уже есть, два респондента становятся одним: общий счетчик и
+        счетчик локации old_id уменьшаются.
+        """
+        old_location = self._location(old_id)
+        if old_location is None:
+            return
+        new_location = self._location(new_id)
+        self.conn.execute("UPDATE OR REPLACE respondent_answers SET respondent_id = ? WHERE respondent_id = ?",
+                          (new_id, old_id))
+        self.locations.pop(old_id, None)
+        if new_location is None:
+            self.locations[new_id] = old_location
+            return
+        self.deltas[(TOTAL, '')] -= 1
+        self.deltas[(LOCATION, old_location)] -= 1
+        self.conn.execute("UPDATE respondent_answers SET location = ? WHERE respondent_id = ? AND location IS NOT ?",
+                          (new_location, new_id, new_location))
+
+    def add(self, respondent_id, location):
+        previous = self._location(respondent_id)
+        self.locations[respondent_id] = location
+        if previous is None:
+            self.deltas[(TOTAL, '')] += 1
+            self.deltas[(LOCATION, location)] += 1
+        elif previous != location:
+            self.deltas[(LOCATION, previous)] -= 1
+            self.deltas[(LOCATION, location)] += 1
+            # Ответы на вопросы, которых нет в новой строке, тоже переезжают
+            self.conn.execute("UPDATE respondent_answers SET location = ? WHERE respondent_id = ?",
+                              (location, respondent_id))
+
+    def commit(self):
+        apply_deltas(self.conn, self.deltas)
+        self.deltas.clear()
+
+
+def rebuild_from_answers(conn):
+    """Полный пересчет по ответам респондентов (только при миграции)"""
+    set_counts(conn, TOTAL, {'': conn.execute(
+        "SELECT COUNT(DISTINCT respondent_id) FROM respondent_answers").fetchone()[0]}, replace=True)
+    set_counts(conn, LOCATION, dict(conn.execute('''
+        SELECT location, COUNT(*) FROM (
+            SELECT respondent_id, MAX(COALESCE(location, '')) AS location
+            FROM respondent_answers GROUP BY respondent_id
+        ) GROUP BY location
+    ''').fetchall()), replace=True)
+    sync_question_counts(conn)
+
+
+def sync_from_aggregates(conn):
+    """
+    Сверка с агрегированными таблицами, когда ответов респондентов нет:
+    респонденты — сумма по локациям, знаменатели вопросов — total_responses.
+    """
+    locations = dict(conn.execute("SELECT name, responses FROM locations").fetchall())
+    set_counts(conn, TOTAL, {'': sum(count or 0 for count in locations.values())}, replace=True)
+    set_counts(conn, LOCATION, {name: count or 0 for name, count in locations.items()}, replace=True)
+    sync_question_counts(conn)
+
+
+def sync_question_counts(conn):
+    """Знаменатели вопросов — total_responses из questions"""
+    set_counts(conn, QUESTION, dict(conn.execute('''
+        SELECT question_text, MAX(total_responses) FROM questions GROUP BY question_text
+    ''').fetchall()), replace=True)
+
+
+def reconcile_after_import(conn):
+    """
+    Сверка после импорта агрегированных таблиц: если есть ответы респондентов,
+    они остаются источником количества респондентов, иначе счетчики
+    берутся из locations / questions.
+    """
+    if has_respondent_answers(conn):
+        sync_question_counts(conn)
+    else:
+        sync_from_aggregates(conn)
+
+
+def sync_locations_table(conn):
+    """Переносит счетчики локаций в locations.responses для известных локаций"""
+    conn.executemany("UPDATE locations SET responses = ? WHERE name = ? AND responses IS NOT ?",
+                     [(count, name, count) for name, count in get_counts(conn, LOCATION).items()])
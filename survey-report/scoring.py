@@ -0,0 +1,448 @@
+#!/usr/bin/env python3
+"""
+Расчет статистики вопросов из ответов респондентов.
+
+Ответы хранятся построчно (респондент, вопрос, ответ) в respondent_answers.
+Шкалы и привязка вопросов к ним описаны декларативно в таблицах
+scale_points и question_scales (заполняются значениями по умолчанию из
+DEFAULT_SCALES / DEFAULT_QUESTION_SCALES и правятся без изменения кода).
+
+Расчет векторный: ответы группируются в SQL по (вопрос, локация, ответ)
+за один проход по индексу, коды ответов переводятся в категории через
+NumPy-таблицу поиска [шкала, значение], а счетчики категорий для всех
+вопросов и всех локаций накапливаются одним np.add.at.
+"""
+import re
+import sys
+import hashlib
+from collections import Counter
+
+import numpy as np
+
+from fast_import import iter_file_rows, to_str, ALL_LOCATIONS
+from respondent_counts import RespondentTracker, QUESTION, set_counts, sync_locations_table
+
+BUCKETS = ('positive', 'neutral', 'negative')
+
+# Вклад категорий ответа в процент удовлетворенности:
+# satisfaction_percent = (positive * 100 + neutral * 50) / total
+BUCKET_WEIGHTS = {'positive': 100, 'neutral': 50, 'negative': 0}
+
+# Шкалы по умолчанию: числовое значение ответа ("2 - Приемлемо" -> 2) -> (подпись, категория)
+DEFAULT_SCALES = {
+    'quality_3': {1: ('Плохо', 'negative'), 2: ('Приемлемо', 'neutral'), 3: ('Хорошо', 'positive')},
+    # Инвертированная шкала 1С: 1 - Удобно, 2 - Неудобно, 3 - Удовлетворительно
+    'onec_3': {1: ('Удобно', 'positive'), 2: ('Неудобно', 'negative'), 3: ('Удовлетворительно', 'neutral')},
+    # Общая удовлетворенность по 10-балльной шкале
+    'score_10': {n: (str(n), 'positive' if n >= 8 else 'neutral' if n >= 6 else 'negative')
+                 for n in range(1, 11)},
+}
+
+# Колонка файла (подстрока заголовка в нижнем регистре) -> вопрос в таблице questions.
+# Для каждого вопроса берется первая подходящая колонка: следом за оценкой
+# в выгрузке идет колонка комментария с похожим заголовком.
+DEFAULT_QUESTION_SCALES = [
+    ('скорость загрузки', 'Оцените скорость загрузки системы', 'Производительность', 'quality_3'),
+    ('стабильность работы', 'Оцените стабильность работы системы', 'Производительность', 'quality_3'),
+    ('использования монитора', 'Оцените удобство использования монитора', 'Оборудование', 'quality_3'),
+    ('семейства яндекс', 'На сколько вы удовлетворены приложениями семейства Яндекс?',
+     'Программное обеспечение', 'quality_3'),
+    ('ms office', 'На сколько вы удовлетворены работой пакетов MS Office?',
+     'Программное обеспечение', 'quality_3'),
+    ('приложения 1с', 'Как вы оцениваете работу приложения 1С?', 'Бизнес-приложения', 'onec_3'),
+    ('приложения bitrix24', 'Как вы оцениваете работу приложения Bitrix24?', 'Бизнес-приложения', 'onec_3'),
+    ('сторонних приложений', 'Оцените пакет сторонних приложений (Крипто ПРО, нандо КАД, PDF Editor...)',
+     'Специализированные приложения', 'onec_3'),
+    ('обновлений по', 'Оцените частоту и удобство установки обновлений ПО и ОС', 'Обслуживание', 'quality_3'),
+    ('общая удовлетворенность', 'Общая удовлетворенность рабочего места', 'Общая оценка', 'score_10'),
+]
+
+LOCATION_KEYWORD = 'локаци'
+
+# Колонки, однозначно задающие респондента (подстрока заголовка в нижнем регистре):
+# явный идентификатор, а если его нет — отметка времени отправки анкеты
+RESPONDENT_KEY_KEYWORDS = (
+    ('id', ('id респондента', 'идентификатор респондента', 'respondent id', 'respondent_id', 'номер анкеты')),
+    ('ts', ('отметка времени', 'timestamp', 'время отправки', 'дата и время')),
+)
+
+BATCH_SIZE = 5000
+
+_VALUE_RE = re.compile(r'^\s*(\d+)')
+
+
+def init_answers_table(conn):
+    """Создает таблицы ответов, реестра шкал и результатов по локациям"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS respondent_answers (
+            respondent_id TEXT NOT NULL,
+            question_text TEXT NOT NULL,
+            answer TEXT NOT NULL,
+            location TEXT,
+            PRIMARY KEY (respondent_id, question_text)
+        ) WITHOUT ROWID
+    ''')
+    # Покрывающий индекс под группировку (вопрос, локация, ответ)
+    conn.execute("DROP INDEX IF EXISTS ix_respondent_answers_question")
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS ix_respondent_answers_scoring
+        ON respondent_answers (question_text, location, answer)
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS scale_points (
+            scale TEXT NOT NULL,
+            value INTEGER NOT NULL,
+            label TEXT,
+            bucket TEXT NOT NULL CHECK (bucket IN ('positive', 'neutral', 'negative')),
+            PRIMARY KEY (scale, value)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS question_scales (
+            question_text TEXT PRIMARY KEY,
+            keyword TEXT NOT NULL,
+            category TEXT,
+            scale TEXT NOT NULL,
+            position INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS question_location_scores (
+            question_text TEXT NOT NULL,
+            location TEXT NOT NULL,
+            total_responses INTEGER NOT NULL,
+            positive_responses INTEGER NOT NULL,
+            neutral_responses INTEGER NOT NULL,
+            negative_responses INTEGER NOT NULL,
+            satisfaction_percent REAL NOT NULL,
+            PRIMARY KEY (question_text, location)
+        ) WITHOUT ROWID
+    ''')
+
+    # Реестр заполняется значениями по умолчанию только при первом запуске,
+    # дальше он редактируется в БД
+    if not conn.execute("SELECT 1 FROM scale_points LIMIT 1").fetchone():
+        conn.executemany("INSERT INTO scale_points (scale, value, label, bucket) VALUES (?, ?, ?, ?)",
+                         [(scale, value, label, bucket)
+                          for scale, points in DEFAULT_SCALES.items()
+                          for value, (label, bucket) in points.items()])
+    if not conn.execute("SELECT 1 FROM question_scales LIMIT 1").fetchone():
+        conn.executemany('''
+            INSERT INTO question_scales (question_text, keyword, category, scale, position)
+            VALUES (?, ?, ?, ?, ?)
+        ''', [(question_text, keyword, category, scale, position)
+              for position, (keyword, question_text, category, scale) in enumerate(DEFAULT_QUESTION_SCALES)])
+    conn.commit()
+
+
+def load_registry(conn):
+    """
+    Читает реестр шкал. Возвращает (шкалы {шкала: {значение: категория}},
+    вопросы [(ключевое слово, вопрос, категория, шкала), ...] в порядке position).
+    """
+    scales = {}
+    for scale, value, bucket in conn.execute("SELECT scale, value, bucket FROM scale_points"):
+        scales.setdefault(scale, {})[value] = bucket
+    questions = [tuple(row) for row in conn.execute('''
+        SELECT keyword, question_text, category, scale FROM question_scales
+        ORDER BY position, question_text
+    ''')]
+    return scales, questions
+
+
+def answer_value(answer):
+    """Числовое значение ответа или None"""
+    match = _VALUE_RE.match(str(answer))
+    return int(match.group(1)) if match else None
+
+
+def build_lookup(scales, scale_names):
+    """
+    Таблица поиска [индекс шкалы, значение ответа] -> индекс категории в BUCKETS,
+    -1 для значений вне шкалы. Последний столбец зарезервирован под
+    значения, которых нет ни в одной шкале.
+    """
+    max_value = max((value for points in scales.values() for value in points), default=0)
+    lookup = np.full((len(scale_names), max_value + 2), -1, dtype=np.int8)
+    for scale_index, scale in enumerate(scale_names):
+        for value, bucket in scales.get(scale, {}).items():
+            if value >= 0:
+                lookup[scale_index, value] = BUCKETS.index(bucket)
+    return lookup
+
+
+def score_all(conn, question_texts=None):
+    """
+    Считает категории ответов для всех вопросов реестра (или только question_texts)
+    по всем локациям сразу.
+    Возвращает {'questions': [...], 'categories': [...], 'locations': [...],
+    'counts': массив [вопрос, локация, категория]}.
+    """
+    scales, registry = load_registry(conn)
+    if question_texts is not None:
+        registry = [spec for spec in registry if spec[1] in question_texts]
+    questions = [question_text for _, question_text, _, _ in registry]
+    categories = [category for _, _, category, _ in registry]
+
+    scale_names = sorted({scale for _, _, _, scale in registry})
+    lookup = build_lookup(scales, scale_names)
+    overflow = lookup.shape[1] - 1
+
+    question_index = {question_text: i for i, question_text in enumerate(questions)}
+    question_scale = np.array([scale_names.index(scale) for _, _, _, scale in registry], dtype=np.intp)
+
+    rows = conn.execute(f'''
+        SELECT question_text, COALESCE(location, ''), answer, COUNT(*)
+        FROM respondent_answers
+        WHERE question_text IN ({', '.join('?' * len(questions))})
+        GROUP BY question_text, location, answer
+    ''', questions).fetchall() if questions else []
+
+    locations = sorted({row[1] for row in rows})
+    location_index = {location: i for i, location in enumerate(locations)}
+
+    # Код ответа разбирается один раз на группу, а не на строку ответа
+    q = np.fromiter((question_index[row[0]] for row in rows), dtype=np.intp, count=len(rows))
+    loc = np.fromiter((location_index[row[1]] for row in rows), dtype=np.intp, count=len(rows))
+    codes = (answer_value(row[2]) for row in rows)
+    values = np.fromiter((-1 if code is None else code for code in codes), dtype=np.int64, count=len(rows))
+    counts = np.fromiter((row[3] for row in rows), dtype=np.int64, count=len(rows))
+
+    values = np.where((values < 0) | (values >= overflow), overflow, values)
+    buckets = lookup[question_scale[q], values] if len(rows) else np.empty(0, dtype=np.int8)
+    mapped = buckets >= 0
+
+    grid = np.zeros((len(questions), len(locations), len(BUCKETS)), dtype=np.int64)
+    np.add.at(grid, (q[mapped], loc[mapped], buckets[mapped].astype(np.intp)), counts[mapped])
+
+    return {'questions': questions, 'categories': categories, 'locations': locations, 'counts': grid}
+
+
+def satisfaction_percent(counts):
+    """Процент удовлетворенности по массиву счетчиков [..., категория]"""
+    weights = np.array([BUCKET_WEIGHTS[bucket] for bucket in BUCKETS], dtype=np.float64)
+    totals = counts.sum(axis=-1)
+    scores = counts @ weights
+    return np.round(np.divide(scores, totals, out=np.zeros_like(scores), where=totals > 0), 1)
+
+
+def _stats(question_text, location, counts, percent):
+    return {
+        'question_text': question_text,
+        'location': location,
+        'total_responses': int(counts.sum()),
+        'positive_responses': int(counts[0]),
+        'neutral_responses': int(counts[1]),
+        'negative_responses': int(counts[2]),
+        'satisfaction_percent': float(percent)
+    }
+
+
+def question_totals(scores):
+    """Статистика по вопросам по всем локациям"""
+    counts = scores['counts'].sum(axis=1)
+    percents = satisfaction_percent(counts)
+    return [dict(_stats(question_text, ALL_LOCATIONS, counts[i], percents[i]),
+                 category=scores['categories'][i])
+            for i, question_text in enumerate(scores['questions'])]
+
+
+def location_scores(scores):
+    """Статистика по каждой паре (вопрос, локация), где есть ответы"""
+    counts = scores['counts']
+    percents = satisfaction_percent(counts)
+    totals = counts.sum(axis=-1)
+    return [_stats(question_text, location, counts[i, j], percents[i, j])
+            for i, question_text in enumerate(scores['questions'])
+            for j, location in enumerate(scores['locations'])
+            if totals[i, j] > 0]
+
+
+def key_column(header):
+    """Колонка ключа респондента: ('id' или 'ts', индекс колонки) либо None"""
+    titles = [to_str(title).lower() for title in header]
+    for kind, keywords in RESPONDENT_KEY_KEYWORDS:
+        for index, title in enumerate(titles):
+            if any(keyword in title for keyword in keywords):
+                return kind, index
+    return None
+
+
+def map_columns(header, registry, skip=()):
+    """
+    Сопоставляет заголовки колонок файла с вопросами реестра (кроме колонок skip).
+    Возвращает (индекс колонки локации или None, {индекс колонки: вопрос}).
+    """
+    location_column = None
+    columns = {}
+    used = set()
+    for index, title in enumerate(header):
+        if index in skip:
+            continue
+        title = to_str(title).lower()
+        if location_column is None and LOCATION_KEYWORD in title:
+            location_column = index
+            continue
+        for keyword, question_text, _, _ in registry:
+            if keyword.lower() in title and question_text not in used:
+                columns[index] = question_text
+                used.add(question_text)
+                break
+    return location_column, columns
+
+
+def respondent_ids(rows, key=None):
+    """
+    Стабильные идентификаторы респондентов. Выдает (идентификатор,
+    идентификатор по содержимому, строка).
+
+    С колонкой ключа key (см. key_column) идентификатор — 'id:<значение>'
+    или 'ts:<отметка времени>-<номер повтора>': исправленные ответы и смена
+    локации обновляют того же респондента. Без нее (или при пустой ячейке
+    ключа) идентификатор — хэш содержимого строки и номер повтора: повторный
+    импорт того же файла не создает дубликатов, но исправленная строка
+    становится новым респондентом. Идентификатор по содержимому выдается
+    всегда: им записаны респонденты импортов до появления колонки ключа.
+    """
+    seen = Counter()
+    for row in rows:
+        digest = hashlib.sha1('\x1f'.join(to_str(value) for value in row).encode('utf-8')).hexdigest()[:16]
+        seen[digest] += 1
+        content_id = f'{digest}-{seen[digest]}'
+        value = to_str(row[key[1]]) if key is not None and key[1] < len(row) else ''
+        if not value:
+            yield content_id, content_id, row
+        elif key[0] == 'id':
+            yield f'id:{value}', content_id, row
+        else:
+            seen[('ts', value)] += 1
+            yield f"ts:{value}-{seen[('ts', value)]}", content_id, row
+
+
+def import_answers(conn, filepath):
+    """
+    Импортирует файл ответов (строка — респондент, колонки — вопросы анкеты)
+    и пересчитывает затронутые вопросы. Возвращает отчет.
+    """
+    rows = iter_file_rows(filepath, None, skip_header=False)
+    header = next(rows, None)
+    if header is None:
+        raise ValueError('Файл пуст')
+    _, registry = load_registry(conn)
+    key = key_column(header)
+    location_column, columns = map_columns(header, registry, skip=(key[1],) if key else ())
+    if not columns:
+        raise ValueError('В файле нет колонок с известными вопросами')
+    # Респонденты прежних импортов записаны по содержимому строки (шестнадцатеричный
+    # хэш, меньше любого 'id:' / 'ts:'): при совпадении строки им присваивается ключ
+    legacy = key is not None and conn.execute(
+        "SELECT 1 FROM respondent_answers WHERE respondent_id < 'id:' LIMIT 1").fetchone() is not None
+
+    sql = '''
+        INSERT INTO respondent_answers (respondent_id, question_text, answer, location)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(respondent_id, question_text) DO UPDATE SET
+            answer = excluded.answer, location = excluded.location
+        WHERE (answer, location) IS NOT (excluded.answer, excluded.location)
+    '''
+    respondents = 0
+    batch = []
+    # Счетчики респондентов наращиваются по мере импорта
+    tracker = RespondentTracker(conn)
+    for respondent_id, content_id, row in respondent_ids(rows, key):
+        if legacy and respondent_id != content_id:
+            tracker.rename(content_id, respondent_id)
+        location = to_str(row[location_column]) if location_column is not None and location_column < len(row) else ''
+        answers = [(respondent_id, question_text, to_str(row[index]), location)
+                   for index, question_text in columns.items()
+                   if index < len(row) and to_str(row[index])]
+        if not answers:
+            continue
+        respondents += 1
+        tracker.add(respondent_id, location)
+        batch.extend(answers)
+        if len(batch) >= BATCH_SIZE:
+            conn.executemany(sql, batch)
+            batch = []
+    if batch:
+        conn.executemany(sql, batch)
+    tracker.commit()
+    sync_locations_table(conn)
+
+    updated = recompute_questions(conn, set(columns.values()))
+    report = {'respondents': respondents, 'questions': updated}
+    if key is None:
+        report['warning'] = ('В файле нет колонки с идентификатором респондента или отметкой времени: '
+                             'респонденты определены по содержимому строк, поэтому исправленная строка '
+                             'или смена локации учтется как новый респондент')
+    return report
+
+
+def recompute_questions(conn, question_texts=None):
+    """
+    Пересчитывает статистику вопросов (по умолчанию — всех из реестра):
+    итог по всем локациям пишется в questions, разбивка — в
+    question_location_scores. Возвращает количество обновленных вопросов.
+    """
+    scores = score_all(conn, question_texts)
+
+    # Вопросы без ответов не трогаем, чтобы не обнулить данные из других импортов
+    rows = [stats for stats in question_totals(scores) if stats['total_responses'] > 0]
+    if not rows:
+        return 0
+
+    conn.executemany('''
+        INSERT INTO questions (question_text, category, total_responses, positive_responses,
+                               neutral_responses, negative_responses, satisfaction_percent, location)
+        VALUES (:question_text, :category, :total_responses, :positive_responses,
+                :neutral_responses, :negative_responses, :satisfaction_percent, :location)
+        ON CONFLICT(question_text, location) DO UPDATE SET
+            category = excluded.category,
+            total_responses = excluded.total_responses,
+            positive_responses = excluded.positive_responses,
+            neutral_responses = excluded.neutral_responses,
+            negative_responses = excluded.negative_responses,
+            satisfaction_percent = excluded.satisfaction_percent
+    ''', rows)
+
+    set_counts(conn, QUESTION, {stats['question_text']: stats['total_responses'] for stats in rows})
+
+    updated = [(stats['question_text'],) for stats in rows]
+    conn.executemany("DELETE FROM question_location_scores WHERE question_text = ?", updated)
+    conn.executemany('''
+        INSERT INTO question_location_scores (question_text, location, total_responses, positive_responses,
+                                              neutral_responses, negative_responses, satisfaction_percent)
+        VALUES (:question_text, :location, :total_responses, :positive_responses,
+                :neutral_responses, :negative_responses, :satisfaction_percent)
+    ''', location_scores(scores))
+    return len(rows)
+
+
+def load_location_scores(conn, location=None):
+    """Сохраненная разбивка по локациям (опционально — одна локация)"""
+    sql = "SELECT * FROM question_location_scores"
+    params = ()
+    if location:
+        sql += " WHERE location = ?"
+        params = (location,)
+    cursor = conn.execute(sql + " ORDER BY question_text, location", params)
+    columns = [col[0] for col in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def format_answers_report(report):
+    """Текст отчета об импорте ответов для flash-сообщения"""
+    return (f"Импортировано ответов {report['respondents']} респондентов, "
+            f"пересчитано вопросов: {report['questions']}")
+
+
+if __name__ == '__main__':
+    # Пересчет всех вопросов по сохраненным ответам:
+    #   python3 scoring.py [путь к БД]
+    import sqlite3
+    db_path = sys.argv[1] if len(sys.argv) > 1 else 'survey_complete.db'
+    conn = sqlite3.connect(db_path)
+    init_answers_table(conn)
+    print(f"Пересчитано вопросов: {recompute_questions(conn)}")
+    conn.commit()
+    conn.close()
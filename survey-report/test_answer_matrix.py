@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""Матрица ответов: сборка, очистка старых файлов, перекрестные таблицы"""
+import os
+import sqlite3
+import threading
+
+import pytest
+
+from scoring import init_answers_table, import_answers, score_all
+from answer_matrix import build_matrix, read_meta, MatrixStore, answer_code, NO_ANSWER, score_matrix
+
+ANSWERS = [
+    ('r1', 'Скорость', '3 - Хорошо', 'Офисы'),
+    ('r1', 'Стабильность', '2 - Приемлемо', 'Офисы'),
+    ('r2', 'Скорость', '1 - Плохо', 'Склад'),
+    ('r3', 'Скорость', '3 - Хорошо', 'Склад'),
+    ('r3', 'Стабильность', 'Не знаю', 'Склад'),
+    ('r4', 'Стабильность', '2 - Приемлемо', 'Офисы'),
+]
+
+
+@pytest.fixture
+def answers_db(tmp_path):
+    connection = sqlite3.connect(str(tmp_path / 'survey.db'))
+    init_answers_table(connection)
+    connection.executemany("INSERT INTO respondent_answers VALUES (?, ?, ?, ?)", ANSWERS)
+    connection.commit()
+    yield connection
+    connection.close()
+
+
+def stamps(directory):
+    return {name.split('-', 1)[1][:-len('.npy')] for name in os.listdir(directory) if name.endswith('.npy')}
+
+
+def test_crosstab_matches_sql(answers_db, tmp_path):
+    directory = str(tmp_path / 'survey.answers')
+    build_matrix(answers_db, directory)
+    matrix = MatrixStore(directory).current()
+    assert matrix.meta['respondents'] == 4
+
+    table = matrix.crosstab('Скорость')
+    counts = {(code, location): table['counts'][i][j]
+              for i, code in enumerate(table['rows']) for j, location in enumerate(table['columns'])}
+    expected = {}
+    for _, question_text, answer, location in ANSWERS:
+        if question_text == 'Скорость':
+            key = (answer_code(answer), location)
+            expected[key] = expected.get(key, 0) + 1
+    assert {key: count for key, count in counts.items() if count} == expected
+
+    # По ответам на другой вопрос — только респонденты, ответившие на оба
+    by = matrix.crosstab('Скорость', by='Стабильность')
+    assert sum(map(sum, by['counts'])) == 2
+    assert NO_ANSWER not in by['rows'] + by['columns']
+
+
+def test_rebuild_keeps_previous_files_only(answers_db, tmp_path):
+    directory = str(tmp_path / 'survey.answers')
+    store = MatrixStore(directory)
+    assert store.current() is None
+
+    first = build_matrix(answers_db, directory)['stamp']
+    second = build_matrix(answers_db, directory)['stamp']
+    # Набор предыдущего meta.json остается для читателя, который уже прочитал его
+    assert stamps(directory) == {first, second}
+    third = build_matrix(answers_db, directory)['stamp']
+    assert stamps(directory) == {second, third}
+    assert store.current().meta['stamp'] == third
+
+
+def test_concurrent_builds_leave_a_consistent_set(answers_db, tmp_path):
+    directory = str(tmp_path / 'survey.answers')
+    db_path = str(tmp_path / 'survey.db')
+    errors = []
+
+    def build():
+        connection = sqlite3.connect(db_path)
+        try:
+            for _ in range(3):
+                build_matrix(connection, directory)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=build) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    meta = read_meta(directory)
+    assert meta['stamp'] in stamps(directory)
+    assert len(stamps(directory)) <= 2
+    assert MatrixStore(directory).current().meta['respondents'] == 4
+
+
+def test_scores_from_matrix_match_sql(app_module, conn, write_tsv):
+    header = ['ID респондента', 'Локация', 'Оцените скорость загрузки системы', 'Как вы оцениваете работу приложения 1С?',
+              'Общая удовлетворенность рабочего места', 'Комментарий']
+    rows = [['1', 'Офисы', '3 - Хорошо', '1 - Удобно', '9', 'Все хорошо'],
+            ['2', 'Склад', '1 - Плохо', '2 - Неудобно', '11', ''],
+            ['3', 'Склад', 'Не знаю', '3 - Удовлетворительно', '7', ''],
+            ['4', '', '2 - Приемлемо', '', '0', 'Шумно']]
+    import_answers(conn, write_tsv('answers.tsv', header, rows))
+    conn.commit()
+    client = app_module.app.test_client()
+    sql_scores = client.get('/api/scores').get_json()['scores']
+    assert sql_scores
+
+    build_matrix(conn, app_module.answer_matrix.directory)
+    app_module.response_cache.invalidate()
+
+    matrix_scores = client.get('/api/scores').get_json()['scores']
+    assert matrix_scores == sql_scores
+    assert client.get('/api/scores?location=Склад').get_json()['scores'] == \
+        [row for row in matrix_scores if row['location'] == 'Склад']
+    assert 'Склад' in client.get('/questions').get_data(as_text=True)
+
+    scores = score_matrix(conn, app_module.answer_matrix.current())
+    expected = score_all(conn)
+    assert scores['locations'] == expected['locations']
+    assert (scores['counts'] == expected['counts']).all()
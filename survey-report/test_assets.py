@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""Статические ресурсы: минификация, отпечатки в URL, бессрочный кэш, сжатие ответов"""
+import gzip
+
+from flask import Flask
+
+from assets import AssetPipeline, IMMUTABLE
+from response_cache import compress_response
+
+
+def make_app(static_dir):
+    (static_dir / 'fonts').mkdir()
+    (static_dir / 'fonts' / 'icons.woff2').write_bytes(b'\x00font')
+    (static_dir / 'site.css').write_text('/* тема */\nbody {\n  color: red;\n}\n'
+                                         '@font-face { src: url("fonts/icons.woff2?v=1"); }\n'
+                                         + '.a { margin: 0; }\n' * 100, encoding='utf-8')
+    app = Flask(__name__)
+    assets = AssetPipeline(app, static_dir=str(static_dir))
+    app.after_request(compress_response)
+    app.add_url_rule('/page', 'page', lambda: '<p>' + 'строка ' * 200 + '</p>')
+    return app, assets
+
+
+def test_assets_are_minified_fingerprinted_and_immutable(tmp_path):
+    app, assets = make_app(tmp_path)
+    client = app.test_client()
+    with app.app_context():
+        css_url = assets.asset_url('site.css')
+        font_url = assets.asset_url('fonts/icons.woff2')
+    assert css_url.startswith('/assets/site.') and css_url.endswith('.css')
+
+    css = client.get(css_url, headers={'Accept-Encoding': 'identity'})
+    text = css.get_data(as_text=True)
+    assert css.headers['Cache-Control'] == IMMUTABLE
+    assert 'тема' not in text and 'body{color: red}' in text
+    assert f'url("{font_url}?v=1")' in text
+
+    packed = client.get(css_url, headers={'Accept-Encoding': 'gzip'})
+    assert gzip.decompress(packed.data) == css.data
+    assert client.get(css_url, headers={'If-None-Match': css.headers['ETag']}).status_code == 304
+    assert client.get('/assets/site.000000000000.css').status_code == 404
+
+
+def test_html_is_compressed_per_request(tmp_path):
+    app, _ = make_app(tmp_path)
+    client = app.test_client()
+    plain = client.get('/page')
+    packed = client.get('/page', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in plain.headers
+    assert packed.headers['Content-Encoding'] == 'gzip' and 'Accept-Encoding' in packed.headers['Vary']
+    assert gzip.decompress(packed.data) == plain.data
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""Графики в SVG: текст остается текстом, не больше max_items столбцов, высота по числу столбцов"""
+import re
+
+from chart_engine import top_n, shorten, OTHER_LABEL
+
+
+def locations(count):
+    return [{'name': f'Локация {i:02d}', 'satisfaction': 5 + i % 5, 'responses': 100 - i} for i in range(count)]
+
+
+def svg_height(image):
+    return float(re.search(rb'<svg[^>]* height="([\d.]+)pt"', image.data).group(1))
+
+
+def test_top_n_merges_the_lightest_items():
+    items = [('a', 5), ('b', 1), ('c', 3), ('d', 2)]
+    merge = lambda rest: ('rest', sum(weight for _, weight in rest))
+    assert top_n(items, 3, lambda item: item[1], merge) == [('a', 5), ('c', 3), ('rest', 3)]
+    assert top_n(items, 4, lambda item: item[1], merge) == items
+    assert top_n(items, 0, lambda item: item[1], merge) == items
+
+
+def test_merged_location_is_weighted_by_responses(app_module):
+    merged = app_module.merge_locations([{'name': 'А', 'satisfaction': 9, 'responses': 3},
+                                         {'name': 'Б', 'satisfaction': 5, 'responses': 1}])
+    assert merged == {'name': f'{OTHER_LABEL} (2)', 'satisfaction': 8.0, 'responses': 4}
+    assert shorten('Очень длинное название локации', 10) == 'Очень дли…'
+
+
+def test_svg_chart_caps_bars_and_keeps_text(app_module):
+    max_items = app_module.charts.templates['locations'].max_items
+    image = app_module.create_satisfaction_chart(locations(max_items + 10))
+    assert image.mimetype == 'image/svg+xml'
+    text = image.data.decode('utf-8')
+    # Подписи — текст, а не контуры глифов; 11 самых малых локаций — один столбец
+    assert f'{OTHER_LABEL} (11)' in text and 'Локация 00' in text
+    assert f'Локация {max_items - 1:02d}' not in text and '<dc:date>' not in text
+    # Те же данные — те же байты (стабильный ETag и кэш)
+    assert app_module.create_satisfaction_chart(locations(max_items + 10)).data == image.data
+
+
+def test_chart_height_follows_bar_count(app_module):
+    small = app_module.create_satisfaction_chart(locations(3))
+    large = app_module.create_satisfaction_chart(locations(30))
+    assert svg_height(small) < svg_height(large)
+    assert svg_height(app_module.create_satisfaction_chart(locations(60))) == svg_height(large)
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""Импорт CSV/TSV: кодировка, разделитель и тот же результат, что у TSV"""
+import codecs
+
+from fast_import import detect_encoding, detect_delimiter, import_file
+
+HEADER = ['Локация', 'Категория', 'Ответов', 'Удовлетворенность', 'Проблемы']
+ROWS = [['Офисы', 'Офис', '10', '7,5', 'Шум; сквозняк'], ['Склад', 'Склад', '4', '6', '']]
+
+
+def test_detect_encoding():
+    text = 'Локация;Ответов'
+    assert detect_encoding(codecs.BOM_UTF8 + text.encode('utf-8')) == 'utf-8-sig'
+    assert detect_encoding(text.encode('utf-16')) == 'utf-16'
+    assert detect_encoding(text.encode('cp1251')) == 'cp1251'
+    # Образец оборван посреди двухбайтового символа — это все еще UTF-8
+    assert detect_encoding(text.encode('utf-8')[:-1]) == 'utf-8'
+
+
+def test_detect_delimiter():
+    assert detect_delimiter('a;b;c\n1;2;3\n', 'file.csv') == ';'
+    assert detect_delimiter('a\tb\tc\n1\t2\t3\n', 'file.csv') == '\t'
+    assert detect_delimiter('одна колонка\n', 'file.tsv') == '\t'
+
+
+def test_cp1251_semicolon_csv_matches_tsv(conn, write_tsv, tmp_path):
+    import_file(conn, 'locations', write_tsv('locations.tsv', HEADER, ROWS))
+    from_tsv = conn.execute("SELECT name, responses, satisfaction, problems FROM locations ORDER BY name").fetchall()
+    conn.execute("DELETE FROM locations")
+    conn.commit()
+
+    path = tmp_path / 'locations.csv'
+    lines = [';'.join(HEADER)] + [';'.join(f'"{value}"' if ';' in value else value for value in row) for row in ROWS]
+    path.write_bytes('\r\n'.join(lines).encode('cp1251'))
+    assert import_file(conn, 'locations', str(path))['inserted'] == 2
+    assert conn.execute("SELECT name, responses, satisfaction, problems FROM locations ORDER BY name").fetchall() == from_tsv
+    assert from_tsv == [('Офисы', 10, 7.5, 'Шум; сквозняк'), ('Склад', 4, 6.0, '')]
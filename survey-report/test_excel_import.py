@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""Потоковый импорт Excel: типизация строк, пропуск пустых, запись пачками"""
+from openpyxl import Workbook
+
+import fast_import
+from fast_import import convert_rows, import_file, IMPORT_SPECS
+
+
+def test_convert_rows_types_pads_and_skips_empty():
+    columns = IMPORT_SPECS['locations']['columns']
+    rows = [('Офисы', 'Офис', 10.0, '7,5', None), (None, '', None), ('Склад', None, 'x'), (12.0,)]
+    assert list(convert_rows(rows, columns)) == [
+        ('Офисы', 'Офис', 10, 7.5, ''),
+        ('Склад', '', 0, 0.0, ''),
+        ('12', '', 0, 0.0, ''),
+    ]
+
+
+def test_xlsx_import_in_batches(conn, tmp_path, monkeypatch):
+    monkeypatch.setattr(fast_import, 'BATCH_SIZE', 2)
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(['Ключ', 'Описание', 'Статус', 'Категория', 'Локация', 'Приоритет', 'Лишняя колонка'])
+    for i in range(5):
+        sheet.append([f'T-{i}', f'Задача {i}', None, 'ПО', 'Офисы', i % 3 + 1, 'не читается'])
+    sheet.append([None] * 6)
+    path = str(tmp_path / 'tasks.xlsx')
+    workbook.save(path)
+
+    assert import_file(conn, 'tasks', path) == {'total': 5, 'inserted': 5, 'updated': 0, 'unchanged': 0}
+    assert conn.execute("SELECT task_key, status, priority FROM tasks ORDER BY task_key LIMIT 2").fetchall() == \
+        [('T-0', 'В работе', 1), ('T-1', 'В работе', 2)]
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""Повторный импорт справочников: UPSERT по естественному ключу и отчет"""
+import pytest
+
+from fast_import import import_file, format_report, ensure_natural_keys, migrate_natural_keys, ALL_LOCATIONS
+
+HEADER = ['Локация', 'Категория', 'Ответов', 'Удовлетворенность', 'Проблемы']
+
+
+def test_reimport_reports_inserted_updated_unchanged(conn, write_tsv):
+    first = write_tsv('locations.tsv', HEADER, [
+        ['Офисы', 'Офис', '10', '7.5', ''],
+        ['Склад', 'Склад', '4', '6.0', 'Шум'],
+    ])
+    assert import_file(conn, 'locations', first) == {'total': 2, 'inserted': 2, 'updated': 0, 'unchanged': 0}
+
+    second = write_tsv('locations_fixed.tsv', HEADER, [
+        ['Офисы', 'Офис', '10', '7.5', ''],
+        ['Склад', 'Склад', '5', '6.5', 'Шум'],
+        ['Цех', 'Производство', '8', '5.0', ''],
+    ])
+    report = import_file(conn, 'locations', second)
+    assert report == {'total': 3, 'inserted': 1, 'updated': 1, 'unchanged': 1}
+    assert format_report('locations', report) == \
+        'Импортировано 3 локаций: добавлено 1, обновлено 1, без изменений 1'
+
+    assert conn.execute("SELECT COUNT(*) FROM locations").fetchone()[0] == 3
+    assert conn.execute("SELECT responses, satisfaction FROM locations WHERE name = 'Склад'").fetchone() == (5, 6.5)
+
+
+def test_same_file_twice_changes_nothing(conn, write_tsv):
+    path = write_tsv('tasks.tsv', ['Ключ', 'Описание', 'Статус', 'Категория', 'Локация', 'Приоритет'], [
+        ['T-1', 'Замена монитора', 'В работе', 'Оборудование', 'Офисы', '2'],
+        ['T-2', 'Настройка ПО', 'Выполнено', 'ПО', 'Склад', '3'],
+    ])
+    import_file(conn, 'tasks', path)
+    changes = conn.total_changes
+    assert import_file(conn, 'tasks', path) == {'total': 2, 'inserted': 0, 'updated': 0, 'unchanged': 2}
+    assert conn.total_changes == changes
+
+
+def test_startup_keeps_duplicates_until_migration(conn, write_tsv):
+    conn.execute("DROP INDEX ux_locations_name")
+    conn.executemany("INSERT INTO locations (name, responses) VALUES (?, ?)", [('Офисы', 1), ('Офисы', 2)])
+    conn.commit()
+
+    assert ensure_natural_keys(conn) == ['locations']
+    assert conn.execute("SELECT COUNT(*) FROM locations").fetchone()[0] == 2
+    with pytest.raises(ValueError, match='migrate-keys'):
+        import_file(conn, 'locations', write_tsv('locations.tsv', HEADER, [['Склад', '', '1', '5', '']]))
+
+    assert migrate_natural_keys(conn)['locations'] == 1
+    assert conn.execute("SELECT responses FROM locations").fetchall() == [(2,)]
+    assert ensure_natural_keys(conn) == []
+
+
+def test_legacy_total_rows_merged_only_by_migration(app_module, conn):
+    conn.executemany("INSERT INTO questions (question_text, total_responses, location) VALUES (?, ?, ?)",
+                     [('Q1', 3, ''), ('Q1', 5, None)])
+    conn.commit()
+
+    app_module.init_db()
+    assert conn.execute("SELECT COUNT(*) FROM questions").fetchone()[0] == 2
+
+    assert app_module.app.test_cli_runner().invoke(args=['migrate-keys']).exit_code == 0
+    assert conn.execute("SELECT total_responses, location FROM questions").fetchall() == [(5, ALL_LOCATIONS)]
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Keyset-пагинация /tasks и /locations"""
+import re
+import html
+import sqlite3
+
+from listings import fetch_tasks_page, fetch_locations_page, ensure_listing_indexes, encode_cursor
+
+
+def walk(fetch, conn, page_size, filters=None):
+    """Все страницы подряд: [[id строк страницы], ...]"""
+    pages, cursor = [], None
+    while True:
+        rows, cursor = fetch(conn, filters or {}, cursor, page_size)
+        pages.append([row['id'] for row in rows])
+        if cursor is None:
+            return pages
+
+
+def add_tasks(conn, rows):
+    conn.executemany("INSERT INTO tasks (task_key, status, priority, created_at) VALUES (?, ?, ?, ?)", rows)
+    conn.commit()
+
+
+def test_pages_cover_every_task_once(conn):
+    # Одинаковые priority и created_at: порядок решает id
+    add_tasks(conn, [(f'T-{i}', 'В работе', 1 + i % 2, '2026-01-01 10:00:00') for i in range(10)])
+    conn.row_factory = sqlite3.Row
+    pages = walk(fetch_tasks_page, conn, 3)
+    ids = [task_id for page in pages for task_id in page]
+    assert [len(page) for page in pages] == [3, 3, 3, 1]
+    assert sorted(ids) == list(range(1, 11))
+    assert len(set(ids)) == 10
+
+
+def test_null_sort_keys_are_backfilled(conn):
+    add_tasks(conn, [('T-1', 'В работе', None, None), ('T-2', 'В работе', 2, None),
+                     ('T-3', 'В работе', None, '2026-01-01 10:00:00'), ('T-4', 'В работе', 1, '2026-01-02')])
+    conn.execute("INSERT INTO locations (name, satisfaction) VALUES ('Офисы', NULL), ('Склад', 5.0)")
+    conn.commit()
+    ensure_listing_indexes(conn)
+    conn.row_factory = sqlite3.Row
+
+    assert sorted(sum(walk(fetch_tasks_page, conn, 1), [])) == [1, 2, 3, 4]
+    assert sorted(sum(walk(fetch_locations_page, conn, 1), [])) == [1, 2]
+    assert conn.execute("SELECT COUNT(*) FROM tasks WHERE priority IS NULL OR created_at IS NULL").fetchone()[0] == 0
+
+
+def test_limit_is_kept_in_page_links(app_module, conn):
+    add_tasks(conn, [(f'T-{i}', 'В работе', 3, '2026-01-01 10:00:00') for i in range(10)])
+    client = app_module.app.test_client()
+
+    url, seen = '/tasks?limit=3', []
+    while url:
+        page = client.get(url).get_data(as_text=True)
+        seen += re.findall(r'T-\d+', page)
+        links = [html.unescape(link) for link in re.findall(r'href="(/tasks\?[^"]*after=[^"]*)"', page)]
+        assert all('limit=3' in link for link in links)
+        url = links[0] if links else None
+    assert sorted(set(seen)) == sorted(f'T-{i}' for i in range(10))
+
+
+def test_forged_cursor_is_rejected(app_module, conn):
+    add_tasks(conn, [('T-1', 'В работе', 3, '2026-01-01 10:00:00')])
+    client = app_module.app.test_client()
+
+    for forged in ([[1], 'x', 1], [1, {'a': 1}, 1], [1, 2], 'x'):
+        assert client.get(f'/tasks?after={encode_cursor(forged)}').status_code == 400
+    assert client.get('/locations?after=%%%').status_code == 400
+    assert client.get(f'/tasks?after={encode_cursor([3, "2026-01-02 00:00:00", 9])}').status_code == 200
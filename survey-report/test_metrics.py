@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""Метрики: формат /metrics, участки времени, время SQL с учетом чтения курсора"""
+from flask import g
+
+import metrics
+from metrics import Counter, Histogram, span, timed, connect
+
+
+def test_exposition_format():
+    histogram = Histogram('test_seconds', 'Test histogram', buckets=(0.1, 1.0))
+    histogram.observe(0.05, route='/a')
+    histogram.observe(0.5, route='/a')
+    counter = Counter('test_total', 'Test counter')
+    counter.inc(status=200, route='/a')
+    counter.inc(route='/a', status=200)
+
+    assert histogram.collect() == [
+        '# HELP test_seconds Test histogram', '# TYPE test_seconds histogram',
+        'test_seconds_bucket{route="/a",le="0.1"} 1',
+        'test_seconds_bucket{route="/a",le="1.0"} 2',
+        'test_seconds_bucket{route="/a",le="+Inf"} 2',
+        'test_seconds_sum{route="/a"} 0.55',
+        'test_seconds_count{route="/a"} 2',
+    ]
+    # Порядок меток не важен: одна серия
+    assert counter.collect()[2:] == ['test_total{route="/a",status="200"} 2']
+
+
+def test_spans_accumulate_per_request(app_module):
+    @timed('work')
+    def work():
+        with span('inner'):
+            pass
+
+    with app_module.app.test_request_context('/'):
+        work()
+        work()
+        assert set(g.metrics_spans) == {'work', 'inner'}
+        assert g.metrics_spans['work'] >= g.metrics_spans['inner']
+    # Вне запроса участок попадает только в гистограмму
+    work()
+
+
+def test_cursor_iteration_counts_as_db_time(app_module, monkeypatch):
+    queries = []
+    monkeypatch.setattr(metrics, 'QUERY_LISTENERS', [lambda cursor, sql, params, elapsed: queries.append(sql)])
+    conn = connect(app_module.DB_PATH)
+    with app_module.app.test_request_context('/'):
+        rows = list(conn.execute("WITH RECURSIVE n(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM n WHERE x < 1000) "
+                                 "SELECT x FROM n"))
+        assert len(rows) == 1000 and g.metrics_spans['db'] > 0
+    conn.close()
+    # Выполнение и чтение строк — по одному событию на запрос
+    assert len(queries) == 2 and queries[0] == queries[1]
+
+
+def test_metrics_endpoint_and_server_timing(app_module, monkeypatch):
+    monkeypatch.setattr(metrics, 'SERVER_TIMING', True)
+    client = app_module.app.test_client()
+    response = client.get('/locations')
+    assert response.status_code == 200
+    timing = response.headers['Server-Timing']
+    assert 'db;dur=' in timing and 'total;dur=' in timing
+
+    page = client.get('/metrics')
+    assert page.content_type.startswith('text/plain; version=0.0.4')
+    text = page.get_data(as_text=True)
+    assert 'survey_http_requests_total{method="GET",route="/locations",status="200"}' in text
+    assert 'survey_span_seconds_count{span="db"}' in text
+    assert '# TYPE survey_response_cache_hit_ratio gauge' in text
+    # Сам /metrics не учитывается
+    assert 'route="/metrics"' not in client.get('/metrics').get_data(as_text=True)
@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+"""Графики страниц: заглушка до render-charts, такие страницы не кэшируются"""
+
+
+def test_placeholder_page_is_not_cached(app_module, conn):
+    conn.execute("INSERT INTO locations (name, satisfaction, responses) VALUES ('Офисы', 7.5, 10)")
+    conn.commit()
+    cache, client = app_module.response_cache, app_module.app.test_client()
+
+    placeholder = app_module.chart_placeholders['locations']
+    for _ in range(2):
+        assert placeholder in client.get('/locations').get_data(as_text=True)
+    assert cache.hits == 0
+
+    assert app_module.app.test_cli_runner().invoke(args=['render-charts']).exit_code == 0
+    pages = [client.get('/locations').get_data(as_text=True) for _ in range(2)]
+    assert placeholder not in pages[0] and '/charts/locations/' in pages[0]
+    assert cache.hits == 1
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""Профили запросов: доступ только с разрешенных адресов, без строки запроса в сводке"""
+import os
+
+from flask import Flask
+
+from profiling import RequestProfiler
+
+
+def make_app(directory):
+    app = Flask(__name__)
+    profiler = RequestProfiler(str(directory), allow_flag=True).init_app(app)
+    app.add_url_rule('/report', 'report', lambda: 'ok')
+    return app, profiler
+
+
+def test_profiles_only_for_allowed_addresses(tmp_path):
+    app, profiler = make_app(tmp_path)
+    remote = app.test_client()
+    remote.environ_base['REMOTE_ADDR'] = '10.0.0.5'
+    local = app.test_client()
+
+    # Чужой адрес не может ни снять профиль, ни посмотреть снимки
+    assert remote.get('/report?profile=1').status_code == 200
+    assert profiler.captures() == []
+    assert remote.get('/debug/profiles').status_code == 403
+
+    assert local.get('/report?profile=1&token=secret').status_code == 200
+    [capture] = profiler.captures()
+    summary = next(name for name in capture['files'] if name.endswith('.txt'))
+    assert remote.get(f'/debug/profiles/{summary}').status_code == 403
+    assert local.get('/debug/profiles').status_code == 200
+    text = local.get(f'/debug/profiles/{summary}').get_data(as_text=True)
+    assert text.startswith('GET /report ') and 'secret' not in text
+    assert 'secret' not in ''.join(os.listdir(tmp_path))
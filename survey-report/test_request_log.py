@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""Журналы JSON lines: запросы и медленные SQL с планом выполнения"""
+import os
+import json
+from collections import OrderedDict
+
+import request_log
+from metrics import connect
+
+
+def read_log(name):
+    with open(os.path.join(os.environ['SURVEY_LOG_DIR'], name), encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_access_log_line(app_module):
+    client = app_module.app.test_client()
+    client.get('/locations?sort=name')
+    client.get('/locations?sort=name')
+    first, second = read_log('access.log')[-2:]
+    assert first['event'] == 'request'
+    assert (first['method'], first['route'], first['path'], first['query'], first['status']) == \
+        ('GET', '/locations', '/locations', 'sort=name', 200)
+    assert first['duration_ms'] >= first['db_ms'] > 0
+    assert (first['cache'], second['cache']) == ('miss', 'hit')
+
+
+def test_slow_query_has_plan_and_table_scan(app_module, monkeypatch):
+    monkeypatch.setattr(request_log, 'SLOW_QUERY_MS', 0)
+    monkeypatch.setattr(request_log, '_plans', OrderedDict())
+    conn = connect(app_module.DB_PATH)
+    conn.execute("CREATE TABLE IF NOT EXISTS t (a INTEGER PRIMARY KEY, b TEXT)")
+    conn.executemany("INSERT INTO t (b) VALUES (?)", [('x',), ('y',)])
+    with app_module.app.test_request_context('/tasks'):
+        conn.execute("SELECT * FROM t   WHERE b = ?", ('x',)).fetchall()
+        conn.execute("SELECT * FROM t WHERE a = ?", (1,)).fetchall()
+    conn.close()
+
+    entries = [entry for entry in read_log('queries.log') if ' t ' in entry['sql'] + ' ']
+    batch = next(entry for entry in entries if entry['sql'].startswith('INSERT'))
+    assert batch['batch'] is True and 'plan' not in batch
+    scan = next(entry for entry in entries if entry['sql'] == 'SELECT * FROM t WHERE b = ?')
+    assert scan['event'] == 'slow_query' and scan['route'] == '/tasks' and scan['table_scan'] is True
+    lookup = next(entry for entry in entries if entry['sql'] == 'SELECT * FROM t WHERE a = ?')
+    assert lookup['table_scan'] is False
+    # План запрашивается один раз на текст запроса
+    assert len(request_log._plans) == 2
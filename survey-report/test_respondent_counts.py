@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Счетчики респондентов при повторном импорте ответов"""
+from scoring import import_answers, respondent_ids
+from respondent_counts import get_count, get_counts, rebuild_from_answers, LOCATION
+
+HEADER = ['Отметка времени', 'Укажите вашу локацию', 'Оцените скорость загрузки системы',
+          'Оцените стабильность работы системы']
+
+
+def counts(conn):
+    return get_count(conn), get_counts(conn, LOCATION)
+
+
+def recounted(conn):
+    """Те же счетчики, пересчитанные по всей таблице ответов"""
+    rebuild_from_answers(conn)
+    return counts(conn)
+
+
+def test_reimport_with_moved_respondent(conn, write_tsv):
+    first = write_tsv('wave.tsv', HEADER, [
+        ['2026-03-01 10:00', 'Офисы', '3 - Хорошо', '2 - Приемлемо'],
+        ['2026-03-01 10:05', 'Склад', '1 - Плохо', '1 - Плохо'],
+    ])
+    import_answers(conn, first)
+    assert counts(conn) == (2, {'Офисы': 1, 'Склад': 1})
+
+    # Первый респондент сменил локацию, исправил ответ и не ответил на второй вопрос
+    second = write_tsv('wave_fixed.tsv', HEADER, [
+        ['2026-03-01 10:00', 'Склад', '2 - Приемлемо', ''],
+        ['2026-03-01 10:05', 'Склад', '1 - Плохо', '1 - Плохо'],
+    ])
+    report = import_answers(conn, second)
+    assert 'warning' not in report
+    assert counts(conn) == (2, {'Склад': 2})
+    assert conn.execute("SELECT DISTINCT location FROM respondent_answers").fetchall() == [('Склад',)]
+    assert counts(conn) == recounted(conn)
+
+
+def test_same_respondent_twice_in_one_file(conn, write_tsv):
+    header = ['ID респондента'] + HEADER[1:]
+    path = write_tsv('wave.tsv', header, [
+        ['17', 'Офисы', '3 - Хорошо', '3 - Хорошо'],
+        ['17', 'Склад', '2 - Приемлемо', '3 - Хорошо'],
+    ])
+    import_answers(conn, path)
+    assert counts(conn) == (1, {'Склад': 1})
+    assert counts(conn) == recounted(conn)
+
+
+def test_legacy_content_ids_are_rekeyed(conn, write_tsv):
+    rows = [['2026-03-01 10:00', 'Офисы', '3 - Хорошо', '3 - Хорошо']]
+    path = write_tsv('wave.tsv', HEADER, rows)
+    # Ответы, записанные прежним импортом по хэшу содержимого строки
+    (content_id, _, _), = respondent_ids(rows)
+    conn.executemany("INSERT INTO respondent_answers VALUES (?, ?, ?, ?)", [
+        (content_id, 'Оцените скорость загрузки системы', '3 - Хорошо', 'Офисы'),
+        (content_id, 'Оцените стабильность работы системы', '3 - Хорошо', 'Офисы'),
+    ])
+    rebuild_from_answers(conn)
+
+    import_answers(conn, path)
+    assert counts(conn) == (1, {'Офисы': 1})
+    assert conn.execute("SELECT DISTINCT respondent_id FROM respondent_answers").fetchall() == \
+        [('ts:2026-03-01 10:00-1',)]
+
+
+def test_file_without_key_column_warns(conn, write_tsv):
+    path = write_tsv('wave.tsv', HEADER[1:], [['Офисы', '3 - Хорошо', '3 - Хорошо']])
+    assert 'warning' in import_answers(conn, path)
+    assert counts(conn) == (1, {'Офисы': 1})
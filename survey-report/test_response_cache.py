@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""Кэш страниц: ETag и 304, сброс по версии данных, варианты сжатия"""
+import gzip
+
+from flask import Flask, request
+
+from response_cache import ResponseCache, choose_encoding
+
+
+def make_app(version):
+    app = Flask(__name__)
+    cache = ResponseCache(lambda: version[0])
+    calls = []
+
+    @app.route('/page')
+    @cache.cached
+    def page():
+        calls.append(request.args.get('q'))
+        return f'Данные {version[0]} ' + 'x' * 1000
+
+    return app.test_client(), cache, calls
+
+
+def test_etag_revalidation_and_version_change():
+    version = [1]
+    client, cache, calls = make_app(version)
+
+    first = client.get('/page')
+    etag = first.headers['ETag']
+    assert first.status_code == 200 and first.headers['Cache-Control'] == 'no-cache'
+    revalidated = client.get('/page', headers={'If-None-Match': etag})
+    assert revalidated.status_code == 304 and revalidated.data == b''
+    assert (cache.hits, cache.misses, len(calls)) == (1, 1, 1)
+
+    # Другие параметры запроса — отдельная запись
+    client.get('/page?q=1')
+    assert calls == [None, '1']
+
+    # Новая версия данных: страница строится заново, старый ETag не подходит
+    version[0] = 2
+    fresh = client.get('/page', headers={'If-None-Match': etag})
+    assert fresh.status_code == 200 and 'Данные 2' in fresh.get_data(as_text=True)
+    assert fresh.headers['ETag'] != etag
+
+    cache.invalidate()
+    client.get('/page')
+    assert len(calls) == 4
+
+
+def test_compressed_variant_follows_accept_encoding():
+    client, _, _ = make_app([1])
+    plain = client.get('/page', headers={'Accept-Encoding': 'identity'})
+    packed = client.get('/page', headers={'Accept-Encoding': 'gzip;q=1, br;q=0'})
+    assert packed.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(packed.data) == plain.data
+    assert packed.headers['ETag'] == plain.headers['ETag']
+    assert choose_encoding('br;q=0, gzip', ('br', 'gzip')) == 'gzip'
+    assert choose_encoding('', ('br', 'gzip')) == 'identity'
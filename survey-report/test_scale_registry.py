@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""Реестр шкал: категории ответов по шкале вопроса, правка шкалы в БД"""
+import sqlite3
+
+import numpy as np
+import pytest
+
+from scoring import (init_answers_table, score_all, question_totals, satisfaction_percent,
+                     recompute_questions, BUCKETS)
+
+ONEC = 'Как вы оцениваете работу приложения 1С?'
+SPEED = 'Оцените скорость загрузки системы'
+
+
+@pytest.fixture
+def answers_db():
+    connection = sqlite3.connect(':memory:')
+    init_answers_table(connection)
+    yield connection
+    connection.close()
+
+
+def add(conn, question_text, answers, location='Офисы'):
+    conn.executemany("INSERT INTO respondent_answers VALUES (?, ?, ?, ?)",
+                     [(f'{location}-{i}', question_text, answer, location) for i, answer in enumerate(answers)])
+
+
+def counts(scores, question_text):
+    row = scores['counts'][scores['questions'].index(question_text)].sum(axis=0)
+    return dict(zip(BUCKETS, row.tolist()))
+
+
+def test_inverted_onec_scale(answers_db):
+    add(answers_db, ONEC, ['1 - Удобно', '2 - Неудобно', '3 - Удовлетворительно', '2 - Неудобно'])
+    add(answers_db, SPEED, ['1 - Плохо', '2 - Приемлемо', '3 - Хорошо', '3 - Хорошо'])
+    scores = score_all(answers_db)
+    # Та же цифра — другая категория: в 1С "2" означает "Неудобно"
+    assert counts(scores, ONEC) == {'positive': 1, 'neutral': 1, 'negative': 2}
+    assert counts(scores, SPEED) == {'positive': 2, 'neutral': 1, 'negative': 1}
+
+
+def test_values_outside_the_scale_are_not_counted(answers_db):
+    add(answers_db, SPEED, ['3 - Хорошо', '7', '0 - Нет', 'Не знаю'])
+    assert counts(score_all(answers_db, {SPEED}), SPEED) == {'positive': 1, 'neutral': 0, 'negative': 0}
+
+
+def test_satisfaction_percent_weights():
+    assert satisfaction_percent(np.array([[1, 1, 0], [0, 0, 0]])).tolist() == [75.0, 0.0]
+
+
+def test_registry_edit_changes_scoring(answers_db):
+    add(answers_db, SPEED, ['2 - Приемлемо', '3 - Хорошо'])
+    [before] = question_totals(score_all(answers_db, {SPEED}))
+    assert before['satisfaction_percent'] == 75.0
+
+    answers_db.execute("UPDATE scale_points SET bucket = 'positive' WHERE scale = 'quality_3' AND value = 2")
+    answers_db.execute("INSERT INTO scale_points VALUES ('quality_3', 4, 'Отлично', 'positive')")
+    add(answers_db, SPEED, ['4 - Отлично'], location='Склад')
+    # Повторная инициализация не возвращает значения по умолчанию
+    init_answers_table(answers_db)
+    [after] = question_totals(score_all(answers_db, {SPEED}))
+    assert (after['total_responses'], after['satisfaction_percent']) == (3, 100.0)
+
+
+def test_new_question_in_registry_is_recomputed(conn):
+    conn.execute("INSERT INTO question_scales (question_text, keyword, category, scale, position) "
+                 "VALUES ('Оцените работу принтеров', 'принтер', 'Оборудование', 'onec_3', 100)")
+    add(conn, 'Оцените работу принтеров', ['1 - Удобно', '2 - Неудобно'])
+    assert recompute_questions(conn) == 1
+    row = conn.execute("SELECT category, positive_responses, negative_responses, satisfaction_percent "
+                       "FROM questions WHERE question_text = 'Оцените работу принтеров'").fetchone()
+    assert row == ('Оборудование', 1, 1, 50.0)
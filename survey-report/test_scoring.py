@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""Ключ респондента в файле ответов"""
+from scoring import key_column, respondent_ids
+
+
+def test_key_column_prefers_explicit_id():
+    assert key_column(['Отметка времени', 'ID респондента', 'Локация']) == ('id', 1)
+    assert key_column(['Отметка времени', 'Локация']) == ('ts', 0)
+    assert key_column(['Timestamp', 'Location']) == ('ts', 0)
+    assert key_column(['Локация', 'Оцените скорость']) is None
+
+
+def test_ids_follow_the_key_column():
+    rows = [['17', 'Офисы', '3'], ['18', 'Склад', '1'], ['', 'Цех', '2']]
+    ids = [respondent_id for respondent_id, _, _ in respondent_ids(rows, ('id', 0))]
+    assert ids[:2] == ['id:17', 'id:18']
+    # Пустая ячейка ключа: идентификатор по содержимому строки
+    (_, content_id, _), = respondent_ids(rows[2:])
+    assert ids[2] == content_id
+
+
+def test_same_timestamp_is_numbered():
+    rows = [['2026-03-01 10:00', 'Офисы'], ['2026-03-01 10:00', 'Склад'], ['2026-03-01 10:05', 'Офисы']]
+    ids = [respondent_id for respondent_id, _, _ in respondent_ids(rows, ('ts', 0))]
+    assert ids == ['ts:2026-03-01 10:00-1', 'ts:2026-03-01 10:00-2', 'ts:2026-03-01 10:05-1']
+
+
+def test_corrected_row_keeps_its_id():
+    before = [['2026-03-01 10:00', 'Офисы', '3 - Хорошо']]
+    after = [['2026-03-01 10:00', 'Склад', '2 - Приемлемо']]
+    (first, first_content, _), = respondent_ids(before, ('ts', 0))
+    (second, second_content, _), = respondent_ids(after, ('ts', 0))
+    assert first == second
+    # Без ключа исправленная строка была бы новым респондентом
+    assert first_content != second_content
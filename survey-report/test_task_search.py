@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""Поиск задач: индекс FTS5 следует за вставкой, изменением и удалением"""
+
+
+def found(client, query):
+    return client.get(f'/search?q={query}').get_data(as_text=True)
+
+
+def test_search_index_follows_tasks(app_module, conn):
+    client = app_module.app.test_client()
+    conn.execute("INSERT INTO tasks (task_key, summary) VALUES ('IT-1', 'Замена монитора')")
+    conn.commit()
+    assert 'IT-1' in found(client, 'монит')
+
+    conn.execute("UPDATE tasks SET summary = 'Настройка принтера' WHERE task_key = 'IT-1'")
+    conn.commit()
+    app_module.response_cache.invalidate()
+    assert 'IT-1' not in found(client, 'монит') and 'IT-1' in found(client, 'принтер')
+
+    conn.execute("DELETE FROM tasks")
+    conn.commit()
+    app_module.response_cache.invalidate()
+    assert 'IT-1' not in found(client, 'принтер')
+    # Пунктуация ввода не ломает запрос MATCH
+    assert client.get('/search?q="принтер*"(').status_code == 200
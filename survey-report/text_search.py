@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Полнотекстовый поиск на SQLite FTS5.
+
+Индекс — FTS5-таблица с собственной копией текста строк, отобранных
+SQL-условием. Триггеры на исходной таблице поддерживают его в актуальном
+состоянии, поэтому любой импорт обновляет индекс инкрементально, в той же
+транзакции, без перестроения. rowid индекса — INTEGER PRIMARY KEY исходной
+таблицы, который VACUUM не перенумеровывает.
+"""
+import re
+from markupsafe import escape, Markup
+
+PAGE_SIZE = 20
+
+# Маркеры совпадений внутри snippet(); заменяются на <mark> после экранирования
+_HL_START = '\x02'
+_HL_END = '\x03'
+
+
+def ensure_search_index(conn, table, columns, fts_table, condition='1', key='id'):
+    """
+    Создает FTS5-индекс по table.columns (имя или кортеж имен) для строк, где
+    выполняется condition, и триггеры синхронизации. condition — SQL-условие
+    над строкой с подстановкой {row} вместо ее псевдонима (new. в триггерах),
+    key — INTEGER PRIMARY KEY таблицы. Новый индекс заполняется из
+    существующих строк. Вызывается при старте: создание берет блокировку
+    записи, поэтому одновременно стартующие воркеры создают индекс один раз.
+    """
+    def matches(alias):
+        return '(' + condition.format(row=alias) + ')'
+
+    def values(alias):
+        return ', '.join(f'{alias}.{column}' for column in columns)
+
+    columns = (columns,) if isinstance(columns, str) else tuple(columns)
+    names = ', '.join(columns)
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                              (fts_table,)).fetchone()
+        if not exists:
+            conn.execute(f"""
+                CREATE VIRTUAL TABLE {fts_table} USING fts5(
+                    {names}, tokenize='unicode61 remove_diacritics 2'
+                )
+            """)
+            conn.execute(f"""
+                CREATE TRIGGER {fts_table}_ai AFTER INSERT ON {table} WHEN {matches('new')} BEGIN
+                    INSERT INTO {fts_table}(rowid, {names}) VALUES (new.{key}, {values('new')});
+                END
+            """)
+            conn.execute(f"""
+                CREATE TRIGGER {fts_table}_ad AFTER DELETE ON {table} BEGIN
+                    DELETE FROM {fts_table} WHERE rowid = old.{key};
+                END
+            """)
+            conn.execute(f"""
+                CREATE TRIGGER {fts_table}_au AFTER UPDATE ON {table} BEGIN
+                    DELETE FROM {fts_table} WHERE rowid = old.{key};
+                    INSERT INTO {fts_table}(rowid, {names})
+                    SELECT new.{key}, {values('new')} WHERE {matches('new')};
+                END
+            """)
+            conn.execute(f"""
+                INSERT INTO {fts_table}(rowid, {names})
+                SELECT row.{key}, {values('row')} FROM {table} AS row WHERE {matches('row')}
+            """)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def build_match_query(text):
+    """
+    Превращает пользовательский ввод в безопасный запрос FTS5:
+    каждое слово в кавычках с префиксным поиском, слова через AND.
+    """
+    words = re.findall(r'\w+', text or '')
+    return ' '.join(f'"{word}"*' for word in words[:10])
+
+
+def render_snippet(raw):
+    """Экранирует текст и подсвечивает совпадения тегом <mark>"""
+    html = str(escape(raw or ''))
+    return Markup(html.replace(_HL_START, '<mark>').replace(_HL_END, '</mark>'))
+
+
+def search(conn, fts_table, text, page=1, page_size=PAGE_SIZE):
+    """
+    Ищет text в индексе. Возвращает (всего совпадений, [(rowid, snippet), ...])
+    для запрошенной страницы, отсортированные по релевантности (bm25).
+    """
+    match = build_match_query(text)
+    if not match:
+        return 0, []
+
+    total = conn.execute(f"SELECT COUNT(*) FROM {fts_table} WHERE {fts_table} MATCH ?",
+                         (match,)).fetchone()[0]
+    rows = conn.execute(f"""
+        SELECT rowid, snippet({fts_table}, -1, ?, ?, '…', 24)
+        FROM {fts_table}
+        WHERE {fts_table} MATCH ?
+        ORDER BY rank
+        LIMIT ? OFFSET ?
+    """, (_HL_START, _HL_END, match, page_size, (max(page, 1) - 1) * page_size)).fetchall()
+    return total, [(row[0], render_snippet(row[1])) for row in rows]